@@ -0,0 +1,109 @@
+"""
+Punto de entrada de producción del backend.
+
+    python -m backend serve [--host 0.0.0.0] [--port 5001] [--server gevent|gunicorn]
+                            [--workers N] [--connections N]
+
+* ``gevent`` (por defecto): un proceso con ``gevent.pywsgi``; ``--connections``
+  acota las conexiones atendidas a la vez.
+* ``gunicorn``: ``--workers`` procesos con workers gevent (requiere tener
+  ``gunicorn`` instalado); ``--connections`` es ``worker_connections``.
+
+El monkey-patching de gevent se hace antes de importar la aplicación (y con
+ella ``requests``/``urllib3`` y ``threading``), que es lo que lo hace efectivo.
+Para desarrollo se sigue usando ``python backend/app.py``.
+"""
+import argparse
+import logging
+import os
+import sys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend", description="Backend de Inventory Manager.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Servidor de producción (gevent o gunicorn + gevent).")
+    serve.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    serve.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5001")))
+    serve.add_argument("--server", choices=("gevent", "gunicorn"), default=os.environ.get("WSGI_SERVER", "gevent"))
+    serve.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "1")),
+                       help="Procesos (solo gunicorn).")
+    serve.add_argument("--connections", type=int, default=int(os.environ.get("WORKER_CONNECTIONS", "1000")),
+                       help="Conexiones simultáneas por proceso.")
+    serve.add_argument("--timeout", type=int, default=int(os.environ.get("WORKER_TIMEOUT", "120")),
+                       help="Segundos antes de reiniciar un worker bloqueado (gunicorn) y de espera al reciclar por memoria.")
+    return parser
+
+
+def serve_gevent(args: argparse.Namespace):
+    from gevent import monkey
+    monkey.patch_all()
+
+    import gevent
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+    from .app import app
+    from .health import warm_up
+    from .memory import RECYCLE_EXIT_CODE, memory_governor
+
+    if args.workers > 1:
+        logging.getLogger(__name__).warning("--workers solo aplica con --server gunicorn; se usa un proceso.")
+    server = WSGIServer((args.host, args.port), app, spawn=Pool(args.connections), log=None, error_log=logging.getLogger("gevent"))
+    logging.getLogger(__name__).info(f"Sirviendo en http://{args.host}:{args.port} (gevent, {args.connections} conexiones)")
+    # Readiness pasa a ready cuando termina el calentamiento; liveness responde desde ya
+    gevent.spawn(warm_up)
+    # Reciclaje por memoria: se deja de aceptar conexiones, se terminan las abiertas y se sale
+    memory_governor.recycler = lambda: gevent.spawn(server.stop, timeout=args.timeout)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop(timeout=5)
+    if memory_governor.recycle_reason is not None:
+        sys.exit(RECYCLE_EXIT_CODE)
+
+
+def install_recycler(worker):
+    """Reciclaje por memoria en gunicorn: el worker termina sus conexiones y el árbitro lo reemplaza"""
+    from .memory import memory_governor
+    memory_governor.recycler = lambda: setattr(worker, "alive", False)
+
+
+def serve_gunicorn(args: argparse.Namespace):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("gunicorn no está instalado: pip install gunicorn, o usa --server gevent.")
+
+    class GunicornApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            # El worker gevent hace su propio monkey-patching antes de cargar la aplicación
+            self.cfg.set("worker_class", "gevent")
+            self.cfg.set("worker_connections", args.connections)
+            self.cfg.set("timeout", args.timeout)
+            self.cfg.set("post_worker_init", install_recycler)
+
+        def load(self):
+            import gevent
+            from .app import app
+            from .health import warm_up
+            # En cada worker, tras el monkey-patching de gevent
+            gevent.spawn(warm_up)
+            return app
+
+    GunicornApplication().run()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        if args.server == "gunicorn":
+            serve_gunicorn(args)
+        else:
+            serve_gevent(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Control de admisión de exportaciones por costo estimado.
+
+Cada exportación se estima en celdas (filas × columnas del reporte) y el
+proceso admite a la vez como máximo ``EXPORT_CELL_BUDGET`` celdas en curso,
+que es lo que acota la memoria de los libros de openpyxl construidos en
+paralelo. Lo que no cabe espera en una cola FIFO hasta
+``EXPORT_QUEUE_SECONDS``; si la cola está llena o se agota la espera se
+responde 429 con un ``Retry-After`` estimado a partir del throughput
+observado (celdas/s). Una exportación más grande que el presupuesto completo
+solo se admite cuando no hay otra en curso.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Callable, Deque, Dict
+
+from flask import jsonify
+
+from .metrics import REGISTRY
+
+EXPORT_CELL_BUDGET = int(os.environ.get("EXPORT_CELL_BUDGET", "2000000"))
+EXPORT_QUEUE_MAX = int(os.environ.get("EXPORT_QUEUE_MAX", "16"))
+EXPORT_QUEUE_SECONDS = float(os.environ.get("EXPORT_QUEUE_SECONDS", "10"))
+# Throughput inicial (celdas/s) hasta medir exportaciones reales
+INITIAL_CELLS_PER_SECOND = 200000.0
+THROUGHPUT_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 120
+
+CELLS_IN_FLIGHT = REGISTRY.gauge("export_admission_cells_in_flight", "Celdas estimadas de las exportaciones en curso.")
+QUEUE_LENGTH = REGISTRY.gauge("export_admission_queue_length", "Exportaciones esperando cupo.")
+ADMISSION_REJECTED = REGISTRY.counter("export_admission_rejected_total", "Exportaciones rechazadas con 429.", ("reason",))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Presupuesto de celdas en curso con cola FIFO acotada"""
+
+    def __init__(self, budget: int, queue_max: int, queue_seconds: float):
+        self.budget = budget
+        self.queue_max = queue_max
+        self.queue_seconds = queue_seconds
+        self.condition = threading.Condition()
+        self.queue: Deque["_Ticket"] = deque()
+        self.cells_in_flight = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.cells_per_second = INITIAL_CELLS_PER_SECOND
+
+    def _fits(self, cells: int) -> bool:
+        if self.in_flight == 0:
+            return True
+        return self.cells_in_flight + cells <= self.budget
+
+    def retry_after(self, cells: int = 0) -> int:
+        """Segundos estimados hasta que se libere cupo para ``cells`` celdas"""
+        pending = self.cells_in_flight + sum(ticket.cells for ticket in self.queue)
+        seconds = math.ceil((pending + cells - self.budget) / self.cells_per_second) if pending + cells > self.budget else 1
+        return min(MAX_RETRY_AFTER_SECONDS, max(1, seconds))
+
+    def _reject(self, reason: str, cells: int) -> AdmissionRejected:
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+        return AdmissionRejected(reason, self.retry_after(cells))
+
+    def acquire(self, cells: int) -> None:
+        """Reserva ``cells`` celdas o lanza AdmissionRejected"""
+        ticket = _Ticket(cells)
+        with self.condition:
+            if not self.queue and self._fits(cells):
+                self._admit(cells)
+                return
+            if len(self.queue) >= self.queue_max:
+                raise self._reject("queue_full", cells)
+            self.queue.append(ticket)
+            QUEUE_LENGTH.set(len(self.queue))
+            deadline = time.monotonic() + self.queue_seconds
+            try:
+                while not (self.queue[0] is ticket and self._fits(cells)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("timeout", cells)
+                    self.condition.wait(remaining)
+                self.queue.popleft()
+                self._admit(cells)
+            finally:
+                if ticket in self.queue:
+                    self.queue.remove(ticket)
+                QUEUE_LENGTH.set(len(self.queue))
+                # El siguiente en la cola puede haber quedado en cabeza
+                self.condition.notify_all()
+
+    def _admit(self, cells: int) -> None:
+        self.cells_in_flight += cells
+        self.in_flight += 1
+        self.admitted += 1
+        CELLS_IN_FLIGHT.set(self.cells_in_flight)
+
+    def release(self, cells: int, elapsed: float) -> None:
+        with self.condition:
+            self.cells_in_flight -= cells
+            self.in_flight -= 1
+            if cells and elapsed > 0:
+                observed = cells / elapsed
+                self.cells_per_second += THROUGHPUT_SMOOTHING * (observed - self.cells_per_second)
+            CELLS_IN_FLIGHT.set(self.cells_in_flight)
+            self.condition.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        with self.condition:
+            return {
+                "presupuestoCeldas": self.budget,
+                "celdasEnCurso": self.cells_in_flight,
+                "exportacionesEnCurso": self.in_flight,
+                "enCola": len(self.queue),
+                "colaMaxima": self.queue_max,
+                "utilizacion": round(self.cells_in_flight / self.budget, 3) if self.budget else 0,
+                "celdasPorSegundo": round(self.cells_per_second),
+                "admitidas": self.admitted,
+                "rechazadas": self.rejected,
+                "retryAfter": self.retry_after(),
+            }
+
+
+class _Ticket:
+    __slots__ = ("cells",)
+
+    def __init__(self, cells: int):
+        self.cells = cells
+
+
+EXPORT_ADMISSION = AdmissionController(EXPORT_CELL_BUDGET, EXPORT_QUEUE_MAX, EXPORT_QUEUE_SECONDS)
+
+
+def admission_control(estimate_cells: Callable[[], int], controller: AdmissionController = EXPORT_ADMISSION) -> Callable:
+    """Decorador de rutas: reserva el costo estimado de la petición mientras se atiende"""
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            cells = estimate_cells()
+            try:
+                controller.acquire(cells)
+            except AdmissionRejected as e:
+                response = jsonify({
+                    "error": "Hay demasiadas exportaciones en curso, intenta nuevamente en unos segundos.",
+                    "motivo": e.reason,
+                })
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response, 429
+            started_at = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                controller.release(cells, time.perf_counter() - started_at)
+        return wrapper
+    return decorator
@@ -9,41 +9,122 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # --------------------------------------------------------------------------- #
 
 # --- 1. Importaciones necesarias ---
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import ClosingIterator
 import pandas as pd # type: ignore
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment
 from openpyxl.utils import get_column_letter
 from datetime import datetime
 import io
-import unicodedata
+import sqlite3
+import tempfile
+import threading
+import time
 import requests # <--- Importado para llamadas a API externa
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, List, Optional
 from openpyxl.worksheet.worksheet import Worksheet
 from .report_generators.base_generator import BaseReportGenerator
 from .report_generators.inventario_generator import InventarioReportGenerator
 from .report_generators.pedido_generator import PedidoReportGenerator
 from .report_generators.devoluciones_generator import DevolucionesReportGenerator
 from .report_generators.precios_generator import PreciosReportGenerator
+from .report_generators.xlsx_compact import XLSX_COMPACT, compact_xlsx
+from .report_generators.streaming import CHUNK_ROWS, STREAMING_OPTIONS_UNSUPPORTED, XLSX_WRITER, StreamingExportError, StreamingLineItemExport, iter_lines, parse_line
 from .constants import UserKeys
-from backend.validation import validate_with_schema
+from .money import to_cents, from_cents, allocate_cents
+from .catalog import catalog_cache
+from .business_calendar import dates_from_spec, format_date, year_calendar
+from .price_history import get_price_history
+from .profiling import PROFILE_HEADER, RequestProfile, is_admin, list_profiles, payload_shape, profile_path, should_profile
+from .metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUESTS, HTTP_LATENCY, EXPORT_ROWS, stage_timer, upstream_timer
+from backend.validation import NDJSON_MIMETYPE, ndjson_validators, validate_with_schema, validated_model
+from .logging_config import configure_logging
+from .compression import compress_response, negotiate_encoding
+from .admission import EXPORT_ADMISSION, admission_control
+from .circuit import circuit_breaker
+from .health import LIVENESS_BODY, readiness_probe, warm_up
+from .sessions import session_store
+from .memory import memory_governor
+from .drafts import DraftError, get_draft_store
+from .concurrency import limit_concurrency, run_cpu_bound
+from .serialization import FastJSONProvider, api_response, cached_payload, request_payload, response_mimetype
 import logging
 import argparse # <--- Importado para leer argumentos
 
 # --- 2. Inicialización de la aplicación Flask ---
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
-# Configuración básica de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging no bloqueante (QueueHandler/QueueListener); niveles y formato por variables de entorno
+configure_logging()
+
+# Métricas de memoria del worker y recolección/reciclaje tras exportaciones grandes (ver memory.py)
+memory_governor.start()
 
 # Permitimos solicitudes CORS de cualquier origen para el desarrollo
 # En producción, se recomienda restringir esto a dominios específicos
 CORS(app, resources={r"/*": {"origins": ["http://localhost:5173", "https://5173-firebase-gestion360-1759544149010.cluster-gizzoza7hzhfyxzo5d76y3flkw.cloudworkstations.dev", "https://5174-firebase-gestion360-1759544149010.cluster-gizzoza7hzhfyxzo5d76y3flkw.cloudworkstations.dev"]}}, supports_credentials=True, expose_headers=["Content-Disposition"])
 
 # --- 3. Credenciales y Constantes (Mover a variables de entorno en producción) ---
-API_TOKEN_SUNAT = "apis-token-16452.eFeKMZDK8KQe3dGOhwSZJ2mgag9l5MU5"
-API_URL_SUNAT = "https://api.apis.net.pe/v2/sunat/ruc"
+API_TOKEN_SUNAT = os.environ.get("SUNAT_API_TOKEN", "apis-token-16452.eFeKMZDK8KQe3dGOhwSZJ2mgag9l5MU5")
+# Configurable para pruebas de carga contra un servicio local (backend/benchmarks/upstream_stub.py)
+API_URL_SUNAT = os.environ.get("SUNAT_API_URL", "https://api.apis.net.pe/v2/sunat/ruc")
+SUNAT_TIMEOUT_SECONDS = float(os.environ.get("SUNAT_TIMEOUT_SECONDS", "10"))
+
+
+# --- 4. Métricas por petición ---
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+    if not request.path.startswith(('/debug/', '/metrics', '/api/health')) and should_profile(request.headers.get(PROFILE_HEADER)):
+        profile = RequestProfile()
+        if profile.start():
+            g.profile = profile
+
+@app.after_request
+def record_request_metrics(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        save_request_profile(profile, response.status_code)
+    started_at = g.pop('request_started_at', None)
+    # Se etiqueta por regla de ruta (no por URL) para acotar la cardinalidad
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if started_at is not None:
+        HTTP_LATENCY.observe(time.perf_counter() - started_at, endpoint=endpoint)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+    return response
+
+@app.after_request
+def compress_json_response(response):
+    # Se registra después que las métricas, así que se ejecuta antes (la latencia la incluye)
+    return compress_response(response, request)
+
+
+@app.teardown_request
+def stop_pending_profile(exc):
+    # Si el handler lanzó una excepción no se pasa por after_request
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
+def save_request_profile(profile: RequestProfile, status_code: int):
+    """Guarda el perfil con la forma del payload (sin su contenido) sin afectar la respuesta."""
+    elapsed = profile.stop()
+    metadata = {
+        'endpoint': request.url_rule.rule if request.url_rule else request.path,
+        'method': request.method,
+        'status': status_code,
+        'payload': payload_shape(cached_payload(), request.content_length or 0),
+    }
+    try:
+        name = profile.save(elapsed, metadata)
+        app.logger.info(f"Perfil guardado: {name} ({elapsed:.3f}s)")
+    except OSError as e:
+        app.logger.error(f"No se pudo guardar el perfil: {e}")
 
 
 # --- 5. Definición de Endpoints ---
@@ -51,66 +132,58 @@ API_URL_SUNAT = "https://api.apis.net.pe/v2/sunat/ruc"
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
     """
-    Endpoint para calcular la distribución de montos.
+    Endpoint para calcular la distribución de montos. Las fechas llegan en
+    ``fechasValidas`` o se generan en días hábiles con ``calendario``
+    (ver business_calendar.dates_from_spec).
     """
     try:
-        data = request.get_json()
+        data = request_payload()
         if not data:
             return jsonify({"error": "Request body must be JSON"}), 400
 
         monto_total_str = data.get('montoTotal')
         fechas_validas = data.get('fechasValidas')
+        calendario = data.get('calendario')
+        if not fechas_validas and isinstance(calendario, dict):
+            try:
+                fechas_validas = [format_date(day) for day in dates_from_spec(calendario)]
+            except ValueError as e:
+                return jsonify({"error": f"'calendario' inválido: {e}"}), 400
 
         if not monto_total_str or not fechas_validas:
             return jsonify({"error": "Faltan 'montoTotal' o 'fechasValidas' en la petición"}), 400
         
         try:
-            monto_total = float(monto_total_str)
-        except (ValueError, TypeError):
-            return jsonify({"error": "'montoTotal' debe ser un número válido"}), 400
+            monto_total_cents = to_cents(monto_total_str)
+        except ValueError as e:
+            return jsonify({"error": f"'montoTotal' debe ser un número válido: {e}"}), 400
 
         if not isinstance(fechas_validas, list) or len(fechas_validas) == 0:
             return jsonify({"error": "'fechasValidas' debe ser una lista no vacía de fechas"}), 400
 
-        num_fechas = len(fechas_validas)
-        monto_base = monto_total / num_fechas
-        
-        # Redondear a 2 decimales
-        monto_base_redondeado = round(monto_base, 2)
-        
-        montos_asignados = {fecha: monto_base_redondeado for fecha in fechas_validas}
-        
-        # Ajustar el último pago para que la suma total sea exacta
-        total_calculado = sum(montos_asignados.values())
-        diferencia = round(monto_total - total_calculado, 2)
-        
-        if diferencia != 0 and fechas_validas:
-            ultima_fecha = fechas_validas[-1]
-            montos_asignados[ultima_fecha] += diferencia
-            montos_asignados[ultima_fecha] = round(montos_asignados[ultima_fecha], 2)
+        # Reparto exacto en céntimos: la suma de las cuotas es igual al monto total
+        cuotas_cents = allocate_cents(monto_total_cents, len(fechas_validas))
+        montos_cents: Dict[str, int] = {}
+        for fecha, cents in zip(fechas_validas, cuotas_cents):
+            montos_cents[fecha] = montos_cents.get(fecha, 0) + cents
+        montos_asignados = {fecha: from_cents(cents) for fecha, cents in montos_cents.items()}
 
         # Calcular resumen mensual
-        resumen_mensual = {}
-        for fecha_str, monto in montos_asignados.items():
+        resumen_cents: Dict[str, int] = {}
+        for fecha_str, cents in montos_cents.items():
             try:
                 # Se asume que el formato de fecha es 'DD/MM/YYYY'
                 fecha_obj = datetime.strptime(fecha_str, '%d/%m/%Y')
                 mes_anio = fecha_obj.strftime('%Y-%m') # Formato 'YYYY-%m'
-                
-                if mes_anio in resumen_mensual:
-                    resumen_mensual[mes_anio] += monto
-                else:
-                    resumen_mensual[mes_anio] = monto
+                resumen_cents[mes_anio] = resumen_cents.get(mes_anio, 0) + cents
             except ValueError:
                 # Manejar fechas con formato incorrecto si es necesario
                 app.logger.warning(f"Formato de fecha inválido encontrado: {fecha_str}")
                 continue # O manejar el error de otra forma
 
-        # Redondear los totales mensuales a 2 decimales
-        for mes, total in resumen_mensual.items():
-            resumen_mensual[mes] = round(total, 2)
+        resumen_mensual = {mes: from_cents(cents) for mes, cents in resumen_cents.items()}
 
-        return jsonify({
+        return api_response({
             "montosAsignados": montos_asignados,
             "resumenMensual": resumen_mensual,
             "fechasValidas": sorted(fechas_validas, key=lambda d: datetime.strptime(d, '%d/%m/%Y'))
@@ -121,12 +194,32 @@ def calculate():
         return jsonify({"error": f"Ocurrió un error interno: {str(e)}"}), 500
 
 
+@app.route('/api/calendario/feriados', methods=['GET'])
+def calendar_holidays():
+    """
+    Feriados nacionales y cantidad de días hábiles de un año (parámetro anio, por defecto el actual).
+    """
+    try:
+        anio = int(request.args.get('anio', datetime.now().year))
+        calendar = year_calendar(anio)
+    except ValueError as e:
+        return jsonify({"error": f"'anio' inválido: {e}"}), 400
+    response = api_response({
+        "anio": anio,
+        "feriados": [{"fecha": format_date(day), "nombre": nombre} for day, nombre in calendar.holidays.items()],
+        "diasHabiles": calendar.count,
+    })
+    response.cache_control.max_age = 24 * 60 * 60
+    return response
+
+
 @app.route('/api/consultar-ruc', methods=['POST'])
+@limit_concurrency('upstream')
 def consultar_ruc():
     """
     Endpoint para consultar RUC/DNI. Ahora se conecta a la API real.
     """
-    data = request.get_json()
+    data = request_payload()
     numero = data.get('documentNumber')
 
     if not numero or not numero.isdigit():
@@ -141,10 +234,11 @@ def consultar_ruc():
             'Authorization': f'Bearer {API_TOKEN_SUNAT}',
             'Content-Type': 'application/json'
         }
-        response = requests.get(f"{API_URL_SUNAT}?numero={numero}", headers=headers)
+        with circuit_breaker('sunat'), upstream_timer('sunat'):
+            response = requests.get(API_URL_SUNAT, params={"numero": numero}, headers=headers, timeout=SUNAT_TIMEOUT_SECONDS)
 
-        # Propagar el error de la API externa si la solicitud no fue exitosa
-        response.raise_for_status()
+            # Propagar el error de la API externa si la solicitud no fue exitosa
+            response.raise_for_status()
 
         return jsonify(response.json()), response.status_code
 
@@ -168,7 +262,43 @@ REPORT_GENERATORS = {
     'precios': PreciosReportGenerator,
 }
 
+def release_after_send(response, rows: int):
+    """Tras enviar el archivo: gc, muestreo de memoria y posible reciclaje del worker"""
+    # send_file usa direct_passthrough y werkzeug no ejecuta call_on_close en ese
+    # caso, así que el cierre se engancha al iterable que recibe el servidor
+    response.response = ClosingIterator(response.response, lambda: memory_governor.after_send(rows))
+    return response
+
+# Columnas cobradas a una exportación en streaming: su memoria no crece con las filas
+STREAMING_EXPORT_COLUMNS = 16
+
+def estimate_export_cells() -> int:
+    """Costo estimado de una exportación en celdas: filas × columnas del reporte."""
+    if request.mimetype == NDJSON_MIMETYPE:
+        return CHUNK_ROWS * STREAMING_EXPORT_COLUMNS
+    try:
+        data = request_payload()
+    except HTTPException:
+        # El cuerpo inválido lo rechaza la validación
+        return 0
+    if isinstance(data, dict) and 'draftId' in data:
+        try:
+            data = get_draft_store().get(data['draftId']).payload()
+        except (DraftError, sqlite3.Error):
+            # El error lo responde export_xlsx
+            return 0
+    if not isinstance(data, dict) or not isinstance(data.get('list'), list):
+        return 0
+    GeneratorClass = REPORT_GENERATORS.get(data.get('tipo'))
+    if GeneratorClass is None:
+        return 0
+    form_data = data.get('form') if isinstance(data.get('form'), dict) else {}
+    columns = len(GeneratorClass(None, form_data, [])._get_normalized_headers())
+    return len(data['list']) * max(columns, 1)
+
 @app.route('/export-xlsx', methods=['POST'])
+@admission_control(estimate_export_cells)
+@limit_concurrency('export')
 @validate_with_schema()
 def export_xlsx():
     app.logger.info('Received request to /export-xlsx')
@@ -176,53 +306,393 @@ def export_xlsx():
     Endpoint principal que recibe datos JSON, genera un archivo Excel
     con formato y lo envía como una descarga.
     """
+    if request.mimetype == NDJSON_MIMETYPE:
+        return export_xlsx_stream()
     try:
-        data = request.get_json()
+        data = request_payload()
+        if 'draftId' in data:
+            try:
+                data = get_draft_store().get(data['draftId'], data.get('version')).payload()
+            except DraftError as e:
+                return jsonify({"error": e.message}), e.status
 
         tipo_gestion = data.get('tipo', 'desconocido')
         form_data = data.get('form', {})
         list_data = data.get('list', [])
         usuario_data = data.get('usuario', {})
         totales_data = data.get('totales', {})
+        opciones_data = data.get('opciones', {})
+
+        model = validated_model()
+        if model is not None:
+            # Backend de validación pydantic: los generadores reciben los modelos tipados
+            form_data, list_data, usuario_data = model.form, model.list, model.usuario
 
         GeneratorClass = REPORT_GENERATORS.get(tipo_gestion)
 
         if not GeneratorClass:
             return jsonify({"error": f"Tipo de reporte no válido: {tipo_gestion}"}), 400
 
-        output_buffer = io.BytesIO()
-        with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
-            generator = GeneratorClass(writer, form_data, list_data, data=totales_data, usuario_data=usuario_data)
-            generator.generate()
+        try:
+            opciones_data = with_catalog(opciones_data)
+        except requests.exceptions.RequestException as e:
+            app.logger.error(f"Error fetching catalog for reconciliation: {e}")
+            return jsonify({"error": "No se pudo obtener el catálogo para la conciliación."}), 503
+
+        # Cálculo y serialización del libro fuera del hub de gevent (ver concurrency.py)
+        generator, output_buffer = run_cpu_bound(
+            build_workbook, GeneratorClass, tipo_gestion, form_data, list_data, totales_data, usuario_data, opciones_data,
+            compact=compact_requested()
+        )
+        EXPORT_ROWS.inc(len(list_data), tipo=tipo_gestion)
 
-        output_buffer.seek(0)
+        if tipo_gestion == 'precios':
+            # sqlite3 no coopera con gevent: escrituras y esperas por bloqueo fuera del hub
+            run_cpu_bound(record_price_history, generator)
 
         filename = generator.get_filename()
 
-        return send_file(
+        response = send_file(
             output_buffer,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
             download_name=filename
         )
+        return release_after_send(response, len(list_data))
 
     except Exception as e:
         app.logger.error(f"Error al exportar a XLSX: {e}")
         return jsonify({"error": f"Ocurrió un error interno: {str(e)}"}), 500
 
+def with_catalog(opciones_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Con conciliarStock agrega el índice del catálogo en caché (hash join por código) a las opciones."""
+    if not opciones_data.get('conciliarStock'):
+        return opciones_data
+    return {**opciones_data, 'catalogo': catalog_cache.index()}
+
+def uses_direct_writer(GeneratorClass, opciones_data: Dict[str, Any]) -> bool:
+    """El escritor directo cubre el formato fijo de líneas de producto, sin subtotales ni conciliación."""
+    return (
+        XLSX_WRITER == 'direct'
+        and hasattr(GeneratorClass, 'DETAIL_COLUMNS')
+        and not any(opciones_data.get(key) for key in STREAMING_OPTIONS_UNSUPPORTED)
+    )
+
+def compact_requested() -> bool:
+    """Modo compacto (ver xlsx_compact.py): ``?compacto=1`` o ``0``; sin el parámetro, XLSX_COMPACT"""
+    value = request.args.get('compacto')
+    if value is None:
+        return XLSX_COMPACT
+    return value.strip().lower() in ('1', 'true', 'si', 'sí')
+
+def compact_workbook(source: BinaryIO, target: BinaryIO, tipo_gestion: str) -> BinaryIO:
+    """Escribe en ``target`` la versión compacta del libro ``source`` y lo deja listo para enviar"""
+    source.seek(0)
+    with stage_timer('compact', tipo_gestion):
+        compact_xlsx(source, target)
+    target.seek(0)
+    return target
+
+def build_workbook(GeneratorClass, tipo_gestion: str, form_data: Dict[str, Any], list_data: List[Dict[str, Any]],
+                   totales_data: Dict[str, Any], usuario_data: Dict[str, Any], opciones_data: Dict[str, Any],
+                   compact: bool = False):
+    """Genera el libro en memoria y devuelve el generador y el buffer listo para enviar."""
+    output_buffer = io.BytesIO()
+    if uses_direct_writer(GeneratorClass, opciones_data):
+        # Reportes de líneas de producto: escritor SpreadsheetML directo (ver xlsx_writer.py)
+        generator = GeneratorClass(None, form_data, list_data, data=totales_data, usuario_data=usuario_data, options=opciones_data)
+        with StreamingLineItemExport(generator) as export:
+            with stage_timer('generate', tipo_gestion):
+                export.ingest_rows(list_data)
+            with stage_timer('serialize', tipo_gestion):
+                # En modo compacto el ZIP se vuelve a comprimir: aquí basta el nivel más rápido
+                export.write(output_buffer, compresslevel=1 if compact else None)
+        if compact:
+            return generator, compact_workbook(output_buffer, io.BytesIO(), tipo_gestion)
+        output_buffer.seek(0)
+        return generator, output_buffer
+
+    writer = pd.ExcelWriter(output_buffer, engine='openpyxl')
+    try:
+        with stage_timer('generate', tipo_gestion):
+            generator = GeneratorClass(writer, form_data, list_data, data=totales_data, usuario_data=usuario_data, options=opciones_data)
+            generator.generate()
+    finally:
+        # Guardar el libro es la etapa de serialización (XML + ZIP)
+        with stage_timer('serialize', tipo_gestion):
+            writer.close()
+    if compact:
+        return generator, compact_workbook(output_buffer, io.BytesIO(), tipo_gestion)
+    output_buffer.seek(0)
+    return generator, output_buffer
+
+def write_streaming_workbook(export: StreamingLineItemExport, tipo_gestion: str, compact: bool) -> BinaryIO:
+    """
+    Segunda pasada del streaming a un archivo temporal listo para enviar. Si algo
+    falla se cierran el archivo temporal de la exportación y los del libro.
+    """
+    output_file = tempfile.TemporaryFile()
+    try:
+        with stage_timer('generate', tipo_gestion):
+            export.write(output_file, compresslevel=1 if compact else None)
+        if not compact:
+            output_file.seek(0)
+            return output_file
+        # El libro intermedio se cierra siempre; el compacto solo si falla la compactación
+        with output_file:
+            compact_file = tempfile.TemporaryFile()
+            try:
+                return compact_workbook(output_file, compact_file, tipo_gestion)
+            except BaseException:
+                compact_file.close()
+                raise
+    except BaseException:
+        output_file.close()
+        raise
+    finally:
+        export.close()
+
+def export_xlsx_stream():
+    """
+    Exportación en streaming (Content-Type: application/x-ndjson): la primera línea
+    es el encabezado (tipo, form, usuario, totales, opciones) y cada línea siguiente
+    un producto. La memoria no crece con la cantidad de filas.
+    """
+    lines = iter_lines(request.stream)
+    try:
+        header_line = next(lines, None)
+        if header_line is None:
+            raise StreamingExportError("El cuerpo está vacío.", 1)
+        header = parse_line(header_line, 1)
+        tipo_gestion = header.get('tipo') if isinstance(header, dict) else None
+        GeneratorClass = REPORT_GENERATORS.get(tipo_gestion)
+        if GeneratorClass is None or not hasattr(GeneratorClass, 'DETAIL_COLUMNS'):
+            return jsonify({"error": f"Tipo de reporte no válido para streaming: {tipo_gestion}"}), 400
+
+        header_validator, row_validator = ndjson_validators(tipo_gestion)
+        error = next(header_validator.iter_errors(header), None)
+        if error is not None:
+            raise StreamingExportError(error.message, 1)
+        opciones_data = header.get('opciones', {})
+        unsupported = [key for key in STREAMING_OPTIONS_UNSUPPORTED if opciones_data.get(key)]
+        if unsupported:
+            return jsonify({"error": f"Opciones no disponibles en streaming: {', '.join(unsupported)}"}), 400
+
+        generator = GeneratorClass(None, header['form'], [], data=header.get('totales', {}),
+                                   usuario_data=header.get('usuario', {}), options=opciones_data)
+        export = StreamingLineItemExport(generator)
+        try:
+            with stage_timer('ingest', tipo_gestion):
+                export.ingest(lines, row_validator)
+        except BaseException:
+            export.close()
+            raise
+    except StreamingExportError as e:
+        app.logger.warning(f"NDJSON inválido en la línea {e.line}: {e.message}")
+        return jsonify({"error": "Invalid NDJSON", "message": e.message, "line": e.line}), 400
+
+    output_file = None
+    try:
+        output_file = run_cpu_bound(write_streaming_workbook, export, tipo_gestion, compact_requested())
+        EXPORT_ROWS.inc(export.size, tipo=tipo_gestion)
+        response = send_file(
+            output_file,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=generator.get_filename()
+        )
+        return release_after_send(response, export.size)
+    except Exception as e:
+        if output_file is not None:
+            output_file.close()
+        app.logger.error(f"Error al exportar a XLSX en streaming: {e}")
+        return jsonify({"error": f"Ocurrió un error interno: {str(e)}"}), 500
+
+def record_price_history(generator: PreciosReportGenerator):
+    """Guarda los precios de la comparación en el historial sin interrumpir la exportación."""
+    try:
+        get_price_history().record_comparison(
+            generator.marcas, generator.list_data, cliente=generator.cliente, usuario=generator.usuario
+        )
+    except (sqlite3.Error, OSError) as e:
+        # OSError: PRICE_HISTORY_DB en una ruta que no se puede crear o escribir
+        app.logger.error(f"Error al registrar el historial de precios: {e}")
+
+
+@app.route('/api/precios/historial', methods=['GET'])
+def price_history_trend():
+    """
+    Tendencia de precios de un producto por marca en los últimos N días.
+    Parámetros: codigo, marca (repetible) y dias (por defecto 90).
+    """
+    codigo = request.args.get('codigo')
+    marcas = request.args.getlist('marca')
+    if not codigo or not marcas:
+        return jsonify({"error": "Se requieren 'codigo' y al menos una 'marca'."}), 400
+    dias = request.args.get('dias', 90, type=int)
+    tendencias = run_cpu_bound(get_price_history().compare_trend, codigo, marcas, dias)
+    return api_response({"codigo": codigo, "dias": dias, "tendencias": tendencias})
+
+
+@app.route('/api/precios/alertas', methods=['GET'])
+def price_history_alerts():
+    """
+    Productos cuya marca base supera al competidor más barato en más de 'umbral' %.
+    Parámetros: umbral (por defecto 10), dias (por defecto 90) y limite (por defecto 500).
+    """
+    umbral = request.args.get('umbral', 10.0, type=float)
+    dias = request.args.get('dias', 90, type=int)
+    limite = request.args.get('limite', 500, type=int)
+    productos = run_cpu_bound(get_price_history().base_above_cheapest, umbral, dias, limite)
+    return api_response({"umbral": umbral, "dias": dias, "productos": productos})
+
 @app.route('/api/catalog', methods=['GET'])
+@limit_concurrency('upstream')
 def get_catalog():
     """
-    Endpoint para obtener el catálogo desde Google Drive.
+    Endpoint para obtener el catálogo desde Google Drive (con caché en memoria).
+    Con ``?normalizado=1`` responde los productos ya normalizados y con sus
+    ``tokens`` de búsqueda (ver catalog_ingest.py).
     """
     try:
-        catalog_url = "https://drive.google.com/uc?export=download&id=1zAaJnJxsmgw55-W5QNQfcD3dVlnU4lUx"
-        response = requests.get(catalog_url)
-        response.raise_for_status()
-        return jsonify(response.json()), response.status_code
+        # El cuerpo se serializa (y comprime) una vez por versión del catálogo
+        mimetype = response_mimetype()
+        encoding = negotiate_encoding(request)
+        normalized = request.args.get('normalizado', '').strip().lower() in ('1', 'true', 'si', 'sí')
+        version, body = catalog_cache.encoded(mimetype, encoding, normalized=normalized)
+        response = Response(body, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept')
+        response.vary.add('Accept-Encoding')
+        variant = 'normalizado-' if normalized else ''
+        response.set_etag(f"{version}-{variant}{mimetype.split('/')[-1]}-{encoding or 'identity'}")
+        return response.make_conditional(request)
+    except requests.exceptions.RequestException as e:
+        app.logger.error(f"Error fetching catalog: {e}")
+        return jsonify({"error": "No se pudo obtener el catálogo desde Google Drive."}), 503
+
+@app.route('/api/catalog/stats', methods=['GET'])
+@limit_concurrency('upstream')
+def get_catalog_stats():
+    """
+    Estadísticas del catálogo (validación, duplicados y resumen por línea), calculadas una vez por versión.
+    """
+    try:
+        ingested = catalog_cache.ingested()
     except requests.exceptions.RequestException as e:
         app.logger.error(f"Error fetching catalog: {e}")
         return jsonify({"error": "No se pudo obtener el catálogo desde Google Drive."}), 503
+    response = api_response(ingested.stats)
+    response.set_etag(f"{ingested.version}-stats-{response.mimetype.split('/')[-1]}")
+    return response.make_conditional(request)
+
+@app.route('/debug/profiles', methods=['GET'])
+def debug_profiles():
+    """
+    Lista los perfiles guardados (requiere la cabecera X-Profile con el token de administración).
+    """
+    if not is_admin(request.headers.get(PROFILE_HEADER)):
+        return jsonify({"error": "No encontrado."}), 404
+    return jsonify({"perfiles": list_profiles()})
+
+@app.route('/debug/profiles/<name>', methods=['GET'])
+def debug_profile_download(name):
+    """
+    Descarga un .prof para analizarlo con `snakeviz <archivo>.prof`.
+    """
+    path = profile_path(name)
+    if not is_admin(request.headers.get(PROFILE_HEADER)) or path is None:
+        return jsonify({"error": "No encontrado."}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=f"{name}.prof")
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Métricas del proceso en formato de texto de Prometheus.
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """
+    Liveness: responde de inmediato si el proceso atiende peticiones.
+    """
+    return Response(LIVENESS_BODY, mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """
+    Readiness: esquemas, pool de CPU, catálogo, circuitos y carga (503 si no está listo).
+    """
+    body, status = readiness_probe.check()
+    return Response(body, status=status, mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+@app.route('/api/session/sync', methods=['POST'])
+def session_sync():
+    """
+    Renueva (o crea) la sesión del frontend en el almacén en memoria con TTL.
+    """
+    data = request_payload() or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Se esperaba un objeto JSON."}), 400
+    session_id = request.headers.get('X-Session-Id') or data.get('sessionId')
+    return api_response(session_store.sync(session_id, data.get('sessionTime'), data.get('source')))
+
+@app.route('/api/drafts', methods=['POST'])
+@validate_with_schema()
+def create_draft():
+    """
+    Crea un borrador nuevo (siempre con un id nuevo) con el payload completo de exportación.
+    """
+    return save_draft(None)
+
+@app.route('/api/drafts/<draft_id>', methods=['PUT'])
+@validate_with_schema()
+def replace_draft(draft_id):
+    """
+    Reemplaza el borrador con el payload completo; requiere ``?version=n`` igual a la actual (409 si cambió).
+    """
+    return save_draft(draft_id, request.args.get('version', type=int))
+
+def save_draft(draft_id: Optional[str], version: Optional[int] = None):
+    data = request_payload()
+    if not isinstance(data, dict) or 'draftId' in data:
+        # validate_with_schema no valida los cuerpos con draftId (son exportaciones de un borrador)
+        return jsonify({"error": "Se esperaba el payload completo de exportación, sin 'draftId'."}), 400
+    try:
+        draft = run_cpu_bound(get_draft_store().put, data, draft_id, version)
+    except DraftError as e:
+        return jsonify({"error": e.message}), e.status
+    return api_response(draft.summary(), 201 if draft_id is None else 200)
+
+@app.route('/api/drafts/<draft_id>', methods=['GET', 'PATCH', 'DELETE'])
+def draft_detail(draft_id):
+    """
+    GET: payload completo del borrador. PATCH: {"version": n, "ops": [...]} (ver drafts.py). DELETE: lo elimina.
+    """
+    store = get_draft_store()
+    try:
+        if request.method == 'GET':
+            draft = store.get(draft_id)
+            return api_response({**draft.summary(), "payload": draft.payload()})
+        if request.method == 'DELETE':
+            store.delete(draft_id)
+            return Response(status=204)
+        data = request_payload()
+        if not isinstance(data, dict):
+            return jsonify({"error": "Se esperaba un objeto JSON."}), 400
+        draft = run_cpu_bound(store.patch, draft_id, data.get('ops'), data.get('version'))
+        return api_response(draft.summary())
+    except DraftError as e:
+        return jsonify({"error": e.message}), e.status
+
+@app.route('/api/export/status', methods=['GET'])
+def export_status():
+    """
+    Carga actual de exportaciones: celdas en curso frente al presupuesto, cola y throughput.
+    """
+    return api_response(EXPORT_ADMISSION.status())
 
 # --- 6. Bloque de Ejecución Principal ---
 if __name__ == '__main__':
@@ -231,5 +701,9 @@ if __name__ == '__main__':
     parser.add_argument('--port', type=int, default=5001, help='The port to run the web server on.')
     args = parser.parse_args()
 
+    # Calentamiento en segundo plano (esquemas, catálogo); /api/health/ready lo refleja
+    threading.Thread(target=warm_up, daemon=True).start()
+
     # La ejecución en modo debug es útil durante el desarrollo.
+    # En producción: python -m backend serve (gevent o gunicorn, ver backend/__main__.py)
     app.run(debug=True, port=args.port)
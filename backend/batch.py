@@ -0,0 +1,286 @@
+"""
+Generación de reportes por lotes, sin pasar por HTTP.
+
+    python -m backend.batch ENTRADA --output DIR [--workers N] [--retry-failed] [--no-resume]
+
+``ENTRADA`` es un directorio con un payload por archivo ``*.json`` o un
+archivo NDJSON con un payload de ``/export-xlsx`` por línea. Cada payload se
+valida con los mismos esquemas que la API (``VALIDATION_BACKEND``) y se
+genera con el generador de ``REPORT_GENERATORS`` de su ``tipo``, repartido
+en un pool de procesos (por defecto uno por núcleo). El libro se guarda en
+``DIR`` con el nombre de ``get_filename()``; si ya existe se agrega un sufijo
+``_2``, ``_3``...
+
+El avance se registra en ``DIR/.batch_progress.jsonl`` a medida que termina
+cada payload, así que una corrida interrumpida se retoma sin regenerar lo ya
+hecho (los fallidos se reintentan con ``--retry-failed``). Al final se
+imprime y guarda en ``DIR/batch_summary.json`` el resumen de toda la entrada,
+incluidos los resultados de corridas anteriores: ok, inválidos, errores y
+pendientes, los fallos con su motivo y los reportes y filas por segundo de
+esta corrida. El código de salida es 1 mientras quede algún payload
+inválido, con error o sin procesar. El historial de precios no se
+actualiza, porque son payloads ya exportados.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+PROGRESS_FILE = ".batch_progress.jsonl"
+SUMMARY_FILE = "batch_summary.json"
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+PROGRESS_EVERY_SECONDS = 5.0
+MAX_FAILURES_LISTED = 50
+
+OK = "ok"
+INVALID = "invalido"
+ERROR = "error"
+
+# (id, ruta, desplazamiento en bytes de la línea NDJSON o None para un archivo JSON completo)
+Job = Tuple[str, str, Optional[int]]
+
+
+def collect_jobs(source: str) -> List[Job]:
+    """Payloads de un directorio (*.json, en orden) o de un archivo NDJSON (uno por línea no vacía)"""
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.endswith(".json"))
+        return [(name, os.path.join(source, name), None) for name in names]
+    if not source.endswith(NDJSON_SUFFIXES):
+        raise ValueError(f"Se espera un directorio o un archivo {'/'.join(NDJSON_SUFFIXES)}: {source}")
+    jobs = []
+    name = os.path.basename(source)
+    offset = 0
+    with open(source, "rb") as file:
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                jobs.append((f"{name}:{line_number}", source, offset))
+            offset += len(line)
+    return jobs
+
+
+def load_payload(path: str, offset: Optional[int]) -> Any:
+    with open(path, "rb") as file:
+        if offset is None:
+            return json.loads(file.read())
+        file.seek(offset)
+        return json.loads(file.readline())
+
+
+def write_unique(output_dir: str, filename: str, content: bytes) -> str:
+    """Escribe ``content`` con ``filename`` sin pisar archivos existentes; devuelve el nombre usado"""
+    stem, ext = os.path.splitext(filename)
+    temp_path = os.path.join(output_dir, f".{stem}.{os.getpid()}.part")
+    with open(temp_path, "wb") as file:
+        file.write(content)
+    try:
+        suffix = 1
+        while True:
+            name = filename if suffix == 1 else f"{stem}_{suffix}{ext}"
+            try:
+                # link() falla si el destino existe: reserva el nombre de forma atómica entre procesos
+                os.link(temp_path, os.path.join(output_dir, name))
+                return name
+            except FileExistsError:
+                suffix += 1
+    finally:
+        os.remove(temp_path)
+
+
+def init_worker():
+    """Compila los esquemas una vez por proceso (la aplicación se importa en el primer run_job)"""
+    from .validation import compile_schemas
+    compile_schemas()
+
+
+def run_job(job: Job, output_dir: str) -> Dict[str, Any]:
+    """Valida, genera y escribe un payload; nunca lanza, el resultado indica el estado"""
+    from .app import REPORT_GENERATORS, build_workbook, with_catalog
+    from .report_generators.xlsx_compact import XLSX_COMPACT
+    from .validation import PAYLOAD_ERRORS, validate_payload, validation_error_message
+
+    job_id, path, offset = job
+    started_at = time.perf_counter()
+    result: Dict[str, Any] = {"id": job_id, "estado": ERROR, "filas": 0}
+    try:
+        try:
+            data = load_payload(path, offset)
+        except (OSError, ValueError) as e:
+            return {**result, "estado": INVALID, "error": f"No se pudo leer el payload: {e}"}
+        if not isinstance(data, dict) or "tipo" not in data:
+            return {**result, "estado": INVALID, "error": "Falta 'tipo' en el payload"}
+        tipo = str(data["tipo"])
+        result["tipo"] = tipo
+        GeneratorClass = REPORT_GENERATORS.get(tipo)
+        if GeneratorClass is None:
+            return {**result, "estado": INVALID, "error": f"Tipo de reporte no válido: {tipo}"}
+        try:
+            model = validate_payload(tipo, data)
+        except FileNotFoundError:
+            return {**result, "estado": INVALID, "error": f"Schema '{tipo}.schema.json' not found."}
+        except PAYLOAD_ERRORS as e:
+            return {**result, "estado": INVALID, "error": validation_error_message(e)}
+
+        form_data, list_data, usuario_data = data.get("form", {}), data.get("list", []), data.get("usuario", {})
+        if model is not None:
+            form_data, list_data, usuario_data = model.form, model.list, model.usuario
+        opciones_data = with_catalog(data.get("opciones", {}))
+        generator, buffer = build_workbook(
+            GeneratorClass, tipo, form_data, list_data, data.get("totales", {}), usuario_data, opciones_data,
+            compact=XLSX_COMPACT,
+        )
+        content = buffer.getvalue()
+        result.update(
+            estado=OK,
+            archivo=write_unique(output_dir, generator.get_filename(), content),
+            filas=len(list_data),
+            bytes=len(content),
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["segundos"] = round(time.perf_counter() - started_at, 3)
+    return result
+
+
+class ProgressJournal:
+    """Registro append-only (JSON por línea) de los payloads terminados"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.results: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea truncada por una interrupción
+                        continue
+                    self.results[entry["id"]] = entry
+        self._file = open(path, "a", encoding="utf-8")
+
+    def completed(self, retry_failed: bool) -> Set[str]:
+        return {job_id for job_id, entry in self.results.items() if entry["estado"] == OK or not retry_failed}
+
+    def append(self, result: Dict[str, Any]):
+        self.results[result["id"]] = result
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run_pool(jobs: List[Job], output_dir: str, workers: int) -> Iterator[Dict[str, Any]]:
+    """Resultados a medida que terminan; a lo sumo 2 trabajos en cola por proceso para acotar memoria"""
+    pending_jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        in_flight = set()
+        for job in pending_jobs:
+            in_flight.add(executor.submit(run_job, job, output_dir))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                job = next(pending_jobs, None)
+                if job is not None:
+                    in_flight.add(executor.submit(run_job, job, output_dir))
+
+
+def summarize(results: List[Dict[str, Any]], final: List[Dict[str, Any]], skipped: int, total: int, workers: int,
+              elapsed: float) -> Dict[str, Any]:
+    """
+    Resumen de la entrada completa: ``final`` es el último resultado de cada
+    payload (de esta corrida o de las anteriores, según el registro de avance).
+    Tiempos y velocidades son solo de esta corrida (``results``).
+    """
+    ok = [r for r in final if r["estado"] == OK]
+    failures = [r for r in final if r["estado"] != OK]
+    run_rows = sum(r["filas"] for r in results if r["estado"] == OK)
+    return {
+        "total": total,
+        "procesados": len(results),
+        "omitidos": skipped,
+        "pendientes": total - len(final),
+        "ok": len(ok),
+        "invalidos": sum(1 for r in failures if r["estado"] == INVALID),
+        "errores": sum(1 for r in failures if r["estado"] == ERROR),
+        "workers": workers,
+        "segundos": round(elapsed, 2),
+        "reportesPorSegundo": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "filasPorSegundo": round(run_rows / elapsed) if elapsed else 0,
+        "filas": sum(r["filas"] for r in ok),
+        "bytes": sum(r.get("bytes", 0) for r in ok),
+        "fallos": [{"id": r["id"], "estado": r["estado"], "error": r.get("error")} for r in failures[:MAX_FAILURES_LISTED]],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend.batch", description="Genera reportes XLSX por lotes desde payloads archivados.")
+    parser.add_argument("source", metavar="ENTRADA", help="Directorio con *.json o archivo NDJSON (un payload por línea).")
+    parser.add_argument("--output", "-o", required=True, help="Directorio de salida de los XLSX y del avance.")
+    parser.add_argument("--workers", "-j", type=int, default=os.cpu_count() or 1, help="Procesos (por defecto, uno por núcleo).")
+    parser.add_argument("--retry-failed", action="store_true", help="Reintenta los payloads que fallaron en corridas anteriores.")
+    parser.add_argument("--no-resume", action="store_true", help="Ignora el avance guardado y procesa todo de nuevo.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Los workers heredan el entorno: sin logs por payload salvo advertencias
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    try:
+        jobs = collect_jobs(args.source)
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+    os.makedirs(args.output, exist_ok=True)
+
+    progress_path = os.path.join(args.output, PROGRESS_FILE)
+    if args.no_resume and os.path.exists(progress_path):
+        os.remove(progress_path)
+    journal = ProgressJournal(progress_path)
+    completed = journal.completed(args.retry_failed)
+    pending = [job for job in jobs if job[0] not in completed]
+    skipped = len(jobs) - len(pending)
+    workers = max(1, min(args.workers, len(pending) or 1))
+    print(f"{len(jobs)} payloads: {len(pending)} pendientes, {skipped} ya procesados; {workers} procesos", file=sys.stderr)
+
+    results: List[Dict[str, Any]] = []
+    started_at = last_report = time.perf_counter()
+    try:
+        for result in run_pool(pending, args.output, workers):
+            journal.append(result)
+            results.append(result)
+            if result["estado"] != OK:
+                print(f"  {result['id']}: {result['estado']} - {result.get('error')}", file=sys.stderr)
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_EVERY_SECONDS:
+                last_report = now
+                print(f"  {len(results)}/{len(pending)} ({len(results) / (now - started_at):.1f} reportes/s)", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrumpido: el avance quedó guardado, vuelve a ejecutar el comando para continuar.", file=sys.stderr)
+    finally:
+        journal.close()
+
+    # Resultados anteriores del mismo directorio (retomados o no reintentados) más los de esta corrida
+    final = [journal.results[job[0]] for job in jobs if job[0] in journal.results]
+    summary = summarize(results, final, skipped, len(jobs), workers, time.perf_counter() - started_at)
+    with open(os.path.join(args.output, SUMMARY_FILE), "w", encoding="utf-8") as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    print(
+        f"{summary['ok']} ok, {summary['invalidos']} inválidos, {summary['errores']} errores, {summary['pendientes']} pendientes "
+        f"de {summary['total']}; esta corrida: {summary['procesados']} en {summary['segundos']} s "
+        f"({summary['reportesPorSegundo']} reportes/s, {summary['filasPorSegundo']} filas/s, {workers} procesos)",
+        file=sys.stderr,
+    )
+    # Falla mientras quede algún payload inválido, con error o sin procesar, aunque sea de una corrida anterior
+    sys.exit(1 if summary["invalidos"] or summary["errores"] or summary["pendientes"] else 0)
+
+
+if __name__ == "__main__":
+    main()
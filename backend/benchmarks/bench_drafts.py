@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de exportaciones repetidas con borradores (``backend/drafts.py``).
+
+Para cada tamaño de lista compara, vía el test client de Flask, dos formas
+de exportar de nuevo tras cambiar la cantidad de un producto:
+
+* ``cuerpo completo``: ``POST /export-xlsx`` con toda la lista (como hoy).
+* ``borrador``: ``PATCH /api/drafts/<id>`` con el cambio y
+  ``POST /export-xlsx`` con ``{"draftId": ...}``.
+
+Reporta los bytes subidos y el tiempo hasta tener el payload listo para
+generar (parseo + validación, o PATCH), y verifica que ambos caminos
+produzcan el mismo libro. Uso:
+
+    python -m backend.benchmarks.bench_drafts [--sizes 1000 10000] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DRAFTS_DB", os.path.join(tempfile.mkdtemp(prefix="drafts-bench-"), "drafts.sqlite3"))
+os.environ.setdefault("PRICE_HISTORY_DB", os.path.join(os.path.dirname(os.environ["DRAFTS_DB"]), "price_history.sqlite3"))
+
+import orjson  # noqa: E402
+from openpyxl import load_workbook  # noqa: E402
+
+from backend.app import app  # noqa: E402
+from backend.benchmarks.payloads import make_payload  # noqa: E402
+from backend.serialization import dumps_bytes  # noqa: E402
+from backend.validation import validate_payload  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+
+def unique_codes(payload):
+    """Los payloads sintéticos repiten el catálogo; el borrador identifica los productos por código"""
+    seen = {}
+    for item in payload["list"]:
+        count = seen.get(item["codigo"], 0)
+        seen[item["codigo"]] = count + 1
+        if count:
+            item["codigo"] = f"{item['codigo']}-{count}"
+    return payload
+
+
+def sheet_values(content: bytes):
+    workbook = load_workbook(io.BytesIO(content))
+    return [[cell.value for cell in row] for sheet in workbook.worksheets for row in sheet.iter_rows()]
+
+
+def best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de exportaciones repetidas con borradores.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    client = app.test_client()
+    ok = True
+
+    print(f"{'tipo':<10} {'filas':>7} {'cuerpo bytes':>13} {'parseo+valid. ms':>17} {'PATCH bytes':>12} {'PATCH ms':>9} {'export cuerpo ms':>17} {'export borrador ms':>19}")
+    for size in args.sizes:
+        for tipo in ("pedido", "inventario"):
+            payload = unique_codes(make_payload(tipo, size))
+            body = dumps_bytes(payload)
+            response = client.post("/api/drafts", data=body, content_type="application/json")
+            assert response.status_code == 201, response.get_data(as_text=True)
+            draft_id = response.get_json()["draftId"]
+
+            codigo = payload["list"][size // 2]["codigo"]
+            quantity = iter(range(1, 10 ** 9))
+
+            def patch():
+                value = next(quantity)
+                patch_body = dumps_bytes({"ops": [{"op": "replace", "path": f"/list/{codigo}/cantidad", "value": value}]})
+                response = client.patch(f"/api/drafts/{draft_id}", data=patch_body, content_type="application/json")
+                assert response.status_code == 200, response.get_data(as_text=True)
+                payload["list"][size // 2]["cantidad"] = value
+                return patch_body
+
+            patch_bytes = len(patch())
+            t_validate = best_ms(lambda: validate_payload(tipo, orjson.loads(body)), args.repeat)
+            t_patch = best_ms(patch, args.repeat)
+
+            full = client.post("/export-xlsx", data=dumps_bytes(payload), content_type="application/json")
+            by_draft = client.post("/export-xlsx", data=dumps_bytes({"draftId": draft_id}), content_type="application/json")
+            if full.status_code != 200 or by_draft.status_code != 200 or sheet_values(full.data) != sheet_values(by_draft.data):
+                print(f"  {tipo} {size}: el libro del borrador difiere del cuerpo completo", file=sys.stderr)
+                ok = False
+            t_export_full = best_ms(lambda: client.post("/export-xlsx", data=dumps_bytes(payload), content_type="application/json"), 1)
+            t_export_draft = best_ms(lambda: client.post("/export-xlsx", data=dumps_bytes({"draftId": draft_id}), content_type="application/json"), 1)
+            print(f"{tipo:<10} {size:>7} {len(body):>13} {t_validate:>17.1f} {patch_bytes:>12} {t_patch:>9.2f} {t_export_full:>17.1f} {t_export_draft:>19.1f}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del pipeline de exportación completo (/export-xlsx vía el test client de Flask).
+
+Para cada ``tipo`` y tamaño mide tiempo de pared, memoria pico (tracemalloc),
+tamaño del archivo y celdas/segundo, y guarda los resultados en JSON para
+comparar entre commits. Uso:
+
+    python -m backend.benchmarks.bench_export [--sizes 100 1000 10000 50000] [--tipos pedido precios] [--repeat 3]
+    python -m backend.benchmarks.bench_export --ndjson --tipos inventario pedido devoluciones
+    python -m backend.benchmarks.bench_export --compare results/antes.json results/despues.json
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, List
+
+# El historial de precios de las corridas no debe mezclarse con el real
+os.environ.setdefault("PRICE_HISTORY_DB", os.path.join(tempfile.gettempdir(), "bench_price_history.sqlite3"))
+
+from backend.app import app
+from backend.benchmarks.payloads import TIPOS, make_payload, to_ndjson
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 50_000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+_CELL_RE = re.compile(rb"<c ")
+
+
+def count_cells(xlsx_bytes: bytes) -> int:
+    """Cuenta las celdas escritas en todas las hojas del archivo"""
+    with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as archive:
+        return sum(
+            len(_CELL_RE.findall(archive.read(name)))
+            for name in archive.namelist()
+            if name.startswith("xl/worksheets/sheet")
+        )
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def run_case(client, tipo: str, size: int, repeat: int, ndjson: bool = False) -> Dict[str, Any]:
+    payload = make_payload(tipo, size)
+    if ndjson:
+        body, content_type = to_ndjson(payload), "application/x-ndjson"
+    else:
+        body, content_type = json.dumps(payload), "application/json"
+    del payload
+    times: List[float] = []
+    peak = 0
+    response_data = b""
+    for i in range(repeat):
+        # La memoria pico se mide en una corrida aparte: tracemalloc ralentiza la ejecución
+        trace = i == 0
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        response = client.post("/export-xlsx", data=body, content_type=content_type)
+        elapsed = time.perf_counter() - start
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            times.append(elapsed)
+        if response.status_code != 200:
+            raise RuntimeError(f"{tipo}/{size}: HTTP {response.status_code} {response.data[:200]!r}")
+        response_data = response.data
+
+    cells = count_cells(response_data)
+    best = min(times)
+    return {
+        "tipo": tipo,
+        "formato": "ndjson" if ndjson else "json",
+        "filas": size,
+        "tiempo_s": round(best, 4),
+        "tiempo_mediana_s": round(sorted(times)[len(times) // 2], 4),
+        "memoria_pico_mb": round(peak / 2**20, 2),
+        "bytes_salida": len(response_data),
+        "bytes_entrada": len(body),
+        "celdas": cells,
+        "celdas_por_s": round(cells / best) if best else None,
+    }
+
+
+def run(sizes: List[int], tipos: List[str], repeat: int, ndjson: bool = False) -> Dict[str, Any]:
+    client = app.test_client()
+    results = []
+    for tipo in tipos:
+        for size in sizes:
+            result = run_case(client, tipo, size, repeat, ndjson)
+            results.append(result)
+            print(
+                f"{tipo:>13} {size:>7} {result['tiempo_s']:>9.3f}s {result['memoria_pico_mb']:>9.1f}MB "
+                f"{result['bytes_salida'] / 1024:>9.1f}KB {result['celdas_por_s'] or 0:>10,} celdas/s",
+                flush=True,
+            )
+    return {
+        "revision": git_revision(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "repeticiones": repeat,
+        "resultados": results,
+    }
+
+
+def compare(before_path: str, after_path: str):
+    """Imprime la variación de tiempo, memoria y tamaño entre dos corridas"""
+    with open(before_path) as f:
+        before = {(r["tipo"], r["filas"]): r for r in json.load(f)["resultados"]}
+    with open(after_path) as f:
+        after = json.load(f)["resultados"]
+
+    print(f"{'tipo':>13} {'filas':>7} {'tiempo':>9} {'memoria':>9} {'tamaño':>9}")
+    for r in after:
+        b = before.get((r["tipo"], r["filas"]))
+        if not b:
+            continue
+        delta = lambda key: f"{(r[key] / b[key] - 1) * 100:+.1f}%" if b[key] else "n/a"
+        print(f"{r['tipo']:>13} {r['filas']:>7} {delta('tiempo_s'):>9} {delta('memoria_pico_mb'):>9} {delta('bytes_salida'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de exportación XLSX.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS, default=TIPOS)
+    parser.add_argument("--repeat", type=int, default=3, help="Corridas por caso (la primera mide memoria)")
+    parser.add_argument("--ndjson", action="store_true", help="Envía el cuerpo en NDJSON (exportación en streaming)")
+    parser.add_argument("--output", help="Ruta del JSON de resultados (por defecto results/<revision>-<fecha>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="Compara dos archivos de resultados")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Evita que el registro de cada petición domine la salida del benchmark
+    logging.getLogger().setLevel(logging.WARNING)
+    app.logger.setLevel(logging.WARNING)
+
+    report = run(args.sizes, args.tipos, max(args.repeat, 2), args.ndjson)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['revision']}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
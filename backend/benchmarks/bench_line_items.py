@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la etapa de cálculo de líneas (cajas, peso total, valor total).
+
+Compara el bucle por ítem que usaban los generadores con ``LineItemTable``
+para 1k / 10k / 100k líneas. Uso:
+
+    python -m backend.benchmarks.bench_line_items [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from backend.report_generators.line_items import LineItemTable
+from backend.report_generators.base_generator import BaseReportGenerator
+from backend.benchmarks.payloads import make_items
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def legacy_rows(list_data: List[Dict[str, Any]], normalize: Callable[[Any], Any]) -> List[list]:
+    """Réplica del bucle por ítem previo a LineItemTable (hoja de pedido)"""
+    rows = []
+    for item in list_data:
+        cantidad = float(item.get("cantidad", 0))
+        u_por_caja = float(item.get("cantidad_por_caja", 0))
+        precio = float(item.get("precio_referencial", 0))
+        peso_unidad = float(item.get("peso", 0))
+        rows.append([
+            normalize(item.get("codigo")), normalize(item.get("cod_ean")),
+            normalize(item.get("ean_14")), normalize(item.get("nombre")),
+            cantidad, round(cantidad / u_por_caja if u_por_caja != 0 else 0, 2),
+            precio, round(cantidad * precio, 2), normalize(item.get("linea")),
+            round(cantidad * peso_unidad, 2), normalize(item.get("observaciones")),
+        ])
+    return rows
+
+
+def table_rows(list_data: List[Dict[str, Any]], normalize: Callable[[Any], Any]) -> List[tuple]:
+    table = LineItemTable(list_data, normalize)
+    return table.rows([
+        "codigo", "cod_ean", "ean_14", "nombre", "cantidad", "cajas",
+        "precio_referencial", "valor_total", "linea", "peso_total", "observaciones",
+    ])
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la etapa de cálculo de líneas.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # _normalize_value no depende del estado del generador; basta una instancia sin inicializar
+    normalize = BaseReportGenerator.__new__(BaseReportGenerator)._normalize_value
+
+    print(f"{'líneas':>10} {'bucle (ms)':>12} {'tabla (ms)':>12} {'speedup':>8}")
+    for n in args.sizes:
+        items = make_items(n)
+        legacy = best_of(lambda: legacy_rows(items, normalize), args.repeat)
+        columnar = best_of(lambda: table_rows(items, normalize), args.repeat)
+        print(f"{n:>10} {legacy * 1000:>12.1f} {columnar * 1000:>12.1f} {legacy / columnar:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
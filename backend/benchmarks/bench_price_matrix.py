@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del comparativo de precios según la cantidad de marcas.
+
+Para cada combinación de filas y marcas mide el cálculo de KPIs sobre la
+matriz productos × marcas (``PriceMatrix`` + columnas del cuerpo) y la
+generación completa del libro con openpyxl, y reporta microsegundos por
+celda de la matriz para ver que el costo crece con su tamaño. Uso:
+
+    python -m backend.benchmarks.bench_price_matrix [--sizes 1000 10000] [--marcas 5 10 20] [--repeat 3]
+"""
+import argparse
+import io
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+from backend.benchmarks.payloads import make_payload
+from backend.report_generators.precios_generator import PreciosReportGenerator
+from backend.report_generators.price_matrix import PriceMatrix
+
+DEFAULT_SIZES = [1_000, 10_000]
+DEFAULT_MARCAS = [5, 10, 20]
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_workbook(payload) -> bytes:
+    output = io.BytesIO()
+    writer = pd.ExcelWriter(output, engine="openpyxl")
+    PreciosReportGenerator(writer, payload["form"], payload["list"], usuario_data=payload["usuario"]).generate()
+    writer.close()
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del comparativo de precios por cantidad de marcas.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--marcas", type=int, nargs="+", default=DEFAULT_MARCAS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'filas':>7} {'marcas':>7} {'columnas':>9} {'KPIs ms':>9} {'µs/celda KPIs':>14} {'libro s':>8} {'µs/celda libro':>15}")
+    for size in args.sizes:
+        for n_marcas in args.marcas:
+            payload = make_payload("precios", size, n_marcas=n_marcas)
+            generator = PreciosReportGenerator(None, payload["form"], payload["list"])
+            cells = size * len(generator.marcas)
+
+            t_kpis = best_of(lambda: generator._body_columns(PriceMatrix(generator.list_data, generator.marcas)), args.repeat)
+            t_book = best_of(lambda: build_workbook(payload), args.repeat)
+            print(f"{size:>7} {n_marcas:>7} {len(generator._get_normalized_headers()):>9} {t_kpis * 1000:>9.1f} "
+                  f"{t_kpis / cells * 1e6:>14.2f} {t_book:>8.2f} {t_book / cells * 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de los backends de validación (``VALIDATION_BACKEND``).
+
+Para cada tipo y tamaño de lista mide:
+
+* ``jsonschema``: el validador compilado de ``schemas/<tipo>.schema.json``.
+* ``pydantic``: ``TypeAdapter.validate_python`` sobre el dict ya parseado
+  (lo que hace ``validate_with_schema``), devolviendo los modelos tipados.
+* ``pydantic json``: ``TypeAdapter.validate_json`` directo sobre los bytes,
+  parseo incluido, como referencia.
+* ``tabla``: ``LineItemTable`` sobre los modelos en vez de dicts, para ver el
+  costo de entregar objetos tipados a los generadores.
+
+Antes de medir verifica que ambos backends acepten y rechacen los mismos
+payloads (mutaciones inválidas de un ítem); termina con código 1 si no. Uso:
+
+    python -m backend.benchmarks.bench_validation [--sizes 1000 10000] [--repeat 5]
+"""
+import argparse
+import copy
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import orjson
+import pydantic
+from jsonschema import ValidationError
+
+from backend.benchmarks.payloads import TIPOS, make_payload
+from backend.models import export_adapter
+from backend.report_generators.base_generator import BaseReportGenerator
+from backend.report_generators.line_items import LineItemTable
+from backend.validation import schema_validator, validate_instance
+
+DEFAULT_SIZES = [1_000, 10_000]
+
+# (descripción, tipo, función que muta el payload)
+MUTATIONS: List[Tuple[str, str, Callable[[Dict[str, Any]], None]]] = [
+    ("válido", "pedido", lambda p: None),
+    ("cantidad 0", "pedido", lambda p: p["list"][3].update(cantidad=0)),
+    ("cantidad texto", "pedido", lambda p: p["list"][3].update(cantidad="5")),
+    ("cantidad decimal en pedido", "pedido", lambda p: p["list"][3].update(cantidad=1.5)),
+    ("cantidad decimal en inventario", "inventario", lambda p: p["list"][3].update(cantidad=1.5)),
+    ("cantidad booleana", "pedido", lambda p: p["list"][3].update(cantidad=True)),
+    ("código vacío", "pedido", lambda p: p["list"][3].update(codigo="")),
+    ("peso negativo", "devoluciones", lambda p: p["list"][3].update(peso=-1)),
+    ("sin nombre", "devoluciones", lambda p: p["list"][3].pop("nombre")),
+    ("keywords texto", "pedido", lambda p: p["list"][3].update(keywords="a b")),
+    ("precio no numérico", "precios", lambda p: p["list"][3]["precios"].update(BASE="x")),
+    ("u. por caja 0", "pedido", lambda p: p["list"][3].update(cantidad_por_caja=0)),
+    ("u. por caja 0.5 en inventario", "inventario", lambda p: p["list"][3].update(cantidad_por_caja=0.5)),
+    ("observaciones nulas", "pedido", lambda p: p["list"][3].update(observaciones=None)),
+    ("correo numérico", "pedido", lambda p: p["usuario"].update(correo=123)),
+    ("correo sin formato", "pedido", lambda p: p["usuario"].update(correo="sin-arroba")),
+    ("form nulo", "pedido", lambda p: p.update(form=None)),
+    ("cliente numérico", "pedido", lambda p: p["form"].update(cliente=20123)),
+    ("inventario sin totales", "inventario", lambda p: p.pop("totales")),
+    ("campos extra", "pedido", lambda p: p["list"][3].update(extra="x")),
+    ("lista de marcas", "precios", lambda p: p["form"].update(marcas=["BASE", "COMPETIDOR 2"])),
+    ("lista de marcas vacía", "precios", lambda p: p["form"].update(marcas=[])),
+]
+
+
+def accepts_jsonschema(tipo: str, payload: Dict[str, Any]) -> bool:
+    try:
+        validate_instance(schema_validator(tipo), payload)
+    except ValidationError:
+        return False
+    return True
+
+
+def accepts_pydantic(tipo: str, payload: Dict[str, Any]) -> bool:
+    try:
+        export_adapter(tipo).validate_python(payload)
+    except pydantic.ValidationError:
+        return False
+    return True
+
+
+def check_parity() -> bool:
+    ok = True
+    for name, tipo, mutate in MUTATIONS:
+        payload = copy.deepcopy(make_payload(tipo, 10))
+        mutate(payload)
+        expected, actual = accepts_jsonschema(tipo, payload), accepts_pydantic(tipo, payload)
+        ok = ok and expected == actual
+        print(f"  {name:<32} jsonschema={'acepta' if expected else 'rechaza':<8} "
+              f"pydantic={'acepta' if actual else 'rechaza':<8} {'OK' if expected == actual else 'DIFERENTE'}")
+    return ok
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los backends de validación.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("Paridad de aceptación/rechazo:")
+    parity = check_parity()
+
+    # _normalize_value no depende del estado del generador; basta una instancia sin inicializar
+    normalize = BaseReportGenerator.__new__(BaseReportGenerator)._normalize_value
+    print(f"\n{'tipo':>13} {'ítems':>7} {'jsonschema ms':>14} {'pydantic ms':>12} {'x':>6} "
+          f"{'pyd. json ms':>13} {'tabla dicts ms':>15} {'tabla modelos ms':>17}")
+    for tipo in TIPOS:
+        for size in args.sizes:
+            payload = make_payload(tipo, size)
+            body = orjson.dumps(payload)
+            validator, adapter = schema_validator(tipo), export_adapter(tipo)
+            model = adapter.validate_python(payload)
+
+            t_jsonschema = best_of(lambda: validate_instance(validator, payload), args.repeat)
+            t_pydantic = best_of(lambda: adapter.validate_python(payload), args.repeat)
+            t_pydantic_json = best_of(lambda: adapter.validate_json(body), args.repeat)
+            t_dicts = best_of(lambda: LineItemTable(payload["list"], normalize), args.repeat)
+            t_models = best_of(lambda: LineItemTable(model.list, normalize), args.repeat)
+            print(f"{tipo:>13} {size:>7} {t_jsonschema * 1000:>14.1f} {t_pydantic * 1000:>12.1f} "
+                  f"{t_jsonschema / t_pydantic:>6.1f} {t_pydantic_json * 1000:>13.1f} "
+                  f"{t_dicts * 1000:>15.1f} {t_models * 1000:>17.1f}")
+    sys.exit(0 if parity else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Tamaño de los libros exportados con y sin el modo compacto (``xlsx_compact``).
+
+Para cada ``tipo`` y tamaño exporta el mismo payload vía el test client de
+Flask con ``?compacto=0`` y ``?compacto=1`` y reporta bytes, reducción,
+tiempo de generación y tiempo estimado de descarga a ``--mbps`` (una conexión
+móvil). Con ``--levels`` agrega el tamaño compacto con otros niveles de
+compresión del ZIP.
+
+Sirve como prueba de regresión: relee ambos libros con openpyxl y compara
+valores (los números con 15 dígitos significativos), estilos, celdas
+combinadas y anchos (ver ``xlsx_roundtrip.compare``), y termina con código 1
+si hay diferencias o si algún ``tipo`` se reduce menos que ``--min-reduction``.
+Uso:
+
+    python -m backend.benchmarks.bench_xlsx_size [--sizes 100 2000] [--mbps 2] [--levels 1 6 9]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("PRICE_HISTORY_DB", os.path.join(tempfile.mkdtemp(prefix="xlsx-size-"), "price_history.sqlite3"))
+
+import orjson  # noqa: E402
+
+from backend.app import REPORT_GENERATORS, app  # noqa: E402
+from backend.benchmarks.payloads import make_payload  # noqa: E402
+from backend.benchmarks.xlsx_roundtrip import compare  # noqa: E402
+from backend.report_generators.xlsx_compact import compact_xlsx  # noqa: E402
+
+DEFAULT_SIZES = [100, 2000]
+# Excel guarda 15 dígitos significativos; el modo compacto no escribe más
+NUMBER_TOLERANCE = 1e-14
+
+
+def export(client, body: bytes, compact: bool) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    response = client.post(f"/export-xlsx?compacto={int(compact)}", data=body, content_type="application/json")
+    content = response.get_data()
+    response.close()
+    if response.status_code != 200:
+        sys.exit(f"La exportación respondió {response.status_code}: {content[:200]!r}")
+    return content, time.perf_counter() - started
+
+
+def download_seconds(size: int, mbps: float) -> float:
+    return size * 8 / (mbps * 1_000_000)
+
+
+def compact_size(content: bytes, level: int) -> int:
+    output = io.BytesIO()
+    compact_xlsx(io.BytesIO(content), output, compresslevel=level)
+    return len(output.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamaño de los XLSX con y sin el modo compacto, por tipo.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--tipos", nargs="+", default=list(REPORT_GENERATORS), choices=list(REPORT_GENERATORS))
+    parser.add_argument("--mbps", type=float, default=2.0, help="Ancho de banda para estimar la descarga (Mbit/s).")
+    parser.add_argument("--levels", type=int, nargs="*", default=[], help="Niveles de compresión adicionales a medir.")
+    parser.add_argument("--min-reduction", type=float, default=0.25, help="Reducción mínima esperada (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    client = app.test_client()
+    failed = False
+    levels = "".join(f" {f'nivel {level} KB':>12}" for level in args.levels)
+    print(f"{'tipo':>13} {'filas':>7} {'KB':>8} {'compacto KB':>12} {'reducción':>10} "
+          f"{'descarga s':>11} {'compacto s':>11} {'gen ms':>8} {'gen compacto ms':>16}{levels}  resultado")
+    results: Dict[str, List[float]] = {}
+    for tipo in args.tipos:
+        for size in sorted(args.sizes):
+            body = orjson.dumps(make_payload(tipo, size))
+            normal, t_normal = export(client, body, False)
+            compact, t_compact = export(client, body, True)
+            diffs = compare(normal, compact, rel_tol=NUMBER_TOLERANCE)
+            reduction = 1 - len(compact) / len(normal)
+            results.setdefault(tipo, []).append(reduction)
+            failed = failed or bool(diffs)
+            extra = "".join(f" {compact_size(normal, level) / 1024:>12.1f}" for level in args.levels)
+            print(f"{tipo:>13} {size:>7} {len(normal) / 1024:>8.1f} {len(compact) / 1024:>12.1f} {reduction:>10.0%} "
+                  f"{download_seconds(len(normal), args.mbps):>11.2f} {download_seconds(len(compact), args.mbps):>11.2f} {t_normal * 1000:>8.0f} {t_compact * 1000:>16.0f}"
+                  f"{extra}  {'OK' if not diffs else 'DIFERENCIAS'}")
+            for diff in diffs[:10]:
+                print(f"    {diff}")
+
+    for tipo, reductions in results.items():
+        # Con pocas filas pesan las partes fijas del paquete; se exige la reducción en el tamaño mayor
+        if reductions[-1] < args.min_reduction:
+            failed = True
+            print(f"{tipo}: reducción {reductions[-1]:.0%} menor que la esperada ({args.min_reduction:.0%})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Verificación de las fechas de cuotas de ``business_calendar``.
+
+Para varios calendarios (intervalos cortos que cruzan fines de semana y
+feriados, intervalos mensuales, con y sin sábados) comprueba que cada fecha
+sea día hábil, que sean estrictamente crecientes (dos cuotas nunca comparten
+fecha) y que haya tantas como cuotas pedidas. Termina con código 1 si alguna
+regla falla. Uso:
+
+    python -m backend.benchmarks.calendar_check
+"""
+import sys
+from typing import Any, Dict, List
+
+from backend.business_calendar import WEEKEND_SAT_SUN, WEEKEND_SUN, dates_from_spec, is_business_day
+
+CASES: List[Dict[str, Any]] = [
+    # cada=1 desde un jueves: sábado y domingo caían en el mismo lunes
+    {"fechaInicio": "2025-01-02", "cada": 1, "cuotas": 5},
+    {"fechaInicio": "2025-04-15", "cada": 1, "cuotas": 10},
+    {"fechaInicio": "2025-07-25", "cada": 2, "cuotas": 8},
+    {"fechaInicio": "2025-12-20", "cada": 1, "cuotas": 15},
+    {"fechaInicio": "2025-01-31", "cada": 30, "cuotas": 12},
+    {"fechaInicio": "2025-01-02", "cada": 1, "cuotas": 5, "incluirSabados": True},
+    {"fechaInicio": "2025-01-02", "cada": 7, "fechaFin": "2025-06-30"},
+]
+
+
+def check(spec: Dict[str, Any]) -> List[str]:
+    weekend = WEEKEND_SUN if spec.get("incluirSabados") else WEEKEND_SAT_SUN
+    dates = dates_from_spec(spec)
+    errors = [f"{day} no es día hábil" for day in dates if not is_business_day(day, weekend)]
+    errors += [f"{a} y {b} no son crecientes" for a, b in zip(dates, dates[1:]) if b <= a]
+    if "cuotas" in spec and len(dates) != spec["cuotas"]:
+        errors.append(f"{len(dates)} fechas para {spec['cuotas']} cuotas")
+    return errors
+
+
+def main():
+    failed = False
+    for spec in CASES:
+        errors = check(spec)
+        failed = failed or bool(errors)
+        print(f"{spec}  {'OK' if not errors else 'ERROR'}")
+        for error in errors:
+            print(f"    {error}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga contra un servidor en ejecución.
+
+Sin ``--scenario`` lanza en paralelo clientes de exportación (CPU) y clientes
+livianos (por defecto ``/api/calculate``) durante ``--duration`` segundos.
+Con ``--scenario`` cada cliente elige en cada petición un endpoint según los
+pesos del escenario (ver ``SCENARIOS``): catálogo, consulta de RUC, cálculo
+de cuotas y exportaciones de distintos tamaños. En ambos casos reporta, por
+endpoint, throughput, latencias p50/p95/p99 y tasa de errores (con los
+códigos de estado). Sirve para comparar el servidor de desarrollo con
+``python -m backend serve``:
+
+    python backend/app.py --port 5001 &
+    python -m backend.benchmarks.load_test --url http://localhost:5001
+
+    python -m backend serve --port 5002 &
+    python -m backend.benchmarks.load_test --url http://localhost:5002
+
+Para incluir ``/api/consultar-ruc`` y ``/api/catalog`` sin llamar a los
+servicios reales, el backend se apunta a ``upstream_stub.py``::
+
+    python -m backend.benchmarks.upstream_stub --port 8099 &
+    SUNAT_API_URL=http://localhost:8099/v2/sunat/ruc CATALOG_URL=http://localhost:8099/catalog.json \\
+        CATALOG_TTL_SECONDS=5 python -m backend serve --port 5002 &
+    python -m backend.benchmarks.load_test --url http://localhost:5002 --scenario mixto --stub-url http://localhost:8099
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from backend.benchmarks.payloads import make_payload
+
+LIGHT_BODY = {"montoTotal": "1500.50", "fechasValidas": ["01/02/2025", "15/02/2025", "01/03/2025", "15/03/2025"]}
+JSON_CONTENT_TYPE = "application/json"
+
+
+class Endpoint(NamedTuple):
+    method: str
+    path: str
+    # Cuerpo de cada petición (None si no lleva); recibe el generador aleatorio del cliente
+    body: Optional[Callable[[random.Random], bytes]] = None
+
+
+def fixed_body(body: bytes) -> Callable[[random.Random], bytes]:
+    return lambda rng: body
+
+
+def export_endpoint(tipo: str, rows: int) -> Endpoint:
+    return Endpoint("POST", "/export-xlsx", fixed_body(json.dumps(make_payload(tipo, rows)).encode()))
+
+
+def ruc_body(rng: random.Random) -> bytes:
+    return json.dumps({"documentNumber": f"20{rng.randrange(10 ** 9):09d}"}).encode()
+
+
+CALCULATE = Endpoint("POST", "/api/calculate", fixed_body(json.dumps(LIGHT_BODY).encode()))
+RUC = Endpoint("POST", "/api/consultar-ruc", ruc_body)
+CATALOG = Endpoint("GET", "/api/catalog")
+CATALOG_STATS = Endpoint("GET", "/api/catalog/stats")
+
+# Escenario: nombre -> [(endpoint, peso)]; los endpoints se construyen al elegirlo (los payloads pesan)
+SCENARIOS: Dict[str, Callable[[], List[Tuple[str, Endpoint, int]]]] = {
+    # Uso diario: lecturas del catálogo, consultas de RUC, cuotas y exportaciones de todo tamaño
+    "mixto": lambda: [
+        ("catalog", CATALOG, 25), ("catalog-stats", CATALOG_STATS, 5), ("ruc", RUC, 20), ("calculate", CALCULATE, 30),
+        ("export-100", export_endpoint("pedido", 100), 10), ("export-2000", export_endpoint("inventario", 2000), 7),
+        ("export-10000", export_endpoint("pedido", 10000), 3),
+    ],
+    # Solo servicios externos: límites de concurrencia 'upstream' y circuit breakers
+    "externos": lambda: [("catalog", CATALOG, 50), ("catalog-stats", CATALOG_STATS, 10), ("ruc", RUC, 40)],
+    # Exportaciones de distintos tamaños y tipos: control de admisión y threadpool de CPU
+    "exportaciones": lambda: [
+        ("export-100", export_endpoint("pedido", 100), 40), ("export-2000", export_endpoint("inventario", 2000), 30),
+        ("export-precios-2000", export_endpoint("precios", 2000), 15), ("export-10000", export_endpoint("pedido", 10000), 15),
+    ],
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Counter] = {}
+
+    def add(self, kind: str, elapsed: float, status: Optional[int]):
+        """``status`` None es un error de conexión o timeout"""
+        with self.lock:
+            if status is not None and status < 400:
+                self.latencies.setdefault(kind, []).append(elapsed)
+            else:
+                self.errors.setdefault(kind, Counter())[status or "conexión"] += 1
+
+
+def client_loop(mix: List[Tuple[str, Endpoint, int]], base_url: str, deadline: float, recorder: Recorder, seed: int):
+    session = requests.Session()
+    rng = random.Random(seed)
+    kinds = [kind for kind, _, _ in mix]
+    endpoints = {kind: endpoint for kind, endpoint, _ in mix}
+    weights = [weight for _, _, weight in mix]
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, weights)[0] if len(kinds) > 1 else kinds[0]
+        endpoint = endpoints[kind]
+        body = endpoint.body(rng) if endpoint.body else None
+        headers = {"Content-Type": JSON_CONTENT_TYPE} if body else {}
+        start = time.perf_counter()
+        try:
+            response = session.request(endpoint.method, base_url + endpoint.path, data=body, headers=headers, timeout=120)
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        recorder.add(kind, time.perf_counter() - start, status)
+
+
+def client_groups(args: argparse.Namespace) -> List[Tuple[int, List[Tuple[str, Endpoint, int]]]]:
+    """(clientes, mezcla) por grupo: el escenario elegido o los clientes de exportación y livianos"""
+    if args.scenario:
+        return [(args.clients, SCENARIOS[args.scenario]())]
+    light_body = fixed_body(json.dumps(LIGHT_BODY).encode()) if args.light_method == "POST" else None
+    light = Endpoint(args.light_method, args.light_path, light_body)
+    return [
+        (args.export_clients, [("export", export_endpoint(args.tipo, args.rows), 1)]),
+        (args.light_clients, [("light", light, 1)]),
+    ]
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, object]]:
+    groups = client_groups(args)
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=client_loop, args=(mix, args.url, deadline, recorder, args.seed + i * 1000 + j))
+        for i, (clients, mix) in enumerate(groups)
+        for j in range(clients)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    summary = {}
+    for kind in [kind for _, mix in groups for kind, _, _ in mix]:
+        latencies = recorder.latencies.get(kind, [])
+        errors = recorder.errors.get(kind, Counter())
+        total = len(latencies) + sum(errors.values())
+        summary[kind] = {
+            "ok": len(latencies),
+            "errores": sum(errors.values()),
+            "error_pct": round(sum(errors.values()) / total * 100, 2) if total else 0.0,
+            "req_s": round(total / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "codigos": {str(status): count for status, count in errors.most_common()},
+        }
+    return summary
+
+
+def stub_stats(stub_url: Optional[str]) -> Optional[Dict[str, Dict[str, int]]]:
+    """Peticiones que llegaron al stub (cuántas resolvieron las cachés del backend)"""
+    if not stub_url:
+        return None
+    try:
+        return requests.get(f"{stub_url}/__stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga mixta (exportaciones, catálogo, RUC y peticiones livianas).")
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), help="Mezcla de endpoints por pesos (ver SCENARIOS).")
+    parser.add_argument("--clients", type=int, default=24, help="Clientes concurrentes del escenario.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stub-url", help="URL de upstream_stub.py para reportar las peticiones que le llegaron.")
+    parser.add_argument("--json", help="Guarda el resumen en este archivo.")
+    parser.add_argument("--export-clients", type=int, default=4)
+    parser.add_argument("--light-clients", type=int, default=16)
+    parser.add_argument("--tipo", default="pedido")
+    parser.add_argument("--rows", type=int, default=2000, help="Filas por exportación")
+    parser.add_argument("--light-path", default="/api/calculate")
+    parser.add_argument("--light-method", default="POST", choices=("GET", "POST"))
+    args = parser.parse_args()
+
+    before = stub_stats(args.stub_url)
+    summary = run(args)
+    after = stub_stats(args.stub_url)
+
+    width = max(len(kind) for kind in summary)
+    print(f"{'endpoint':>{width}} {'ok':>6} {'errores':>8} {'error %':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  códigos")
+    for kind, s in summary.items():
+        codes = ", ".join(f"{status}×{count}" for status, count in s["codigos"].items())
+        print(f"{kind:>{width}} {s['ok']:>6} {s['errores']:>8} {s['error_pct']:>8} {s['req_s']:>8} "
+              f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}  {codes}")
+    upstream = None
+    if after is not None:
+        upstream = {path: {key: value - (before or {}).get(path, {}).get(key, 0) for key, value in counts.items()}
+                    for path, counts in after.items()}
+        for path, counts in upstream.items():
+            print(f"stub {path}: {counts['peticiones']} peticiones, {counts['errores']} errores inyectados")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"escenario": args.scenario, "duracion": args.duration, "endpoints": summary, "upstream": upstream},
+                      file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
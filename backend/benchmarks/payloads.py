@@ -0,0 +1,84 @@
+"""Payloads sintéticos para benchmarks, construidos a partir de public/productos_local.json."""
+import json
+import os
+import random
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from backend.constants import CatalogKeys
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'public', 'productos_local.json')
+TIPOS = ['inventario', 'pedido', 'devoluciones', 'precios']
+MARCAS = ['BASE', 'COMPETIDOR 2', 'COMPETIDOR 3', 'COMPETIDOR 4', 'COMPETIDOR 5']
+
+
+@lru_cache(maxsize=1)
+def catalog_products() -> List[Dict[str, Any]]:
+    with open(CATALOG_PATH, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def brand_list(n_marcas: int = len(MARCAS)) -> List[str]:
+    """Las marcas de MARCAS seguidas de competidores numerados hasta completar ``n_marcas``"""
+    return (MARCAS + [f'COMPETIDOR {i}' for i in range(len(MARCAS) + 1, n_marcas + 1)])[:n_marcas]
+
+
+def make_items(n: int, seed: int = 42, with_prices: bool = False, n_marcas: int = len(MARCAS)) -> List[Dict[str, Any]]:
+    """Genera ``n`` ítems ProductoEditado recorriendo el catálogo (se repite si n > catálogo)"""
+    marcas = brand_list(n_marcas)
+    rng = random.Random(seed)
+    catalog = catalog_products()
+    items = []
+    for i in range(n):
+        p = catalog[i % len(catalog)]
+        precio = p.get(CatalogKeys.PRECIO) or round(rng.uniform(0.5, 300), 2)
+        item = {
+            "codigo": str(p[CatalogKeys.CODIGO]),
+            "cod_ean": p.get(CatalogKeys.EAN) or "",
+            "ean_14": p.get(CatalogKeys.EAN_14) or "",
+            "nombre": p[CatalogKeys.NOMBRE],
+            "linea": p.get(CatalogKeys.LINEA) or "",
+            "peso": p.get(CatalogKeys.PESO) or round(rng.uniform(0, 5), 3),
+            "stock_referencial": p.get(CatalogKeys.STOCK_REFERENCIAL) or 0,
+            "precio_referencial": precio,
+            "cantidad_por_caja": p.get(CatalogKeys.U_POR_CAJA) or 1,
+            "keywords": (p.get(CatalogKeys.KEYWORDS) or "").split(),
+            "cantidad": rng.randint(1, 200),
+            "observaciones": "",
+        }
+        if with_prices:
+            item["precios"] = {marca: round(precio * rng.uniform(0.8, 1.2), 2) for marca in marcas}
+        items.append(item)
+    return items
+
+
+def make_payload(tipo: str, n: int, seed: int = 42, n_marcas: int = len(MARCAS)) -> Dict[str, Any]:
+    """Cuerpo completo de /export-xlsx para ``tipo`` con ``n`` líneas (y ``n_marcas`` en precios)"""
+    items = make_items(n, seed, with_prices=(tipo == 'precios'), n_marcas=n_marcas)
+    form = {
+        "documentType": "ruc", "cliente": "Cliente Benchmark", "documento_cliente": "20123456789",
+        "codigo_cliente": "C001", "sucursal": "principal", "motivo": "falla de fábrica",
+    }
+    if tipo == 'precios' and n_marcas > len(MARCAS):
+        form["marcas"] = brand_list(n_marcas)
+    elif tipo == 'precios':
+        form.update({f"marca{i}": marca for i, marca in enumerate(brand_list(n_marcas), 1)})
+    payload = {
+        "tipo": tipo,
+        "form": form,
+        "list": items,
+        "usuario": {"nombre": "Benchmark", "correo": "benchmark@example.com"},
+    }
+    if tipo == 'inventario':
+        payload["totales"] = {
+            "totalCantidades": sum(item["cantidad"] for item in items),
+            "totalLineas": len({item["linea"] for item in items}),
+        }
+    return payload
+
+
+def to_ndjson(payload: Dict[str, Any]) -> bytes:
+    """Cuerpo NDJSON equivalente: encabezado en la primera línea y un producto por línea"""
+    header = {key: value for key, value in payload.items() if key != "list"}
+    lines = [json.dumps(header)] + [json.dumps(item) for item in payload["list"]]
+    return ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de resistencia de memoria: muchas exportaciones seguidas en un proceso.
+
+Ejecuta ``--count`` exportaciones (1000 por defecto) vía el test client de
+Flask, con una mezcla de tipos y tamaños elegida al azar (ver ``MIX``), y
+después de cada una deja actuar a ``memory_governor`` como en producción.
+Cada ``--every`` exportaciones imprime el RSS, su pico y la memoria de
+Python según tracemalloc (con ``--tracemalloc``). Al final reporta la
+pendiente del RSS en la segunda mitad (KB por exportación): cerca de cero
+indica memoria estable; una pendiente sostenida, una fuga. Uso:
+
+    python -m backend.benchmarks.soak_test [--count 1000] [--every 100]
+    python -m backend.benchmarks.soak_test --sin-gc   # sin gc.collect()/malloc_trim, para comparar
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("PRICE_HISTORY_DB", os.path.join(tempfile.mkdtemp(prefix="soak-"), "price_history.sqlite3"))
+# Los reciclajes los decide esta prueba: no debe detenerse a la mitad
+os.environ["MEMORY_RSS_LIMIT_MB"] = "0"
+os.environ["MEMORY_MAX_EXPORTS"] = "0"
+
+import orjson  # noqa: E402
+
+from backend.app import app  # noqa: E402
+from backend.benchmarks.payloads import make_payload  # noqa: E402
+from backend.memory import memory_governor, rss_bytes  # noqa: E402
+
+# (tipo, filas, peso): sobre todo exportaciones chicas, con precios e inventario grandes de vez en cuando
+MIX: List[Tuple[str, int, int]] = [
+    ("pedido", 100, 40), ("devoluciones", 100, 10), ("inventario", 500, 15), ("precios", 500, 10),
+    ("pedido", 2000, 10), ("inventario", 5000, 7), ("precios", 5000, 5), ("pedido", 10000, 3),
+]
+
+
+def slope(points: List[Tuple[int, int]]) -> float:
+    """Pendiente por mínimos cuadrados de (exportación, bytes)"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var if var else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS del proceso a lo largo de muchas exportaciones mixtas.")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--every", type=int, default=100, help="Exportaciones entre cada punto de control.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sin-gc", action="store_true", help="No recolectar tras las exportaciones grandes.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Muestrea también tracemalloc (más lento).")
+    parser.add_argument("--json", help="Guarda los puntos de control en este archivo.")
+    args = parser.parse_args()
+
+    if args.sin_gc:
+        memory_governor.gc_min_rows = sys.maxsize
+    memory_governor.trace = args.tracemalloc
+    memory_governor.start()
+
+    rng = random.Random(args.seed)
+    bodies: Dict[Tuple[str, int], bytes] = {
+        (tipo, rows): orjson.dumps(make_payload(tipo, rows, seed=args.seed)) for tipo, rows, _ in MIX
+    }
+    choices = [(tipo, rows) for tipo, rows, _ in MIX]
+    weights = [weight for _, _, weight in MIX]
+    client = app.test_client()
+
+    baseline = rss_bytes()
+    peak = baseline
+    samples: List[Tuple[int, int]] = []
+    checkpoints = []
+    print(f"RSS inicial: {baseline / 1024 / 1024:.1f} MB (gc tras exportaciones de {memory_governor.gc_min_rows} filas o más)"
+          if not args.sin_gc else f"RSS inicial: {baseline / 1024 / 1024:.1f} MB (sin gc tras exportaciones)")
+    print(f"{'exportación':>11} {'RSS MB':>8} {'pico MB':>8} {'py MB':>7} {'s':>7}")
+    started = time.perf_counter()
+    for i in range(1, args.count + 1):
+        tipo, rows = rng.choices(choices, weights)[0]
+        response = client.post("/export-xlsx", data=bodies[(tipo, rows)], content_type="application/json")
+        if response.status_code != 200:
+            sys.exit(f"La exportación {i} ({tipo}, {rows} filas) respondió {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        # El cierre de la respuesta dispara memory_governor.after_export (sin gevent, en el mismo hilo), como al terminar de enviarla
+        response.close()
+        rss = memory_governor.last_rss
+        peak = max(peak, rss)
+        samples.append((i, rss))
+        if i % args.every == 0 or i == args.count:
+            traced = None
+            if args.tracemalloc:
+                traced = tracemalloc.get_traced_memory()[0]
+            checkpoints.append({"exportacion": i, "rss": rss, "pico": peak, "python": traced,
+                                "segundos": round(time.perf_counter() - started, 1)})
+            python_mb = f"{traced / 1024 / 1024:.1f}" if traced is not None else "-"
+            print(f"{i:>11} {rss / 1024 / 1024:>8.1f} {peak / 1024 / 1024:>8.1f} {python_mb:>7} {time.perf_counter() - started:>7.1f}")
+
+    steady = slope(samples[len(samples) // 2:])
+    print(f"Pendiente del RSS en la segunda mitad: {steady / 1024:+.1f} KB por exportación")
+    print(f"RSS final: {samples[-1][1] / 1024 / 1024:.1f} MB, pico: {peak / 1024 / 1024:.1f} MB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"gc": not args.sin_gc, "exportaciones": args.count, "rssInicial": baseline,
+                       "pendienteBytesPorExportacion": round(steady), "puntos": checkpoints}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que reemplaza a los servicios externos en pruebas de carga.
+
+Sirve las dos dependencias del backend con latencia, tasa de errores y
+tamaño de respuesta configurables, para medir ``/api/consultar-ruc`` y
+``/api/catalog`` sin llamar a ``api.apis.net.pe`` ni a Google Drive:
+
+* ``GET /v2/sunat/ruc?numero=...``: respuesta con la forma de la API de RUC
+  (datos deterministas a partir del número); 404 para ``--ruc-not-found-rate``.
+* ``GET /catalog.json``: el catálogo de ``public/productos_local.json``
+  repetido (con códigos únicos) hasta ``--catalog-size`` productos.
+* ``GET /__stats``: peticiones atendidas y errores inyectados por ruta.
+
+Uso (el backend apunta al stub con variables de entorno)::
+
+    python -m backend.benchmarks.upstream_stub --port 8099 --ruc-latency-ms 150 --ruc-error-rate 0.02 &
+    SUNAT_API_URL=http://localhost:8099/v2/sunat/ruc CATALOG_URL=http://localhost:8099/catalog.json \\
+        CATALOG_TTL_SECONDS=5 python -m backend serve --port 5002
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from backend.benchmarks.payloads import catalog_products
+from backend.constants import CatalogKeys
+
+RUC_PATH = "/v2/sunat/ruc"
+CATALOG_PATH = "/catalog.json"
+STATS_PATH = "/__stats"
+
+
+def build_catalog(size: int) -> List[Dict[str, Any]]:
+    """Productos del catálogo local repetidos hasta ``size``, con códigos únicos"""
+    base = catalog_products()
+    products = []
+    for i in range(size):
+        product = dict(base[i % len(base)])
+        if i >= len(base):
+            product[CatalogKeys.CODIGO] = f"{product[CatalogKeys.CODIGO]}-{i // len(base)}"
+        products.append(product)
+    return products
+
+
+def ruc_response(numero: str, padding_bytes: int) -> Dict[str, Any]:
+    """Datos ficticios pero estables para cada RUC"""
+    digest = int(hashlib.sha1(numero.encode()).hexdigest(), 16)
+    return {
+        "razonSocial": f"EMPRESA DE PRUEBA {digest % 100000:05d} S.A.C.",
+        "tipoDocumento": "6",
+        "numeroDocumento": numero,
+        "estado": "ACTIVO",
+        "condicion": "HABIDO",
+        "direccion": f"AV. PRUEBA {digest % 9000 + 100}",
+        "ubigeo": "150101",
+        "distrito": "LIMA",
+        "provincia": "LIMA",
+        "departamento": "LIMA",
+        "actividadEconomica": "VENTA AL POR MAYOR" + " " * padding_bytes,
+    }
+
+
+class UpstreamStub:
+    """Configuración y contadores compartidos por los hilos del servidor"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.catalog_body = json.dumps(build_catalog(args.catalog_size), ensure_ascii=False).encode()
+        self.lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def count(self, path: str, status: int):
+        with self.lock:
+            entry = self.stats.setdefault(path, {"peticiones": 0, "errores": 0})
+            entry["peticiones"] += 1
+            if status >= 400:
+                entry["errores"] += 1
+
+    def delay(self, latency_ms: float):
+        """Latencia media ``latency_ms`` con variación uniforme de ± ``--jitter``"""
+        if latency_ms > 0:
+            jitter = self.args.jitter
+            time.sleep(latency_ms / 1000 * random.uniform(1 - jitter, 1 + jitter))
+
+
+def make_handler(stub: UpstreamStub):
+    args = stub.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def send_body(self, status: int, body: bytes, path: Optional[str] = None):
+            if path is not None:
+                stub.count(path, status)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == RUC_PATH:
+                stub.delay(args.ruc_latency_ms)
+                numero = parse_qs(url.query).get("numero", [""])[0]
+                roll = random.random()
+                if roll < args.ruc_error_rate:
+                    self.send_body(500, b'{"message": "error inyectado"}', url.path)
+                elif roll < args.ruc_error_rate + args.ruc_not_found_rate:
+                    self.send_body(404, b'{"message": "not found"}', url.path)
+                else:
+                    self.send_body(200, json.dumps(ruc_response(numero, args.ruc_padding_bytes)).encode(), url.path)
+            elif url.path == CATALOG_PATH:
+                stub.delay(args.catalog_latency_ms)
+                if random.random() < args.catalog_error_rate:
+                    self.send_body(503, b'{"message": "error inyectado"}', url.path)
+                else:
+                    self.send_body(200, stub.catalog_body, url.path)
+            elif url.path == STATS_PATH:
+                with stub.lock:
+                    body = json.dumps(stub.stats).encode()
+                self.send_body(200, body)
+            else:
+                self.send_body(404, b'{"message": "ruta desconocida"}', "otras")
+
+    return Handler
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Servicios externos simulados (RUC y catálogo) para pruebas de carga.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--jitter", type=float, default=0.3, help="Variación relativa de la latencia (0.3 = ±30%%).")
+    parser.add_argument("--ruc-latency-ms", type=float, default=120)
+    parser.add_argument("--ruc-error-rate", type=float, default=0.0, help="Fracción de respuestas 500.")
+    parser.add_argument("--ruc-not-found-rate", type=float, default=0.0, help="Fracción de respuestas 404.")
+    parser.add_argument("--ruc-padding-bytes", type=int, default=0, help="Bytes extra en cada respuesta de RUC.")
+    parser.add_argument("--catalog-latency-ms", type=float, default=400)
+    parser.add_argument("--catalog-error-rate", type=float, default=0.0, help="Fracción de respuestas 503.")
+    parser.add_argument("--catalog-size", type=int, default=len(catalog_products()), help="Productos del catálogo.")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    stub = UpstreamStub(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    server.daemon_threads = True
+    print(f"Stub en http://{args.host}:{args.port} (catálogo: {args.catalog_size} productos, {len(stub.catalog_body) // 1024} KB)")
+    print(f"  SUNAT_API_URL=http://{args.host}:{args.port}{RUC_PATH} CATALOG_URL=http://{args.host}:{args.port}{CATALOG_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
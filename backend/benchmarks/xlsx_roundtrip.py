@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Verificación de ida y vuelta del escritor XLSX directo (``xlsx_writer``).
+
+Para cada reporte de líneas de producto genera el mismo payload con:
+
+* ``openpyxl``: el generador clásico (``generate()`` sobre ``pd.ExcelWriter``).
+* ``write_only``: StreamingLineItemExport con ``XLSX_WRITER=openpyxl``.
+* ``direct``: StreamingLineItemExport con el escritor SpreadsheetML.
+
+Relee cada libro con openpyxl y compara, contra el generador clásico, hojas,
+valores y fórmulas, fuente/relleno/borde/alineación de cada celda, celdas
+combinadas y anchos de columna. Reporta el tiempo de cada variante. Termina
+con código 1 si hay diferencias.
+
+Es la prueba de ida y vuelta del escritor directo: el repositorio no tiene
+suite de pytest, así que se ejecuta como script (también en CI) y su código
+de salida es el resultado. ``precios`` no se incluye porque sigue usando el
+generador de openpyxl. Uso:
+
+    python -m backend.benchmarks.xlsx_roundtrip [--sizes 100 5000] [--tipos pedido]
+"""
+import argparse
+import io
+import math
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import openpyxl
+import pandas as pd
+
+from backend.app import REPORT_GENERATORS
+from backend.benchmarks.payloads import make_payload
+from backend.report_generators.streaming import StreamingLineItemExport
+
+LINE_ITEM_TIPOS = ["inventario", "pedido", "devoluciones"]
+DEFAULT_SIZES = [100, 5000]
+
+
+def _generator(tipo: str, payload: Dict[str, Any], writer: Any):
+    return REPORT_GENERATORS[tipo](writer, payload["form"], payload["list"], data=payload.get("totales", {}),
+                                   usuario_data=payload.get("usuario", {}), options=payload.get("opciones", {}))
+
+
+def build_openpyxl(tipo: str, payload: Dict[str, Any]) -> bytes:
+    output = io.BytesIO()
+    writer = pd.ExcelWriter(output, engine="openpyxl")
+    _generator(tipo, payload, writer).generate()
+    writer.close()
+    return output.getvalue()
+
+
+def build_streaming(tipo: str, payload: Dict[str, Any], writer: str) -> bytes:
+    output = io.BytesIO()
+    export = StreamingLineItemExport(_generator(tipo, payload, None))
+    export.ingest_rows(payload["list"])
+    export.write(output, writer=writer)
+    return output.getvalue()
+
+
+def _style(cell: Any) -> Tuple:
+    font, fill, border, alignment = cell.font, cell.fill, cell.border, cell.alignment
+    return (
+        font.name, font.sz, bool(font.b), font.color.rgb if font.color is not None else None,
+        fill.fill_type, fill.fgColor.rgb if fill.fill_type else None,
+        border.left.style, border.right.style, border.top.style, border.bottom.style,
+        alignment.horizontal, alignment.vertical,
+    )
+
+
+def _same_value(a: Any, b: Any, rel_tol: float) -> bool:
+    if a == b:
+        return True
+    numbers = (int, float)
+    return rel_tol > 0 and isinstance(a, numbers) and isinstance(b, numbers) and math.isclose(a, b, rel_tol=rel_tol)
+
+
+def compare(expected: bytes, actual: bytes, rel_tol: float = 0.0) -> List[str]:
+    """Diferencias entre dos libros releídos con openpyxl (vacía si son equivalentes); ``rel_tol`` para números"""
+    wa = openpyxl.load_workbook(io.BytesIO(expected))
+    wb = openpyxl.load_workbook(io.BytesIO(actual))
+    if wa.sheetnames != wb.sheetnames:
+        return [f"hojas: {wa.sheetnames} != {wb.sheetnames}"]
+    diffs = []
+    for name in wa.sheetnames:
+        sa, sb = wa[name], wb[name]
+        if (sa.max_row, sa.max_column) != (sb.max_row, sb.max_column):
+            diffs.append(f"{name}: dimensiones {sa.max_row}x{sa.max_column} != {sb.max_row}x{sb.max_column}")
+        if sorted(map(str, sa.merged_cells.ranges)) != sorted(map(str, sb.merged_cells.ranges)):
+            diffs.append(f"{name}: celdas combinadas {sa.merged_cells.ranges} != {sb.merged_cells.ranges}")
+        widths_a = {k: round(v.width, 2) for k, v in sa.column_dimensions.items() if v.width}
+        widths_b = {k: round(v.width, 2) for k, v in sb.column_dimensions.items() if v.width}
+        if widths_a != widths_b:
+            diffs.append(f"{name}: anchos {widths_a} != {widths_b}")
+        for row_a, row_b in zip(sa.iter_rows(), sb.iter_rows()):
+            for ca, cb in zip(row_a, row_b):
+                if not _same_value(ca.value, cb.value, rel_tol):
+                    diffs.append(f"{name}!{ca.coordinate}: valor {ca.value!r} != {cb.value!r}")
+                elif _style(ca) != _style(cb):
+                    diffs.append(f"{name}!{ca.coordinate}: estilo {_style(ca)} != {_style(cb)}")
+                if len(diffs) > 20:
+                    return diffs
+    return diffs
+
+
+def timed(fn, *args) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ida y vuelta del escritor XLSX directo contra openpyxl.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--tipos", nargs="+", default=LINE_ITEM_TIPOS, choices=LINE_ITEM_TIPOS)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'tipo':>13} {'filas':>7} {'openpyxl s':>11} {'write_only s':>13} {'direct s':>9} {'x openpyxl':>11} {'KB':>7}  resultado")
+    for tipo in args.tipos:
+        for size in args.sizes:
+            payload = make_payload(tipo, size)
+            reference, t_openpyxl = timed(build_openpyxl, tipo, payload)
+            write_only, t_write_only = timed(build_streaming, tipo, payload, "openpyxl")
+            direct, t_direct = timed(build_streaming, tipo, payload, "direct")
+            diffs = compare(reference, direct) + compare(reference, write_only)
+            failed = failed or bool(diffs)
+            print(f"{tipo:>13} {size:>7} {t_openpyxl:>11.3f} {t_write_only:>13.3f} {t_direct:>9.3f} "
+                  f"{t_openpyxl / t_direct:>11.1f} {len(direct) // 1024:>7}  {'OK' if not diffs else 'DIFERENCIAS'}")
+            for diff in diffs[:10]:
+                print(f"    {diff}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Calendario de días hábiles para la generación de fechas de cuotas.
+
+Cada año se precalcula una sola vez (LRU de ``CALENDAR_CACHE_YEARS`` años):
+
+* ``business``: mapa de bits (un ``bool`` por día del año) con los días
+  hábiles, sin fines de semana ni los feriados de ``feriados_pe.json``
+  (fijos, móviles desde Pascua y extraordinarios).
+* ``next_business``: para cada día, el índice del siguiente día hábil (él
+  mismo si lo es), así mover una fecha al siguiente hábil es un acceso.
+
+Consultar una fecha es O(1) (índice del día en el año) y ``installment_dates``
+genera todas las fechas "cada N días" de un rango con aritmética de
+``datetime64`` y un solo acceso vectorizado por año; si dos cuotas caen en
+el mismo hábil, la siguiente pasa al próximo hábil libre.
+"""
+import json
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+HOLIDAYS_FILE = os.environ.get("HOLIDAYS_FILE", os.path.join(os.path.dirname(__file__), "feriados_pe.json"))
+CALENDAR_CACHE_YEARS = int(os.environ.get("CALENDAR_CACHE_YEARS", "16"))
+DATE_FORMAT = "%d/%m/%Y"
+
+# Días de descanso (0 = lunes ... 6 = domingo)
+WEEKEND_SAT_SUN: Tuple[int, ...] = (5, 6)
+WEEKEND_SUN: Tuple[int, ...] = (6,)
+
+MIN_YEAR, MAX_YEAR = 1900, 2200
+MAX_INSTALLMENTS = 360
+MAX_INTERVAL_DAYS = 366
+
+
+def easter_sunday(year: int) -> date:
+    """Domingo de Pascua (calendario gregoriano, algoritmo anónimo de Meeus/Jones/Butcher)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=1)
+def holiday_rules() -> Dict[str, Any]:
+    with open(HOLIDAYS_FILE, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def holidays(year: int) -> Dict[date, str]:
+    """Feriados del año: fecha -> nombre"""
+    rules = holiday_rules()
+    result: Dict[date, str] = {}
+    for rule in rules.get("fijos", []):
+        if rule.get("desde", MIN_YEAR) <= year <= rule.get("hasta", MAX_YEAR):
+            month, day = (int(part) for part in rule["fecha"].split("-"))
+            result[date(year, month, day)] = rule["nombre"]
+    easter = easter_sunday(year)
+    for rule in rules.get("moviles", []):
+        result[easter + timedelta(days=rule["diasDesdePascua"])] = rule["nombre"]
+    for rule in rules.get("extraordinarios", []):
+        day = date.fromisoformat(rule["fecha"])
+        if day.year == year:
+            result[day] = rule["nombre"]
+    return dict(sorted(result.items()))
+
+
+class YearCalendar:
+    """Días hábiles de un año como mapa de bits e índice del siguiente hábil"""
+
+    def __init__(self, year: int, weekend: Tuple[int, ...]):
+        self.year = year
+        self.weekend = weekend
+        self.start = np.datetime64(f"{year:04d}-01-01", "D")
+        days = np.arange(self.start, np.datetime64(f"{year + 1:04d}-01-01", "D"))
+        # 1970-01-01 fue jueves (3)
+        weekday = (days.astype(np.int64) + 3) % 7
+        business = ~np.isin(weekday, weekend)
+        self.holidays = holidays(year)
+        holiday_index = [(day - date(year, 1, 1)).days for day in self.holidays]
+        business[holiday_index] = False
+        self.business = business
+        self.size = len(days)
+
+        # Índice del siguiente hábil; ``size`` si no queda ninguno en el año
+        positions = np.where(business, np.arange(self.size), self.size)
+        self.next_business = np.minimum.accumulate(positions[::-1])[::-1]
+        self.count = int(business.sum())
+
+    def index(self, day: date) -> int:
+        return day.toordinal() - date(self.year, 1, 1).toordinal()
+
+    def is_business_day(self, day: date) -> bool:
+        return bool(self.business[self.index(day)])
+
+
+@lru_cache(maxsize=CALENDAR_CACHE_YEARS)
+def year_calendar(year: int, weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> YearCalendar:
+    if not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError(f"Año fuera de rango ({MIN_YEAR}-{MAX_YEAR}): {year}")
+    return YearCalendar(year, weekend)
+
+
+def is_business_day(day: date, weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> bool:
+    return year_calendar(day.year, weekend).is_business_day(day)
+
+
+def first_business_day(year: int, weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> np.datetime64:
+    """Primer día hábil desde el 1 de enero de ``year`` (puede caer en un año posterior)"""
+    while True:
+        calendar = year_calendar(year, weekend)
+        if calendar.count:
+            return calendar.start + int(calendar.next_business[0])
+        year += 1
+
+
+def roll_forward(days: np.ndarray, weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> np.ndarray:
+    """Cada fecha (``datetime64[D]``) movida al siguiente día hábil (ella misma si lo es)"""
+    days = np.asarray(days, dtype="datetime64[D]")
+    years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    result = np.empty_like(days)
+    for year in np.unique(years).tolist():
+        in_year = years == year
+        calendar = year_calendar(year, weekend)
+        offsets = calendar.next_business[(days[in_year] - calendar.start).astype(np.int64)]
+        rolled = calendar.start + offsets.astype("timedelta64[D]")
+        # Sin hábiles hasta fin de año: primer hábil del año siguiente
+        overflow = offsets == calendar.size
+        if overflow.any():
+            rolled[overflow] = first_business_day(year + 1, weekend)
+        result[in_year] = rolled
+    return result
+
+
+def next_business_after(day: np.datetime64, weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> np.datetime64:
+    """Primer día hábil estrictamente posterior a ``day``"""
+    return roll_forward(np.array([day + np.timedelta64(1, "D")]), weekend)[0]
+
+
+def spread_collisions(days: np.ndarray, weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> np.ndarray:
+    """
+    Fechas ya movidas a hábiles y ordenadas, sin repetir: una que coincide con
+    (o queda antes de) la anterior pasa al siguiente hábil libre. Solo ocurre
+    con intervalos cortos, así que el recorrido secuencial es la excepción.
+    """
+    if len(days) < 2 or bool(np.all(days[1:] > days[:-1])):
+        return days
+    result = days.copy()
+    for i in range(1, len(result)):
+        if result[i] <= result[i - 1]:
+            result[i] = next_business_after(result[i - 1], weekend)
+    return result
+
+
+def installment_dates(start: date, interval_days: int, count: Optional[int] = None, end: Optional[date] = None,
+                      weekend: Tuple[int, ...] = WEEKEND_SAT_SUN) -> List[date]:
+    """
+    Fechas de cuotas cada ``interval_days`` días desde ``start`` (la primera a
+    ``start + interval_days``), ``count`` cuotas o hasta ``end`` inclusive;
+    las que caen en fin de semana o feriado pasan al siguiente día hábil libre,
+    así dos cuotas nunca comparten fecha. Con ``end``, ValueError si no hay
+    suficientes días hábiles distintos para todas las cuotas.
+    """
+    if not 1 <= interval_days <= MAX_INTERVAL_DAYS:
+        raise ValueError(f"El intervalo debe estar entre 1 y {MAX_INTERVAL_DAYS} días")
+    if count is None:
+        if end is None:
+            raise ValueError("Se requiere la cantidad de cuotas o la fecha final")
+        count = max(0, (end - start).days // interval_days)
+    if not 1 <= count <= MAX_INSTALLMENTS:
+        raise ValueError(f"La cantidad de cuotas debe estar entre 1 y {MAX_INSTALLMENTS}")
+    nominal = np.datetime64(start, "D") + np.arange(1, count + 1) * np.timedelta64(interval_days, "D")
+    rolled = roll_forward(nominal, weekend)
+    dates = spread_collisions(rolled, weekend)
+    if end is not None and dates[-1] > rolled[-1]:
+        raise ValueError(f"No hay {count} días hábiles distintos hasta la fecha final; usa un intervalo mayor")
+    return dates.astype(object).tolist()
+
+
+def dates_from_spec(spec: Dict[str, Any]) -> List[date]:
+    """
+    Fechas de cuotas a partir de ``calendario`` de ``/api/calculate``:
+    ``fechaInicio``, ``cada`` (días, 30 por defecto), ``cuotas`` o ``fechaFin`` e
+    ``incluirSabados`` (solo el domingo es de descanso). ValueError si no es válido.
+    """
+    interval = spec.get("cada", 30)
+    count = spec.get("cuotas")
+    if type(interval) is not int or (count is not None and type(count) is not int):
+        raise ValueError("'cada' y 'cuotas' deben ser enteros")
+    end = parse_date(spec["fechaFin"]) if spec.get("fechaFin") else None
+    weekend = WEEKEND_SUN if spec.get("incluirSabados") else WEEKEND_SAT_SUN
+    return installment_dates(parse_date(spec.get("fechaInicio")), interval, count, end, weekend)
+
+
+def parse_date(value: Any) -> date:
+    """Fecha "DD/MM/YYYY" (formato del frontend) o ISO "YYYY-MM-DD"; ValueError si no es válida"""
+    if not isinstance(value, str):
+        raise ValueError(f"Fecha inválida: {value!r}")
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return date.fromisoformat(value)
+
+
+def format_date(day: date) -> str:
+    return day.strftime(DATE_FORMAT)
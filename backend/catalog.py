@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from .catalog_ingest import CatalogIngest
+from .constants import CatalogKeys
+from .circuit import circuit_breaker
+from .metrics import CACHE_REQUESTS, upstream_timer
+from .compression import compress
+from .serialization import JSON_MIMETYPE, encode
+
+# Configurable para pruebas de carga contra un servicio local (backend/benchmarks/upstream_stub.py)
+CATALOG_URL = os.environ.get("CATALOG_URL", "https://drive.google.com/uc?export=download&id=1zAaJnJxsmgw55-W5QNQfcD3dVlnU4lUx")
+CATALOG_TTL_SECONDS = int(os.environ.get("CATALOG_TTL_SECONDS", str(15 * 60)))
+CATALOG_TIMEOUT_SECONDS = float(os.environ.get("CATALOG_TIMEOUT_SECONDS", "20"))
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """
+    Caché en memoria del catálogo de productos.
+
+    El catálogo se descarga como máximo una vez por TTL y se identifica con una
+    versión (hash del contenido). Los índices derivados se construyen una sola
+    vez por versión, fuera del lock, y solo se guardan si la versión con la que
+    se construyeron sigue vigente. Si la descarga falla y hay una copia previa,
+    se sigue sirviendo la copia anterior.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int = CATALOG_TTL_SECONDS):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._products: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        # Los derivados llevan la versión con la que se construyeron
+        self._index: Optional[Tuple[Optional[str], Dict[str, Dict[str, Any]]]] = None
+        self._ingested: Optional[CatalogIngest] = None
+        self._encoded: Dict[Tuple[Optional[str], bool, str, Optional[str]], bytes] = {}
+        self.version: Optional[str] = None
+
+    def _is_fresh(self) -> bool:
+        return self._products is not None and (time.monotonic() - self._fetched_at) < self.ttl_seconds
+
+    def _fetch(self):
+        with circuit_breaker('catalog'), upstream_timer('catalog'):
+            response = requests.get(self.url, timeout=CATALOG_TIMEOUT_SECONDS)
+            response.raise_for_status()
+        products = response.json()
+        version = hashlib.sha1(response.content).hexdigest()[:12]
+        if version != self.version:
+            self._index = None
+            self._ingested = None
+            self._encoded = {}
+            self.version = version
+        self._products = products
+        self._fetched_at = time.monotonic()
+
+    def get(self) -> List[Dict[str, Any]]:
+        """Devuelve la lista de productos, descargándola si la copia expiró"""
+        if self._is_fresh():
+            CACHE_REQUESTS.inc(cache='catalog', result='hit')
+            return self._products
+        with self._lock:
+            if self._is_fresh():
+                CACHE_REQUESTS.inc(cache='catalog', result='hit')
+            else:
+                CACHE_REQUESTS.inc(cache='catalog', result='miss')
+                try:
+                    self._fetch()
+                except requests.exceptions.RequestException as e:
+                    if self._products is None:
+                        raise
+                    logger.warning(f"No se pudo refrescar el catálogo, se usa la versión {self.version}: {e}")
+                    self._fetched_at = time.monotonic()
+            return self._products
+
+    def _snapshot(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Productos y versión leídos juntos (un refresco concurrente los cambia a la vez)"""
+        self.get()
+        with self._lock:
+            return self._products, self.version
+
+    def _is_current(self, version: Optional[str]) -> bool:
+        """Solo se guarda lo derivado de la versión vigente; se llama con el lock tomado"""
+        return version == self.version
+
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """Índice codigo -> producto normalizado (números ya convertidos) de la versión actual"""
+        products, version = self._snapshot()
+        cached = self._index
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = {p[CatalogKeys.CODIGO]: p for p in self._ingest(products, version).products}
+        with self._lock:
+            if self._is_current(version):
+                self._index = (version, index)
+        return index
+
+    def ingested(self) -> CatalogIngest:
+        """Catálogo normalizado, tokens de búsqueda y estadísticas de la versión actual"""
+        products, version = self._snapshot()
+        return self._ingest(products, version)
+
+    def _ingest(self, products: List[Dict[str, Any]], version: Optional[str]) -> CatalogIngest:
+        ingested = self._ingested
+        if ingested is not None and ingested.version == version:
+            return ingested
+        ingested = CatalogIngest(products, version)
+        with self._lock:
+            if self._is_current(version):
+                self._ingested = ingested
+        return ingested
+
+    def encoded(self, mimetype: str = JSON_MIMETYPE, encoding: Optional[str] = None,
+                normalized: bool = False) -> Tuple[Optional[str], bytes]:
+        """
+        Versión y catálogo serializado (JSON o MessagePack), opcionalmente
+        comprimido (gzip/br); cada variante se calcula una sola vez por versión.
+        Con ``normalized`` se sirven los productos de la ingesta (textos
+        recortados, números convertidos y ``tokens`` de búsqueda).
+        """
+        products, version = self._snapshot()
+        if normalized:
+            products = self._ingest(products, version).products
+        return version, self._encode(products, version, mimetype, encoding, normalized)
+
+    def _encode(self, products: List[Dict[str, Any]], version: Optional[str], mimetype: str,
+                encoding: Optional[str], normalized: bool) -> bytes:
+        key = (version, normalized, mimetype, encoding)
+        body = self._encoded.get(key)
+        if body is None:
+            if encoding is None:
+                body = encode(products, mimetype)
+            else:
+                body = compress(self._encode(products, version, mimetype, None, normalized), encoding, best=True)
+            with self._lock:
+                if self._is_current(version):
+                    self._encoded[key] = body
+        return body
+
+    def status(self) -> Dict[str, Any]:
+        """Estado de la caché para la sonda de readiness (no descarga nada)"""
+        loaded = self._products is not None
+        return {
+            "cargado": loaded,
+            "version": self.version,
+            "productos": len(self._products) if loaded else 0,
+            "vigente": self._is_fresh(),
+            "edadSegundos": round(time.monotonic() - self._fetched_at) if loaded else None,
+        }
+
+
+catalog_cache = CatalogCache(CATALOG_URL)
@@ -0,0 +1,236 @@
+"""
+Ingesta del catálogo de productos.
+
+Se ejecuta una sola vez por versión del catálogo (``CatalogCache.ingested``)
+en lugar de en cada carga de página del frontend:
+
+* Normaliza textos (recorta espacios) y convierte los campos numéricos con
+  los mismos defectos que ``catalogProcessor.normalizeCatalog``.
+* Genera los tokens de búsqueda de cada producto: nombre, keywords y código
+  en minúsculas y sin tildes (``"Pañal Cámara"`` -> ``panal``, ``camara``).
+* Valida cada producto (errores y advertencias), detecta códigos y EAN
+  duplicados y calcula por ``linea`` cantidad de productos, rango de precios
+  y valor del stock (céntimos exactos).
+"""
+import math
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .constants import CatalogKeys
+from .money import from_cents, from_cents_array, to_cents_array
+
+TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+MAX_ISSUES = 50
+SIN_LINEA = "SIN LÍNEA"
+
+TEXT_FIELDS = (
+    CatalogKeys.CODIGO, CatalogKeys.NOMBRE, CatalogKeys.EAN,
+    CatalogKeys.EAN_14, CatalogKeys.LINEA, CatalogKeys.KEYWORDS,
+)
+# Campo numérico -> valor por defecto si falta, no es numérico o es 0 (como ``Number(x) || d``)
+NUMERIC_DEFAULTS: Dict[str, Any] = {
+    CatalogKeys.U_POR_CAJA: 1,
+    CatalogKeys.STOCK_REFERENCIAL: 0,
+    CatalogKeys.PRECIO: 0.0,
+    CatalogKeys.PESO: 0.0,
+}
+INTEGER_FIELDS = (CatalogKeys.U_POR_CAJA, CatalogKeys.STOCK_REFERENCIAL)
+
+
+def fold(text: Any) -> str:
+    """Minúsculas sin tildes ni diacríticos"""
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(*texts: Any) -> List[str]:
+    """Tokens de búsqueda (sin repetir, en orden de aparición) de uno o más textos"""
+    # Un solo fold y un solo split para todos los textos; dict.fromkeys conserva el orden
+    tokens = dict.fromkeys(TOKEN_SPLIT.split(fold(" ".join(str(text) for text in texts if text))))
+    tokens.pop("", None)
+    return list(tokens)
+
+
+NUMBER_TYPES = (int, float)
+
+
+def is_number(value: Any) -> bool:
+    # type() en lugar de isinstance: excluye bool (subclase de int) en una sola comparación
+    return type(value) in NUMBER_TYPES
+
+
+def to_number(value: Any, default: Any) -> Any:
+    """Número finito a partir de int/float/str; ``default`` si no se puede o es 0"""
+    if is_number(value):
+        number = value
+    elif isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return default
+    else:
+        return default
+    if not math.isfinite(number):
+        return default
+    return number or default
+
+
+def normalize_product(raw: Dict[str, Any]) -> Dict[str, Any]:
+    product = dict(raw)
+    for key in TEXT_FIELDS:
+        value = raw.get(key)
+        product[key] = "" if value is None else str(value).strip()
+    for key, default in NUMERIC_DEFAULTS.items():
+        product[key] = to_number(raw.get(key), default)
+    for key in INTEGER_FIELDS:
+        value = product[key]
+        if isinstance(value, float) and value.is_integer():
+            product[key] = int(value)
+    product[CatalogKeys.TOKENS] = tokenize(
+        product[CatalogKeys.NOMBRE], product[CatalogKeys.KEYWORDS], product[CatalogKeys.CODIGO]
+    )
+    return product
+
+
+def product_issues(position: int, raw: Dict[str, Any], product: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """(errores, advertencias) de un producto; ``position`` es 1-based como en el frontend"""
+    errors, warnings = [], []
+    label = f"Producto {position}"
+    if not product[CatalogKeys.CODIGO]:
+        errors.append(f"{label}: código es requerido")
+    if not product[CatalogKeys.NOMBRE]:
+        errors.append(f"{label}: nombre es requerido")
+    precio = raw.get(CatalogKeys.PRECIO)
+    if not is_number(precio):
+        errors.append(f"{label}: precio debe ser un número válido")
+    elif precio < 0:
+        errors.append(f"{label}: precio no puede ser negativo")
+    for key in INTEGER_FIELDS:
+        value = raw.get(key)
+        if value and not is_number(value):
+            errors.append(f"{label}: {key} debe ser un número")
+        elif is_number(value) and value < 0:
+            errors.append(f"{label}: {key} no puede ser negativo")
+
+    if product[CatalogKeys.CODIGO] and len(product[CatalogKeys.CODIGO]) < 3:
+        warnings.append(f"{label}: código muy corto")
+    if product[CatalogKeys.NOMBRE] and len(product[CatalogKeys.NOMBRE]) < 5:
+        warnings.append(f"{label}: nombre muy corto")
+    if is_number(precio) and precio > 1000:
+        warnings.append(f"{label}: precio muy alto (>1000)")
+    return errors, warnings
+
+
+def duplicates(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Códigos repetidos (veces) y EAN/EAN-14 compartidos por más de un código"""
+    code_counts = Counter(p[CatalogKeys.CODIGO] for p in products if p[CatalogKeys.CODIGO])
+    codes_by_ean: Dict[str, List[str]] = defaultdict(list)
+    for p in products:
+        for key in (CatalogKeys.EAN, CatalogKeys.EAN_14):
+            ean = p[key]
+            if ean and p[CatalogKeys.CODIGO] not in codes_by_ean[ean]:
+                codes_by_ean[ean].append(p[CatalogKeys.CODIGO])
+    return {
+        "codigos": {code: count for code, count in code_counts.items() if count > 1},
+        "eans": {ean: codes for ean, codes in codes_by_ean.items() if len(codes) > 1},
+    }
+
+
+def line_stats(products: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Por línea: productos, productos con precio, precio mínimo/máximo/promedio,
+    stock y valor del stock; y el valor total del stock en céntimos.
+    """
+    if not products:
+        return {}, 0
+    labels, groups = np.unique([p[CatalogKeys.LINEA] or SIN_LINEA for p in products], return_inverse=True)
+    n = len(labels)
+    prices = to_cents_array([p[CatalogKeys.PRECIO] for p in products])
+    stock = np.array([p[CatalogKeys.STOCK_REFERENCIAL] for p in products], dtype=np.float64)
+    priced = prices > 0
+
+    counts = np.bincount(groups, minlength=n)
+    priced_counts = np.bincount(groups, weights=priced, minlength=n).astype(np.int64)
+    price_sums = np.bincount(groups, weights=np.where(priced, prices, 0), minlength=n)
+    stock_sums = np.bincount(groups, weights=stock, minlength=n)
+    value_cents = np.bincount(groups, weights=prices * stock, minlength=n)
+    minimum = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+    maximum = np.zeros(n, dtype=np.int64)
+    np.minimum.at(minimum, groups[priced], prices[priced])
+    np.maximum.at(maximum, groups[priced], prices[priced])
+    minimum[priced_counts == 0] = 0
+    average = np.divide(price_sums, priced_counts, out=np.zeros(n), where=priced_counts > 0)
+
+    min_values = from_cents_array(minimum).tolist()
+    max_values = from_cents_array(maximum).tolist()
+    lines = {
+        str(label): {
+            "productos": int(counts[i]),
+            "conPrecio": int(priced_counts[i]),
+            "precioMin": min_values[i],
+            "precioMax": max_values[i],
+            "precioPromedio": from_cents(round(average[i])),
+            "stock": int(stock_sums[i]) if stock_sums[i].is_integer() else float(stock_sums[i]),
+            "valorStock": from_cents(round(value_cents[i])),
+        }
+        for i, label in enumerate(labels)
+    }
+    return lines, round(value_cents.sum())
+
+
+class CatalogIngest:
+    """Resultado de la ingesta de una versión del catálogo"""
+
+    def __init__(self, raw_products: List[Dict[str, Any]], version: Optional[str]):
+        started_at = time.perf_counter()
+        self.version = version
+        self.products: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        warnings: List[str] = []
+        error_count = warning_count = invalid = 0
+
+        for position, raw in enumerate(raw_products, 1):
+            if not isinstance(raw, dict):
+                invalid += 1
+                error_count += 1
+                if len(errors) < MAX_ISSUES:
+                    errors.append(f"Producto {position}: no es un objeto")
+                continue
+            product = normalize_product(raw)
+            product_errors, product_warnings = product_issues(position, raw, product)
+            error_count += len(product_errors)
+            warning_count += len(product_warnings)
+            errors.extend(product_errors[:MAX_ISSUES - len(errors)])
+            warnings.extend(product_warnings[:MAX_ISSUES - len(warnings)])
+            if product_errors:
+                invalid += 1
+            self.products.append(product)
+
+        prices = [p[CatalogKeys.PRECIO] for p in self.products if p[CatalogKeys.PRECIO] > 0]
+        lines, total_cents = line_stats(self.products)
+        self.stats: Dict[str, Any] = {
+            "version": version,
+            "productos": len(raw_products),
+            "validos": len(raw_products) - invalid,
+            "codigosUnicos": len({p[CatalogKeys.CODIGO] for p in self.products}),
+            "nombresUnicos": len({p[CatalogKeys.NOMBRE] for p in self.products}),
+            "precios": {
+                "min": min(prices, default=0.0),
+                "max": max(prices, default=0.0),
+                "promedio": round(sum(prices) / len(prices), 2) if prices else 0.0,
+            },
+            "duplicados": duplicates(self.products),
+            "lineas": lines,
+            "valorTotal": from_cents(total_cents),
+            "errores": {"total": error_count, "primeros": errors},
+            "advertencias": {"total": warning_count, "primeros": warnings},
+        }
+        self.stats["ingestaMs"] = round((time.perf_counter() - started_at) * 1000, 2)
@@ -0,0 +1,118 @@
+"""
+Circuit breakers para los servicios externos (SUNAT, catálogo).
+
+Tras ``CIRCUIT_FAILURE_THRESHOLD`` fallos seguidos (errores de conexión,
+timeouts o respuestas 5xx) el circuito se abre y las llamadas fallan de
+inmediato con ``CircuitOpenError`` durante ``CIRCUIT_RESET_SECONDS``; luego
+se deja pasar una llamada de prueba (semiabierto) que lo cierra o lo vuelve a
+abrir. ``CircuitOpenError`` es un ``RequestException``, así que los manejadores
+existentes (503, copia previa del catálogo) lo tratan como un fallo de red.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+import requests
+
+from .metrics import REGISTRY
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+CIRCUIT_OPEN = REGISTRY.gauge("upstream_circuit_open", "1 si el circuito del servicio externo está abierto.", ("service",))
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Solo los fallos del servicio cuentan; un 404 o 401 es una respuesta válida"""
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return exc.response is not None and exc.response.status_code >= 500
+    return isinstance(exc, requests.exceptions.RequestException) and not isinstance(exc, CircuitOpenError)
+
+
+class CircuitBreaker:
+    def __init__(self, service: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = CLOSED
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(f"Servicio {self.service} no disponible (circuito abierto).")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._state = CLOSED
+            self._probe_in_flight = False
+        CIRCUIT_OPEN.set(0, service=self.service)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            opened = self._state == OPEN or self._failures >= self.failure_threshold
+            if opened:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+        if opened:
+            CIRCUIT_OPEN.set(1, service=self.service)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        self.before_call()
+        try:
+            yield
+        except BaseException as e:
+            if is_upstream_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        info: Dict[str, Any] = {"estado": state, "fallosSeguidos": self._failures}
+        if state != CLOSED:
+            info["reintentoEn"] = max(0.0, round(self.reset_seconds - (time.monotonic() - self._opened_at), 1))
+        return info
+
+
+CIRCUITS: Dict[str, CircuitBreaker] = {
+    "sunat": CircuitBreaker("sunat"),
+    "catalog": CircuitBreaker("catalog"),
+}
+
+
+def circuit_breaker(service: str):
+    """``with circuit_breaker('sunat'):`` alrededor de la llamada al servicio"""
+    return CIRCUITS[service].guard()
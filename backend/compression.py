@@ -0,0 +1,91 @@
+"""
+Compresión de respuestas HTTP (gzip y, si está instalado ``brotli``, br).
+
+La codificación se negocia con ``Accept-Encoding``. Solo se comprimen
+respuestas de tipos textuales a partir de ``COMPRESSION_MIN_BYTES``; los XLSX
+ya son ZIP y las respuestas con archivo o en streaming se dejan tal cual.
+Los cuerpos cacheables (p. ej. el catálogo) se comprimen una sola vez con
+``compress`` y llegan aquí con ``Content-Encoding`` ya puesto.
+"""
+import gzip
+import os
+from typing import Optional
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+# Niveles por petición (equilibrio CPU/tamaño); el contenido cacheado usa el máximo
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+GZIP_LEVEL_MAX = 9
+BROTLI_QUALITY_MAX = 11
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+def supported_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """Mejor codificación aceptada por el cliente (br antes que gzip), o None"""
+    accepted = request.accept_encodings
+    for encoding in supported_encodings():
+        if accepted[encoding]:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY_MAX if best else BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0: mismo resultado para el mismo contenido (útil para ETag y caché)
+        return gzip.compress(data, compresslevel=GZIP_LEVEL_MAX if best else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Codificación no soportada: {encoding}")
+
+
+def is_compressible(response: Response) -> bool:
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def compress_response(response: Response, request: Request) -> Response:
+    """Comprime la respuesta si el cliente lo acepta y vale la pena"""
+    response.vary.add("Accept-Encoding")
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or request.method == "HEAD"
+        or not is_compressible(response)
+    ):
+        return response
+
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_BYTES:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # Cada representación comprimida necesita su propio ETag
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
@@ -0,0 +1,112 @@
+"""
+Límites de concurrencia por grupo de rutas y ejecución de trabajo de CPU.
+
+Con gevent todas las peticiones de un proceso comparten un único hilo: una
+exportación que calcula y serializa un libro durante segundos bloquearía las
+consultas de RUC y de catálogo, que solo esperan red. Por eso:
+
+* ``limit_concurrency(grupo)`` acota las peticiones simultáneas de cada grupo
+  (``export``, ``upstream``); si no hay cupo tras ``CONCURRENCY_WAIT_SECONDS``
+  responde 503 con ``Retry-After``.
+* ``run_cpu_bound`` ejecuta el trabajo pesado en el threadpool nativo de gevent
+  (hilos del sistema), así el hub sigue atendiendo E/S mientras tanto. Sin
+  gevent (servidor de desarrollo) la función se ejecuta directamente. Si la
+  petición se está perfilando (``g.profile``), el hilo del pool también se
+  perfila.
+"""
+import contextvars
+import os
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict
+
+from flask import g, has_app_context, jsonify
+
+from .metrics import REGISTRY
+
+CONCURRENCY_LIMITS: Dict[str, int] = {
+    # Exportaciones: CPU; más de un par por proceso solo compite por el GIL
+    "export": int(os.environ.get("EXPORT_CONCURRENCY", "2")),
+    # Llamadas a servicios externos (SUNAT, catálogo): solo esperan red
+    "upstream": int(os.environ.get("UPSTREAM_CONCURRENCY", "100")),
+}
+CONCURRENCY_WAIT_SECONDS = float(os.environ.get("CONCURRENCY_WAIT_SECONDS", "30"))
+
+IN_FLIGHT = REGISTRY.gauge("concurrency_in_flight", "Peticiones en curso por grupo de concurrencia.", ("group",))
+REJECTED = REGISTRY.counter("concurrency_rejected_total", "Peticiones rechazadas (503) por falta de cupo.", ("group",))
+
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_semaphores_lock = threading.Lock()
+
+
+def _semaphore(group: str) -> threading.BoundedSemaphore:
+    # Se crean en el primer uso: tras el monkey-patching de gevent el semáforo es cooperativo
+    semaphore = _semaphores.get(group)
+    if semaphore is None:
+        with _semaphores_lock:
+            semaphore = _semaphores.get(group)
+            if semaphore is None:
+                semaphore = _semaphores[group] = threading.BoundedSemaphore(CONCURRENCY_LIMITS[group])
+    return semaphore
+
+
+def limit_concurrency(group: str) -> Callable:
+    """Decorador de rutas: como máximo ``CONCURRENCY_LIMITS[group]`` peticiones a la vez"""
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            semaphore = _semaphore(group)
+            if not semaphore.acquire(timeout=CONCURRENCY_WAIT_SECONDS):
+                REJECTED.inc(group=group)
+                response = jsonify({"error": "El servidor está ocupado, intenta nuevamente en unos segundos."})
+                response.headers["Retry-After"] = str(max(1, int(CONCURRENCY_WAIT_SECONDS // 10)))
+                return response, 503
+            IN_FLIGHT.inc(group=group)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                IN_FLIGHT.dec(group=group)
+                semaphore.release()
+        return wrapper
+    return decorator
+
+
+def gevent_active() -> bool:
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def run_cpu_bound(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Ejecuta ``fn`` fuera del hub de gevent (si está activo) conservando el contexto"""
+    context = contextvars.copy_context()
+    if not gevent_active():
+        return context.run(fn, *args, **kwargs)
+    import gevent
+    profile = g.get('profile') if has_app_context() else None
+    if profile is not None:
+        args = (fn, *args)
+        fn = profile.run
+    return gevent.get_hub().threadpool.apply(context.run, (fn, *args), kwargs)
+
+
+def cpu_pool_status() -> Dict[str, Any]:
+    """Estado del pool donde corre ``run_cpu_bound`` (para la sonda de readiness)"""
+    if not gevent_active():
+        return {"modo": "inline", "listo": True}
+    import gevent
+    pool = gevent.get_hub().threadpool
+    return {
+        "modo": "gevent-threadpool",
+        "listo": pool.maxsize > 0,
+        "hilos": pool.size,
+        "maximo": pool.maxsize,
+        "pendientes": pool.task_queue.qsize(),
+    }
+
+
+def warm_cpu_pool() -> None:
+    """Arranca un hilo del pool antes de la primera exportación"""
+    run_cpu_bound(lambda: None)
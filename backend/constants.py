@@ -22,3 +22,16 @@ class ProductKeys:
 class UserKeys:
     NOMBRE = 'nombre'
     CORREO = 'correo'
+
+class CatalogKeys:
+    CODIGO = 'codigo'
+    NOMBRE = 'nombre'
+    EAN = 'ean'
+    EAN_14 = 'ean_14'
+    U_POR_CAJA = 'u_por_caja'
+    STOCK_REFERENCIAL = 'stock_referencial'
+    LINEA = 'linea'
+    KEYWORDS = 'keywords'
+    PRECIO = 'precio'
+    PESO = 'can_kg_um'
+    TOKENS = 'tokens'
@@ -0,0 +1,418 @@
+"""
+Borradores de listas de exportación en el servidor.
+
+Un borrador guarda el payload de ``/export-xlsx`` de un usuario y módulo
+(``tipo``) para que el frontend no reenvíe la lista completa en cada
+exportación: se sube una vez (``POST /api/drafts``, siempre con un id nuevo)
+y luego se envían solo los cambios (``PATCH /api/drafts/<id>``) con
+operaciones al estilo JSON Patch, donde los productos se direccionan por
+``codigo``::
+
+    {"op": "add",     "path": "/list/-",             "value": {...producto...}}
+    {"op": "replace", "path": "/list/P001/cantidad", "value": 12}
+    {"op": "remove",  "path": "/list/P001"}
+    {"op": "replace", "path": "/totales",            "value": {...}}
+
+``PUT /api/drafts/<id>?version=n`` reemplaza el borrador completo. El id es
+la credencial del borrador (nunca se busca por usuario), así nadie puede
+pisar ni descubrir el borrador de otro. ``/export-xlsx`` acepta
+``{"draftId": ...}`` en lugar del cuerpo completo. En un PATCH solo se
+validan los productos y secciones que cambian (con los esquemas por fila de
+las exportaciones NDJSON) y en SQLite solo se escriben esas filas, así el
+costo de cada actualización es el del cambio y no el de la lista.
+
+Los borradores viven en memoria (LRU de ``DRAFT_CACHE_MAX``) y en SQLite
+(``DRAFTS_DB``); cada acceso compara la versión en memoria con la de la base
+(lectura por clave primaria), así varios procesos comparten los borradores
+sin servir datos viejos. ``version`` en un PATCH o en la exportación responde
+409 si el borrador cambió entretanto.
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonschema import ValidationError
+
+from .constants import ProductKeys
+from .serialization import dumps_bytes
+from .validation import ndjson_validators, validate_instance
+
+DRAFTS_DB = os.environ.get(
+    "DRAFTS_DB",
+    os.path.join(os.path.dirname(__file__), "data", "drafts.sqlite3"),
+)
+DRAFT_CACHE_MAX = int(os.environ.get("DRAFT_CACHE_MAX", "64"))
+DRAFT_TTL_DAYS = int(os.environ.get("DRAFT_TTL_DAYS", "30"))
+MAX_PATCH_OPERATIONS = 10000
+
+# Secciones del payload (además de ``list``) que guarda el borrador
+HEADER_SECTIONS = ("form", "usuario", "totales", "opciones")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    header BLOB NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_drafts_updated_at ON drafts (updated_at);
+CREATE TABLE IF NOT EXISTS draft_items (
+    draft_id TEXT NOT NULL,
+    codigo TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    item BLOB NOT NULL,
+    PRIMARY KEY (draft_id, codigo)
+) WITHOUT ROWID;
+"""
+
+
+class DraftError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def owner_key(usuario: Any) -> str:
+    """Dueño del borrador: el correo del usuario (o su nombre), sin distinguir mayúsculas"""
+    usuario = usuario if isinstance(usuario, dict) else {}
+    return str(usuario.get("correo") or usuario.get("nombre") or "").strip().lower()
+
+
+def unescape(segment: str) -> str:
+    """Segmento de un JSON Pointer (RFC 6901): ``~1`` -> ``/``, ``~0`` -> ``~``"""
+    return segment.replace("~1", "/").replace("~0", "~")
+
+
+class Draft:
+    __slots__ = ("id", "owner", "tipo", "version", "header", "items", "positions", "updated_at")
+
+    def __init__(self, draft_id: str, owner: str, tipo: str, version: int, header: Dict[str, Any],
+                 items: "OrderedDict[str, Dict[str, Any]]", positions: Dict[str, int], updated_at: str):
+        self.id = draft_id
+        self.owner = owner
+        self.tipo = tipo
+        self.version = version
+        self.header = header
+        self.items = items
+        self.positions = positions
+        self.updated_at = updated_at
+
+    def payload(self) -> Dict[str, Any]:
+        """Payload de ``/export-xlsx`` equivalente al borrador"""
+        return {"tipo": self.tipo, **self.header, "list": list(self.items.values())}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "draftId": self.id,
+            "tipo": self.tipo,
+            "version": self.version,
+            "items": len(self.items),
+            "updatedAt": self.updated_at,
+        }
+
+    def next_position(self) -> int:
+        return max(self.positions.values(), default=-1) + 1
+
+
+class DraftPatch:
+    """Cambios de un PATCH aplicados sobre una copia; el borrador no se toca hasta guardarlos"""
+
+    def __init__(self, draft: Draft):
+        self.draft = draft
+        self.header = dict(draft.header)
+        self.header_changed = False
+        # codigo -> producto nuevo o None si se elimina
+        self.items: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def current(self, codigo: str) -> Optional[Dict[str, Any]]:
+        if codigo in self.items:
+            return self.items[codigo]
+        return self.draft.items.get(codigo)
+
+    def apply(self, index: int, operation: Any):
+        if not isinstance(operation, dict):
+            raise DraftError(f"Operación {index}: se esperaba un objeto")
+        op, path = operation.get("op"), operation.get("path")
+        if op not in ("add", "replace", "remove") or not isinstance(path, str) or not path.startswith("/"):
+            raise DraftError(f"Operación {index}: se requiere 'op' (add, replace o remove) y un 'path' válido")
+        if op != "remove" and "value" not in operation:
+            raise DraftError(f"Operación {index}: falta 'value'")
+        segments = [unescape(segment) for segment in path[1:].split("/")]
+        section, rest = segments[0], segments[1:]
+        if section == "list" and rest:
+            self._apply_item(index, op, rest, operation.get("value"))
+        elif section in HEADER_SECTIONS and op != "remove":
+            self._apply_header(index, section, rest, operation["value"])
+        else:
+            raise DraftError(f"Operación {index}: ruta no soportada: {path}")
+
+    def _apply_item(self, index: int, op: str, rest: List[str], value: Any):
+        codigo = rest[0]
+        if len(rest) == 1:
+            if op == "remove":
+                if self.current(codigo) is None:
+                    raise DraftError(f"Operación {index}: no existe el producto {codigo}")
+                self.items[codigo] = None
+                return
+            if not isinstance(value, dict):
+                raise DraftError(f"Operación {index}: el producto debe ser un objeto")
+            # "/list/-" agrega (o reemplaza) según el código del producto
+            key = str(value.get(ProductKeys.CODIGO, "")) if codigo == "-" else codigo
+            if not key or str(value.get(ProductKeys.CODIGO, key)) != key:
+                raise DraftError(f"Operación {index}: el 'codigo' del producto no coincide con la ruta")
+            if op == "replace" and self.current(key) is None:
+                raise DraftError(f"Operación {index}: no existe el producto {key}")
+            self.items[key] = value
+            return
+        if len(rest) != 2 or rest[1] == ProductKeys.CODIGO:
+            raise DraftError(f"Operación {index}: solo se pueden modificar campos directos del producto")
+        item = self.current(codigo)
+        if item is None:
+            raise DraftError(f"Operación {index}: no existe el producto {codigo}")
+        item = dict(item)
+        if op == "remove":
+            item.pop(rest[1], None)
+        else:
+            item[rest[1]] = value
+        self.items[codigo] = item
+
+    def _apply_header(self, index: int, section: str, rest: List[str], value: Any):
+        if not rest:
+            self.header[section] = value
+        elif len(rest) == 1 and isinstance(self.header.get(section, {}), dict):
+            self.header[section] = {**self.header.get(section, {}), rest[0]: value}
+        else:
+            raise DraftError(f"Operación {index}: ruta no soportada: /{section}/{'/'.join(rest)}")
+        self.header_changed = True
+
+    def validate(self):
+        """Valida solo lo que cambió, con los esquemas de encabezado y de fila del tipo"""
+        header_validator, row_validator = ndjson_validators(self.draft.tipo)
+        try:
+            if self.header_changed:
+                validate_instance(header_validator, {"tipo": self.draft.tipo, **self.header})
+        except ValidationError as e:
+            raise DraftError(f"Encabezado inválido: {e.message}")
+        for codigo, item in self.items.items():
+            if item is None:
+                continue
+            try:
+                validate_instance(row_validator, item)
+            except ValidationError as e:
+                raise DraftError(f"Producto {codigo} inválido: {e.message}")
+        if self.header_changed and owner_key(self.header.get("usuario")) != self.draft.owner:
+            raise DraftError("No se puede cambiar el usuario de un borrador")
+
+
+class DraftStore:
+    """Borradores en SQLite con una caché LRU en memoria de los más usados"""
+
+    def __init__(self, db_path: str = DRAFTS_DB, cache_max: int = DRAFT_CACHE_MAX, ttl_days: int = DRAFT_TTL_DAYS):
+        # Cada operación abre su propia conexión: con ":memory:" cada una vería una base vacía
+        if db_path == ":memory:":
+            raise ValueError("Los borradores requieren un archivo SQLite, no ':memory:'")
+        self.db_path = db_path
+        self.cache_max = cache_max
+        self.ttl_days = ttl_days
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Draft]" = OrderedDict()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _remember(self, draft: Draft):
+        self._cache[draft.id] = draft
+        self._cache.move_to_end(draft.id)
+        while len(self._cache) > self.cache_max:
+            self._cache.popitem(last=False)
+
+    def _load(self, conn: sqlite3.Connection, draft_id: str) -> Optional[Draft]:
+        """Borrador vigente: el de memoria si su versión coincide con la de la base"""
+        row = conn.execute("SELECT owner, tipo, version, header, updated_at FROM drafts WHERE id = ?", (draft_id,)).fetchone()
+        if row is None:
+            self._cache.pop(draft_id, None)
+            return None
+        owner, tipo, version, header, updated_at = row
+        cached = self._cache.get(draft_id)
+        if cached is not None and cached.version == version:
+            self._cache.move_to_end(draft_id)
+            return cached
+        items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        positions: Dict[str, int] = {}
+        for codigo, position, item in conn.execute(
+            "SELECT codigo, position, item FROM draft_items WHERE draft_id = ? ORDER BY position", (draft_id,)
+        ):
+            items[codigo] = json.loads(item)
+            positions[codigo] = position
+        draft = Draft(draft_id, owner, tipo, version, json.loads(header), items, positions, updated_at)
+        self._remember(draft)
+        return draft
+
+    def get(self, draft_id: Any, version: Any = None) -> Draft:
+        """Borrador por id; DraftError 404 si no existe y 409 si ``version`` no es la actual"""
+        if not isinstance(draft_id, str) or not draft_id:
+            raise DraftError("Se requiere 'draftId'.")
+        with self._lock, closing(self._connect()) as conn:
+            draft = self._load(conn, draft_id)
+        if draft is None:
+            raise DraftError(f"No existe el borrador {draft_id}.", 404)
+        if version is not None and version != draft.version:
+            raise DraftError(f"El borrador cambió (versión {draft.version}).", 409)
+        return draft
+
+    def put(self, payload: Dict[str, Any], draft_id: Any = None, version: Any = None) -> Draft:
+        """
+        Guarda el payload completo (ya validado). Sin ``draft_id`` crea siempre
+        un borrador nuevo con un id nuevo; con ``draft_id`` reemplaza ese
+        borrador solo si ``version`` es la actual (409 si cambió). El id es la
+        única credencial del borrador: nunca se busca por usuario.
+        """
+        owner = owner_key(payload.get("usuario"))
+        if not owner:
+            raise DraftError("El borrador requiere 'usuario' con correo o nombre.")
+        tipo = payload["tipo"]
+        items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for item in payload.get("list", []):
+            codigo = str(item.get(ProductKeys.CODIGO, ""))
+            if codigo in items:
+                raise DraftError(f"Producto {codigo} repetido: los productos del borrador se identifican por código.")
+            items[codigo] = item
+        header = {section: payload[section] for section in HEADER_SECTIONS if section in payload}
+        if draft_id is not None:
+            if not isinstance(version, int) or isinstance(version, bool):
+                raise DraftError("Para reemplazar un borrador se requiere su 'version' actual.")
+            current = self.get(draft_id, version)
+            if current.owner != owner or current.tipo != tipo:
+                raise DraftError("No se puede cambiar el usuario ni el tipo de un borrador")
+        updated_at = now_iso()
+
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._purge(conn)
+            if draft_id is None:
+                draft_id, version = secrets.token_urlsafe(16), 1
+                conn.execute(
+                    "INSERT INTO drafts (id, owner, tipo, version, header, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (draft_id, owner, tipo, version, dumps_bytes(header), updated_at),
+                )
+            else:
+                # La condición de versión detecta un cambio concurrente entre get() y esta escritura
+                cursor = conn.execute(
+                    "UPDATE drafts SET version = version + 1, header = ?, updated_at = ? WHERE id = ? AND version = ?",
+                    (dumps_bytes(header), updated_at, draft_id, version),
+                )
+                if cursor.rowcount == 0:
+                    self._cache.pop(draft_id, None)
+                    raise DraftError("El borrador cambió mientras se reemplazaba; vuelve a intentarlo.", 409)
+                version += 1
+                conn.execute("DELETE FROM draft_items WHERE draft_id = ?", (draft_id,))
+            conn.executemany(
+                "INSERT INTO draft_items (draft_id, codigo, position, item) VALUES (?, ?, ?, ?)",
+                [(draft_id, codigo, position, dumps_bytes(item)) for position, (codigo, item) in enumerate(items.items())],
+            )
+            draft = Draft(draft_id, owner, tipo, version, header, items, {codigo: i for i, codigo in enumerate(items)}, updated_at)
+            self._remember(draft)
+        return draft
+
+    def patch(self, draft_id: Any, operations: Any, version: Any = None) -> Draft:
+        """Aplica las operaciones de forma atómica: todas o ninguna"""
+        if not isinstance(operations, list) or not operations:
+            raise DraftError("Se requiere 'ops' con al menos una operación.")
+        if len(operations) > MAX_PATCH_OPERATIONS:
+            raise DraftError(f"Como máximo {MAX_PATCH_OPERATIONS} operaciones por PATCH; sube la lista completa.")
+        draft = self.get(draft_id, version)
+        changes = DraftPatch(draft)
+        for index, operation in enumerate(operations):
+            changes.apply(index, operation)
+        changes.validate()
+        return self._save(changes)
+
+    def _save(self, changes: DraftPatch) -> Draft:
+        draft = changes.draft
+        updated_at = now_iso()
+        with self._lock, closing(self._connect()) as conn, conn:
+            # La condición de versión bloquea la base y detecta un PATCH concurrente de otro proceso
+            cursor = conn.execute(
+                "UPDATE drafts SET version = version + 1, header = ?, updated_at = ? WHERE id = ? AND version = ?",
+                (dumps_bytes(changes.header), updated_at, draft.id, draft.version),
+            )
+            if cursor.rowcount == 0:
+                self._cache.pop(draft.id, None)
+                raise DraftError("El borrador cambió mientras se aplicaba el PATCH; vuelve a intentarlo.", 409)
+            next_position = draft.next_position()
+            positions = dict(draft.positions)
+            upserts: List[Tuple[str, str, int, bytes]] = []
+            removed: List[Tuple[str, str]] = []
+            for codigo, item in changes.items.items():
+                if item is None:
+                    if positions.pop(codigo, None) is not None:
+                        removed.append((draft.id, codigo))
+                    continue
+                if codigo not in positions:
+                    positions[codigo] = next_position
+                    next_position += 1
+                upserts.append((draft.id, codigo, positions[codigo], dumps_bytes(item)))
+            conn.executemany("DELETE FROM draft_items WHERE draft_id = ? AND codigo = ?", removed)
+            conn.executemany(
+                """
+                INSERT INTO draft_items (draft_id, codigo, position, item) VALUES (?, ?, ?, ?)
+                ON CONFLICT (draft_id, codigo) DO UPDATE SET item = excluded.item
+                """,
+                upserts,
+            )
+
+            items = draft.items.copy()
+            for codigo, item in changes.items.items():
+                if item is None:
+                    items.pop(codigo, None)
+                else:
+                    items[codigo] = item
+            updated = Draft(draft.id, draft.owner, draft.tipo, draft.version + 1, changes.header, items, positions, updated_at)
+            self._remember(updated)
+        return updated
+
+    def delete(self, draft_id: Any):
+        draft = self.get(draft_id)
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM draft_items WHERE draft_id = ?", (draft.id,))
+            conn.execute("DELETE FROM drafts WHERE id = ?", (draft.id,))
+            self._cache.pop(draft.id, None)
+
+    def _purge(self, conn: sqlite3.Connection):
+        """Elimina los borradores sin cambios en ``ttl_days`` días"""
+        cutoff = (datetime.now() - timedelta(days=self.ttl_days)).isoformat(timespec="seconds")
+        expired = [row[0] for row in conn.execute("SELECT id FROM drafts WHERE updated_at < ?", (cutoff,))]
+        for draft_id in expired:
+            conn.execute("DELETE FROM draft_items WHERE draft_id = ?", (draft_id,))
+            conn.execute("DELETE FROM drafts WHERE id = ?", (draft_id,))
+            self._cache.pop(draft_id, None)
+
+
+def now_iso() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+_store: Optional[DraftStore] = None
+_store_lock = threading.Lock()
+
+
+def get_draft_store() -> DraftStore:
+    """Instancia perezosa del almacén (la base se crea una sola vez, en el primer uso)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DraftStore()
+    return _store
@@ -0,0 +1,121 @@
+"""
+Sondas de salud del backend.
+
+* Liveness (``GET /api/health``): responde de inmediato con un cuerpo
+  precalculado; no toca cachés ni servicios externos.
+* Readiness (``GET /api/health/ready``): reporta si los validadores del
+  backend activo (``VALIDATION_BACKEND``) están compilados (la sonda los
+  compila si nadie lo hizo), si el pool de CPU está listo, si el catálogo
+  está cargado, el estado de los circuitos hacia SUNAT y el catálogo y la
+  carga de exportaciones. El resultado se calcula como máximo una vez cada
+  ``READINESS_CACHE_SECONDS`` y se reutiliza ya serializado, así que miles de
+  clientes consultando a la vez cuestan lo mismo que uno.
+
+Esquemas y pool son críticos (503 si faltan); catálogo no cargado, un
+circuito abierto o un reciclaje de worker pendiente (ver memory.py) dejan el
+servicio ``degraded`` pero atendiendo (200).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from .admission import EXPORT_ADMISSION
+from .catalog import catalog_cache
+from .circuit import CIRCUITS, CLOSED
+from .concurrency import cpu_pool_status, warm_cpu_pool
+from .memory import memory_governor
+from .serialization import dumps_bytes
+from .sessions import session_store
+from .validation import VALIDATION_BACKEND, compile_schemas, schema_names, schemas_compiled
+
+READINESS_CACHE_SECONDS = float(os.environ.get("READINESS_CACHE_SECONDS", "2"))
+
+READY = "ready"
+DEGRADED = "degraded"
+NOT_READY = "not_ready"
+
+LIVENESS_BODY = dumps_bytes({"status": "ok"})
+
+logger = logging.getLogger(__name__)
+_started_at = time.monotonic()
+
+
+def readiness_checks() -> Dict[str, Any]:
+    total_schemas = len(schema_names())
+    schema_error = None
+    try:
+        # Sin warm_up (gunicorn backend.app:app, flask run) la sonda compila los
+        # validadores del backend activo; después de la primera vez no cuesta nada
+        compile_schemas()
+    except Exception as e:
+        schema_error = str(e)
+        logger.error(f"No se pudieron compilar los validadores: {e}")
+    compiled = schemas_compiled()
+    pool = cpu_pool_status()
+    catalog = catalog_cache.status()
+    circuits = {service: breaker.snapshot() for service, breaker in CIRCUITS.items()}
+    exports = EXPORT_ADMISSION.status()
+    memory = memory_governor.status()
+
+    if compiled < total_schemas or not pool["listo"]:
+        status = NOT_READY
+    elif not catalog["cargado"] or any(c["estado"] != CLOSED for c in circuits.values()) or memory["reciclaje"]:
+        status = DEGRADED
+    else:
+        status = READY
+    return {
+        "status": status,
+        "uptimeSeconds": round(time.monotonic() - _started_at),
+        "checks": {
+            "esquemas": {"compilados": compiled, "total": total_schemas, "backend": VALIDATION_BACKEND, "error": schema_error},
+            "poolCpu": pool,
+            "catalogo": catalog,
+            "circuitos": circuits,
+            "exportaciones": {
+                "celdasEnCurso": exports["celdasEnCurso"],
+                "utilizacion": exports["utilizacion"],
+                "enCola": exports["enCola"],
+            },
+            "sesionesActivas": len(session_store),
+            "memoria": memory,
+        },
+    }
+
+
+class ReadinessProbe:
+    """Resultado de readiness serializado y reutilizado durante ``ttl_seconds``"""
+
+    def __init__(self, ttl_seconds: float = READINESS_CACHE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cached: Tuple[bytes, int] = (b"", 0)
+        self._expires_at = 0.0
+
+    def check(self) -> Tuple[bytes, int]:
+        """(cuerpo JSON, código HTTP)"""
+        if time.monotonic() < self._expires_at:
+            return self._cached
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                result = readiness_checks()
+                self._cached = (dumps_bytes(result), 503 if result["status"] == NOT_READY else 200)
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return self._cached
+
+
+readiness_probe = ReadinessProbe()
+
+
+def warm_up(fetch_catalog: bool = True) -> None:
+    """Calienta lo que mide readiness: esquemas, pool de CPU y catálogo (ya ingerido)"""
+    started_at = time.perf_counter()
+    compiled = compile_schemas()
+    warm_cpu_pool()
+    if fetch_catalog:
+        try:
+            catalog_cache.ingested()
+        except Exception as e:
+            logger.warning(f"No se pudo precargar el catálogo: {e}")
+    logger.info(f"Calentamiento completo: {len(compiled)} esquemas en {time.perf_counter() - started_at:.2f}s")
@@ -0,0 +1,111 @@
+"""
+Configuración de logging del backend.
+
+Los handlers de la aplicación solo encolan el registro (``QueueHandler``); el
+formateo y la escritura ocurren en el hilo de un ``QueueListener``, así una
+petición nunca espera por la E/S del log. Variables de entorno:
+
+* ``LOG_LEVEL``: nivel raíz (``INFO`` por defecto).
+* ``LOG_LEVELS``: niveles por módulo, p. ej. ``backend.catalog=DEBUG,werkzeug=WARNING``.
+* ``LOG_FORMAT``: ``text`` (por defecto) o ``json`` (una línea JSON por registro).
+* ``LOG_FILE``: ruta opcional de un archivo adicional.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Dict, Optional
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+# Atributos estándar de LogRecord; el resto llega vía ``extra`` y se emite como campo
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Encola el registro sin formatearlo; el mensaje se arma en el hilo del listener"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con los campos de ``extra`` al mismo nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato de texto clásico con los campos de ``extra`` como ``clave=valor``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [f'{k}={v}' for k, v in record.__dict__.items() if k not in _RESERVED and not k.startswith('_')]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """``"a=DEBUG,b=WARNING"`` -> ``{"a": "DEBUG", "b": "WARNING"}``"""
+    levels = {}
+    for part in spec.split(','):
+        name, sep, level = part.partition('=')
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None,
+                      fmt: Optional[str] = None, log_file: Optional[str] = None):
+    """Instala el QueueHandler en el logger raíz (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    levels = levels if levels is not None else parse_levels(os.environ.get('LOG_LEVELS', ''))
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+    log_file = log_file or os.environ.get('LOG_FILE')
+
+    formatter = JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.WatchedFileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Vacía la cola y detiene el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
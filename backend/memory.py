@@ -0,0 +1,172 @@
+"""
+Control de memoria de los workers.
+
+Los libros de openpyxl crean millones de objetos pequeños y, tras algunas
+exportaciones grandes, el RSS del proceso queda alto por fragmentación aunque
+los objetos ya se hayan liberado. Después de cada exportación (una vez
+enviada la respuesta) ``MemoryGovernor.after_export``, que ``after_send``
+lanza en un greenlet aparte con gevent para no ocupar el hub al cerrar la
+respuesta:
+
+* con ``MEMORY_GC_MIN_ROWS`` filas o más ejecuta ``gc.collect()`` y, en glibc,
+  ``malloc_trim(0)`` para devolver al sistema las páginas libres (con
+  ``run_cpu_bound``, en el threadpool de gevent si está activo);
+* mide el RSS (y tracemalloc con ``MEMORY_TRACEMALLOC=1``, que tiene costo);
+* si el RSS supera ``MEMORY_RSS_LIMIT_MB`` o el worker llegó a
+  ``MEMORY_MAX_EXPORTS`` exportaciones, pide reciclar el worker. Con gunicorn
+  el worker deja de aceptar conexiones, termina las que tiene y el árbitro
+  lo reemplaza (como ``max_requests``); con ``python -m backend serve`` el
+  servidor se detiene ordenadamente y sale con ``RECYCLE_EXIT_CODE`` para
+  que el supervisor (systemd, Docker) lo reinicie.
+
+``/metrics`` expone el RSS de cada worker (etiqueta ``pid``), el último
+muestreo tras una exportación, las recolecciones y los reciclajes.
+"""
+import ctypes
+import ctypes.util
+import gc
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from .concurrency import gevent_active, run_cpu_bound
+from .metrics import REGISTRY
+
+MEMORY_RSS_LIMIT_MB = int(os.environ.get("MEMORY_RSS_LIMIT_MB", "0"))
+MEMORY_MAX_EXPORTS = int(os.environ.get("MEMORY_MAX_EXPORTS", "0"))
+MEMORY_GC_MIN_ROWS = int(os.environ.get("MEMORY_GC_MIN_ROWS", "2000"))
+MEMORY_TRACEMALLOC = os.environ.get("MEMORY_TRACEMALLOC", "").strip().lower() in ("1", "true", "yes")
+# EX_TEMPFAIL: salida pedida por el control de memoria, no un error
+RECYCLE_EXIT_CODE = 75
+
+WORKER_RSS = REGISTRY.gauge("worker_resident_memory_bytes", "RSS actual del proceso worker.", ("pid",))
+WORKER_RSS_AFTER_EXPORT = REGISTRY.gauge("worker_rss_after_export_bytes", "RSS medido tras la última exportación.", ("pid",))
+WORKER_EXPORTS = REGISTRY.gauge("worker_exports", "Exportaciones atendidas por el worker desde que arrancó.", ("pid",))
+WORKER_TRACEMALLOC = REGISTRY.gauge("worker_tracemalloc_bytes", "Memoria de Python según tracemalloc (actual y pico desde la exportación anterior).", ("pid", "kind"))
+GC_RUNS = REGISTRY.counter("memory_gc_collections_total", "gc.collect() ejecutados tras exportaciones grandes.")
+GC_DURATION = REGISTRY.histogram("memory_gc_duration_seconds", "Duración de gc.collect() + malloc_trim tras una exportación.")
+RECYCLES = REGISTRY.counter("worker_recycles_total", "Reciclajes de worker pedidos por el control de memoria.", ("reason",))
+
+logger = logging.getLogger(__name__)
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _load_malloc_trim() -> Optional[Callable[[int], int]]:
+    """``malloc_trim`` de glibc, o None en otras plataformas"""
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    try:
+        return ctypes.CDLL(name).malloc_trim
+    except (OSError, AttributeError):
+        return None
+
+
+_malloc_trim = _load_malloc_trim()
+
+
+def rss_bytes() -> int:
+    """RSS actual del proceso (psutil, /proc o, como último recurso, el pico de getrusage)"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryGovernor:
+    def __init__(self, rss_limit_mb: int = MEMORY_RSS_LIMIT_MB, max_exports: int = MEMORY_MAX_EXPORTS,
+                 gc_min_rows: int = MEMORY_GC_MIN_ROWS, trace: bool = MEMORY_TRACEMALLOC):
+        self.rss_limit = rss_limit_mb * 1024 * 1024
+        self.max_exports = max_exports
+        self.gc_min_rows = gc_min_rows
+        self.trace = trace
+        self._lock = threading.Lock()
+        self.exports = 0
+        self.last_rss = 0
+        self.recycle_reason: Optional[str] = None
+        # Lo instala el servidor (gunicorn o gevent); sin él solo se registra el pedido
+        self.recycler: Optional[Callable[[], None]] = None
+        self.pid = ""
+
+    def start(self):
+        """Registra las métricas del proceso actual (llamar en cada worker)"""
+        self.pid = str(os.getpid())
+        WORKER_RSS.set_function(rss_bytes, pid=self.pid)
+        WORKER_EXPORTS.set_function(lambda: self.exports, pid=self.pid)
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def collect(self) -> None:
+        started_at = time.perf_counter()
+        gc.collect()
+        if _malloc_trim is not None:
+            _malloc_trim(0)
+        GC_RUNS.inc()
+        GC_DURATION.observe(time.perf_counter() - started_at)
+
+    def after_send(self, rows: int) -> None:
+        """Hook del cierre de la respuesta: con gevent, after_export corre en otro greenlet"""
+        if not gevent_active():
+            self.after_export(rows)
+            return
+        import gevent
+        gevent.spawn(self.after_export, rows)
+
+    def after_export(self, rows: int) -> None:
+        """Tras enviar una exportación: recolecta si fue grande, mide y decide si reciclar"""
+        with self._lock:
+            self.exports += 1
+            exports = self.exports
+        if rows >= self.gc_min_rows:
+            run_cpu_bound(self.collect)
+        rss = rss_bytes()
+        self.last_rss = rss
+        WORKER_RSS_AFTER_EXPORT.set(rss, pid=self.pid)
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            WORKER_TRACEMALLOC.set(current, pid=self.pid, kind="current")
+            WORKER_TRACEMALLOC.set(peak, pid=self.pid, kind="peak")
+            tracemalloc.reset_peak()
+
+        if self.rss_limit and rss > self.rss_limit:
+            self.request_recycle("rss")
+        elif self.max_exports and exports >= self.max_exports:
+            self.request_recycle("exports")
+
+    def request_recycle(self, reason: str) -> None:
+        with self._lock:
+            if self.recycle_reason is not None:
+                return
+            self.recycle_reason = reason
+        RECYCLES.inc(reason=reason)
+        logger.warning(
+            "Reciclando el worker %s (%s): RSS %.0f MB tras %d exportaciones",
+            self.pid, reason, self.last_rss / 1024 / 1024, self.exports,
+        )
+        if self.recycler is not None:
+            self.recycler()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": self.pid,
+            "rssMb": round(rss_bytes() / 1024 / 1024, 1),
+            "limiteRssMb": self.rss_limit // (1024 * 1024) or None,
+            "exportaciones": self.exports,
+            "maxExportaciones": self.max_exports or None,
+            "reciclaje": self.recycle_reason,
+        }
+
+
+memory_governor = MemoryGovernor()
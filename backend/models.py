@@ -0,0 +1,158 @@
+"""
+Modelos Pydantic (v2) de los payloads de exportación.
+
+Son la fuente de los esquemas de ``schemas/`` (``generate_schemas.py``) y,
+con ``VALIDATION_BACKEND=pydantic``, también del validador en tiempo de
+ejecución: ``export_adapter`` construye un ``TypeAdapter`` por tipo una sola
+vez y la validación corre en el núcleo Rust de pydantic-core.
+
+Los modelos validan en modo estricto para aceptar lo mismo que los esquemas
+JSON (sin convertir ``"5"`` en ``5``), y exponen ``get(clave, defecto)`` con la
+semántica de ``dict.get`` (el defecto solo aplica a campos ausentes del
+payload), así los generadores reciben objetos tipados sin cambiar su código.
+"""
+from functools import lru_cache
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, WithJsonSchema
+
+# Marcas por comparación de precios (base + competidores)
+MAX_MARCAS = 50
+
+# El esquema declara "format: email" pero, igual que jsonschema sin
+# FormatChecker, no se verifica el formato (no requiere email-validator)
+Email = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
+
+class PayloadModel(BaseModel):
+    model_config = ConfigDict(strict=True)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Como ``dict.get``: ``default`` si el campo no vino en el payload"""
+        if key in self.model_fields_set:
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.model_fields_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.model_fields_set
+
+
+class Producto(PayloadModel):
+    codigo: str = Field(..., min_length=1)
+    cod_ean: str
+    ean_14: str
+    nombre: str = Field(..., min_length=1)
+    linea: str
+    peso: float = Field(..., ge=0)
+    stock_referencial: int = Field(..., ge=0)
+    precio_referencial: Optional[float] = Field(None, ge=0)
+    cantidad_por_caja: Optional[int] = Field(None, gt=0)
+    keywords: List[str]
+
+
+class ProductoEditado(Producto):
+    cantidad: int = Field(..., gt=0)
+    observaciones: Optional[str] = None
+    precios: Optional[Dict[str, float]] = None
+    precio_sugerido: Optional[float] = Field(None, ge=0)
+
+
+class ProductoInventario(ProductoEditado):
+    # En inventario se cuentan fracciones (kg, metros) y cajas no enteras
+    cantidad: float = Field(..., gt=0, json_schema_extra={
+        "errorMessage": "La cantidad debe ser mayor a 0", "default": 0.01})
+    cantidad_por_caja: Optional[Annotated[float, Field(ge=1, json_schema_extra={
+        "errorMessage": "Unidades por caja no puede ser menor a 1", "default": 1})]] = None
+
+
+class Totales(PayloadModel):
+    totalCantidades: float
+    totalLineas: float
+
+
+class Opciones(PayloadModel):
+    subtotalesPorLinea: bool = False
+    conciliarStock: bool = False
+
+
+class Form(PayloadModel):
+    documentType: Optional[str] = None  # Literal['ruc', 'dni']
+    cliente: Optional[str] = None
+    documento_cliente: Optional[str] = None
+    codigo_cliente: Optional[str] = None
+    fecha: Optional[str] = None
+    marca1: Optional[str] = None
+    marca2: Optional[str] = None
+    marca3: Optional[str] = None
+    marca4: Optional[str] = None
+    marca5: Optional[str] = None
+    sucursal: Optional[str] = None
+    montoOriginal: Optional[float] = None
+
+
+class DevolucionesForm(Form):
+    motivo: Optional[str] = None
+
+
+class PreciosForm(Form):
+    # Cualquier cantidad de marcas (la primera es la base); sin ella se usan marca1..marca5
+    marcas: Optional[List[str]] = Field(None, min_length=1, max_length=MAX_MARCAS)
+
+
+class Usuario(PayloadModel):
+    nombre: str
+    correo: Email
+
+
+class ExportBase(PayloadModel):
+    list: List[ProductoEditado]
+    usuario: Usuario
+
+
+class InventarioExport(ExportBase):
+    list: List[ProductoInventario]
+    tipo: str  # Literal['inventario']
+    form: Form
+    totales: Totales
+    opciones: Opciones = Opciones()
+
+
+class PedidoExport(ExportBase):
+    tipo: str  # Literal['pedido']
+    form: Form
+
+
+class DevolucionesExport(ExportBase):
+    tipo: str  # Literal['devoluciones']
+    form: DevolucionesForm
+
+
+class PreciosExport(ExportBase):
+    tipo: str  # Literal['precios']
+    form: PreciosForm
+
+
+class AllSchemasExport(BaseModel):
+    inventario: InventarioExport
+    pedido: PedidoExport
+    devoluciones: DevolucionesExport
+    precios: PreciosExport
+
+
+EXPORT_MODELS: Dict[str, type] = {
+    'inventario': InventarioExport,
+    'pedido': PedidoExport,
+    'devoluciones': DevolucionesExport,
+    'precios': PreciosExport,
+}
+
+
+@lru_cache(maxsize=None)
+def export_adapter(tipo: str) -> TypeAdapter:
+    """TypeAdapter del tipo de exportación, construido una sola vez; KeyError si no existe"""
+    return TypeAdapter(EXPORT_MODELS[tipo])
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# --------------------------------------------------------------------------- #
+#           backend/money.py - Aritmética monetaria exacta                     #
+#                                                                             #
+# --------------------------------------------------------------------------- #
+"""
+Operaciones monetarias en céntimos enteros.
+
+Los importes se manejan como enteros (``int`` o arreglos ``numpy.int64``) en
+la unidad mínima (céntimos) y solo se convierten a ``float`` al escribir la
+respuesta o la celda de Excel. Así las sumas son exactas y el redondeo se hace
+una única vez por valor.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Iterable, List, Sequence, Union
+
+import numpy as np
+
+CENTS = 100
+_CENT = Decimal("0.01")
+# Tolerancia para compensar la representación binaria (p. ej. 1.005 * 100 = 100.49999...)
+_HALF_UP_EPSILON = 1e-6
+# Importe máximo aceptado: sus céntimos (10**15) se representan exactos como float
+MAX_AMOUNT = Decimal(10) ** 13
+
+ArrayLike = Union[Sequence[Any], np.ndarray]
+
+
+def to_cents(value: Any) -> int:
+    """Convierte un importe (str, int, float o Decimal) a céntimos con redondeo half-up."""
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, AttributeError) as e:
+        raise ValueError(f"Importe inválido: {value!r}") from e
+    if not amount.is_finite():
+        raise ValueError(f"Importe inválido: {value!r}")
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"Importe fuera de rango (máximo {MAX_AMOUNT:,}): {value!r}")
+    try:
+        return int(amount.quantize(_CENT, rounding=ROUND_HALF_UP) * CENTS)
+    except ArithmeticError as e:
+        # InvalidOperation es subclase de ArithmeticError
+        raise ValueError(f"Importe inválido: {value!r}") from e
+
+
+def from_cents(cents: Union[int, np.integer]) -> float:
+    """Convierte céntimos a un ``float`` con dos decimales."""
+    return int(cents) / CENTS
+
+
+def round_half_up(values: ArrayLike) -> np.ndarray:
+    """Redondeo half-up (alejándose de cero) vectorizado a enteros ``int64``."""
+    arr = np.asarray(values, dtype=np.float64)
+    return (np.sign(arr) * np.floor(np.abs(arr) + 0.5 + _HALF_UP_EPSILON)).astype(np.int64)
+
+
+def to_cents_array(values: ArrayLike) -> np.ndarray:
+    """Convierte un arreglo de importes a céntimos ``int64``."""
+    return round_half_up(np.asarray(values, dtype=np.float64) * CENTS)
+
+
+def from_cents_array(cents: np.ndarray) -> np.ndarray:
+    """Convierte un arreglo de céntimos a ``float64`` con dos decimales."""
+    return np.asarray(cents, dtype=np.int64) / CENTS
+
+
+def line_values_cents(cantidades: ArrayLike, precios_cents: ArrayLike) -> np.ndarray:
+    """Valor de cada línea (cantidad × precio) en céntimos, redondeado una sola vez."""
+    cantidades = np.asarray(cantidades, dtype=np.float64)
+    return round_half_up(cantidades * np.asarray(precios_cents, dtype=np.int64))
+
+
+def per_box_hundredths(cantidades: ArrayLike, unidades_por_caja: ArrayLike) -> np.ndarray:
+    """Cajas por línea en centésimas; las líneas sin unidades por caja válidas valen 0."""
+    cantidades = np.asarray(cantidades, dtype=np.float64)
+    unidades = np.asarray(unidades_por_caja, dtype=np.float64)
+    cajas = np.divide(cantidades * CENTS, unidades, out=np.zeros_like(cantidades), where=unidades > 0)
+    return round_half_up(cajas)
+
+
+def weight_hundredths(cantidades: ArrayLike, pesos: ArrayLike) -> np.ndarray:
+    """Peso total por línea (cantidad × peso unitario) en centésimas."""
+    cantidades = np.asarray(cantidades, dtype=np.float64)
+    return round_half_up(cantidades * np.asarray(pesos, dtype=np.float64) * CENTS)
+
+
+def allocate_cents(total_cents: int, weights: Union[int, Iterable[float]]) -> List[int]:
+    """
+    Reparte ``total_cents`` según ``weights`` con el método del mayor residuo.
+
+    Si ``weights`` es un entero ``n`` se reparte en ``n`` partes iguales. La suma
+    del resultado es siempre exactamente ``total_cents``. Ante residuos iguales
+    el céntimo sobrante va a las últimas partes, igual que el ajuste del último
+    pago que se hacía antes.
+    """
+    if isinstance(weights, (int, np.integer)):
+        if weights <= 0:
+            raise ValueError("El número de partes debe ser mayor a 0")
+        base, remainder = divmod(int(total_cents), int(weights))
+        shares = np.full(int(weights), base, dtype=np.int64)
+        if remainder:
+            shares[-remainder:] += 1
+        return shares.tolist()
+
+    w = np.asarray(list(weights), dtype=np.float64)
+    if w.size == 0 or np.any(w < 0) or w.sum() <= 0:
+        raise ValueError("Los pesos deben ser no negativos y sumar más de 0")
+    exact = total_cents * w / w.sum()
+    shares = np.floor(exact).astype(np.int64)
+    remainder = int(total_cents - shares.sum())
+    if remainder:
+        # Orden estable por residuo descendente; se invierte para favorecer a las últimas partes
+        order = np.argsort(-(exact - shares)[::-1], kind="stable")[:remainder]
+        shares[w.size - 1 - order] += 1
+    return shares.tolist()
@@ -0,0 +1,219 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from .constants import ProductKeys
+from .money import to_cents, from_cents
+
+PRICE_HISTORY_DB = os.environ.get(
+    "PRICE_HISTORY_DB",
+    os.path.join(os.path.dirname(__file__), "data", "price_history.sqlite3"),
+)
+
+logger = logging.getLogger(__name__)
+
+# observations: una fila por (comparación, producto, marca), solo se inserta.
+# price_daily: rollup diario por (codigo, marca) para consultas de tendencia.
+# price_gaps: última brecha base vs. competidor más barato por codigo, indexada por gap_bp.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comparisons (
+    id INTEGER PRIMARY KEY,
+    observed_at TEXT NOT NULL,
+    cliente TEXT,
+    usuario TEXT,
+    base_marca TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    comparison_id INTEGER NOT NULL REFERENCES comparisons(id),
+    day TEXT NOT NULL,
+    codigo TEXT NOT NULL,
+    marca TEXT NOT NULL,
+    precio_cents INTEGER NOT NULL,
+    is_base INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_codigo_marca_day ON observations (codigo, marca, day);
+CREATE INDEX IF NOT EXISTS idx_observations_day ON observations (day);
+CREATE TABLE IF NOT EXISTS price_daily (
+    codigo TEXT NOT NULL,
+    marca TEXT NOT NULL,
+    day TEXT NOT NULL,
+    min_cents INTEGER NOT NULL,
+    max_cents INTEGER NOT NULL,
+    sum_cents INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (codigo, marca, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS price_gaps (
+    codigo TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    base_marca TEXT NOT NULL,
+    base_cents INTEGER NOT NULL,
+    min_marca TEXT NOT NULL,
+    min_cents INTEGER NOT NULL,
+    gap_bp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_gaps_gap ON price_gaps (gap_bp, day);
+"""
+
+
+class PriceHistoryStore:
+    """
+    Historial de precios del comparador en SQLite.
+
+    Cada exportación de ``precios`` se registra una vez (``record_comparison``).
+    Además de las observaciones crudas se mantienen dos tablas precalculadas
+    (rollup diario y última brecha por producto) para que las consultas de
+    tendencia y de alertas no recorran millones de observaciones.
+    """
+
+    def __init__(self, db_path: str = PRICE_HISTORY_DB):
+        # Cada operación abre su propia conexión: con ":memory:" cada una vería una base vacía
+        if db_path == ":memory:":
+            raise ValueError("El historial de precios requiere un archivo SQLite, no ':memory:'")
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record_comparison(self, marcas: Sequence[str], list_data: List[Dict[str, Any]], cliente: Optional[str] = None,
+                          usuario: Optional[str] = None, observed_at: Optional[datetime] = None) -> int:
+        """Registra los precios por marca de una comparación; la primera marca es la base"""
+        observed_at = observed_at or datetime.now()
+        day = observed_at.date().isoformat()
+        base_marca = marcas[0]
+
+        observations = []
+        gaps = []
+        for item in list_data:
+            codigo = str(item.get(ProductKeys.CODIGO, ""))
+            precios = item.get("precios") or {}
+            cents_by_marca = {}
+            for marca in marcas:
+                precio = precios.get(marca)
+                if isinstance(precio, (int, float)) and not isinstance(precio, bool):
+                    try:
+                        cents_by_marca[marca] = to_cents(precio)
+                    except ValueError:
+                        # Fuera de rango o no finito: no se registra
+                        continue
+            for marca, cents in cents_by_marca.items():
+                observations.append((day, codigo, marca, cents, int(marca == base_marca)))
+
+            base_cents = cents_by_marca.get(base_marca)
+            competitors = [(cents, marca) for marca, cents in cents_by_marca.items() if marca != base_marca]
+            if base_cents is not None and competitors:
+                min_cents, min_marca = min(competitors)
+                if min_cents > 0:
+                    gap_bp = (base_cents - min_cents) * 10000 // min_cents
+                    gaps.append((codigo, day, base_marca, base_cents, min_marca, min_cents, gap_bp))
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO comparisons (observed_at, cliente, usuario, base_marca) VALUES (?, ?, ?, ?)",
+                (observed_at.isoformat(timespec="seconds"), cliente, usuario, base_marca),
+            )
+            comparison_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO observations (comparison_id, day, codigo, marca, precio_cents, is_base) VALUES (?, ?, ?, ?, ?, ?)",
+                [(comparison_id, *row) for row in observations],
+            )
+            conn.executemany(
+                """
+                INSERT INTO price_daily (codigo, marca, day, min_cents, max_cents, sum_cents, n)
+                VALUES (?, ?, ?, ?, ?, ?, 1)
+                ON CONFLICT (codigo, marca, day) DO UPDATE SET
+                    min_cents = MIN(min_cents, excluded.min_cents),
+                    max_cents = MAX(max_cents, excluded.max_cents),
+                    sum_cents = sum_cents + excluded.sum_cents,
+                    n = n + 1
+                """,
+                [(codigo, marca, obs_day, cents, cents, cents) for obs_day, codigo, marca, cents, _ in observations],
+            )
+            conn.executemany(
+                """
+                INSERT INTO price_gaps (codigo, day, base_marca, base_cents, min_marca, min_cents, gap_bp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (codigo) DO UPDATE SET
+                    day = excluded.day, base_marca = excluded.base_marca, base_cents = excluded.base_cents,
+                    min_marca = excluded.min_marca, min_cents = excluded.min_cents, gap_bp = excluded.gap_bp
+                """,
+                gaps,
+            )
+        return comparison_id
+
+    def price_trend(self, codigo: str, marca: str, days: int = 90) -> List[Dict[str, Any]]:
+        """Tendencia diaria (mín, máx, promedio) de un producto para una marca"""
+        since = (datetime.now().date() - timedelta(days=days)).isoformat()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT day, min_cents, max_cents, sum_cents, n FROM price_daily
+                WHERE codigo = ? AND marca = ? AND day >= ?
+                ORDER BY day
+                """,
+                (codigo, marca, since),
+            ).fetchall()
+        return [
+            {
+                "fecha": row["day"],
+                "minimo": from_cents(row["min_cents"]),
+                "maximo": from_cents(row["max_cents"]),
+                "promedio": from_cents(round(row["sum_cents"] / row["n"])),
+                "observaciones": row["n"],
+            }
+            for row in rows
+        ]
+
+    def compare_trend(self, codigo: str, marcas: Sequence[str], days: int = 90) -> Dict[str, List[Dict[str, Any]]]:
+        """Tendencias de un producto para varias marcas (p. ej. base vs. competidor)"""
+        return {marca: self.price_trend(codigo, marca, days) for marca in marcas}
+
+    def base_above_cheapest(self, threshold_pct: float = 10.0, days: int = 90, limit: int = 500) -> List[Dict[str, Any]]:
+        """Productos cuya marca base supera en más de ``threshold_pct`` % al competidor más barato"""
+        since = (datetime.now().date() - timedelta(days=days)).isoformat()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT codigo, day, base_marca, base_cents, min_marca, min_cents, gap_bp FROM price_gaps
+                WHERE gap_bp > ? AND day >= ?
+                ORDER BY gap_bp DESC
+                LIMIT ?
+                """,
+                (int(threshold_pct * 100), since, limit),
+            ).fetchall()
+        return [
+            {
+                "codigo": row["codigo"],
+                "fecha": row["day"],
+                "marcaBase": row["base_marca"],
+                "precioBase": from_cents(row["base_cents"]),
+                "marcaMasBarata": row["min_marca"],
+                "precioMasBarato": from_cents(row["min_cents"]),
+                "diferenciaPct": row["gap_bp"] / 100,
+            }
+            for row in rows
+        ]
+
+
+_store: Optional[PriceHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_history() -> PriceHistoryStore:
+    """Instancia perezosa del historial (la base se crea una sola vez, en el primer uso)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceHistoryStore()
+    return _store
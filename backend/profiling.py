@@ -0,0 +1,168 @@
+"""
+Perfilado bajo demanda de peticiones con cProfile.
+
+Una petición se perfila si trae la cabecera ``X-Profile`` con el token de
+administración (``PROFILE_ADMIN_TOKEN``) o si cae en la tasa de muestreo
+(``PROFILE_SAMPLE_RATE``, 0 = desactivado). Por cada petición perfilada se
+guarda el ``.prof`` (abrible con ``snakeviz``) y un ``.json`` con la forma
+del payload, nunca su contenido. cProfile solo mide el hilo que lo activa: lo
+que ``run_cpu_bound`` manda al threadpool de gevent se perfila en ese hilo
+(``RequestProfile.run``) y se suma al guardar. El directorio rota y conserva los últimos
+``PROFILE_MAX_FILES`` perfiles.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "data", "profiles"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+PROFILE_HEADER = "X-Profile"
+
+# Solo se permiten nombres generados por este módulo (evita rutas arbitrarias en la descarga)
+_NAME_RE = re.compile(r"^[0-9]{8}-[0-9]{6}-[a-z_]+-[0-9a-f]{8}$")
+
+logger = logging.getLogger(__name__)
+
+# cProfile no admite dos perfiladores activos a la vez en el mismo proceso
+_active_lock = threading.Lock()
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Compara en tiempo constante; sin token configurado nadie es administrador"""
+    if not PROFILE_ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), PROFILE_ADMIN_TOKEN.encode())
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    """Cabecera de administrador o muestreo aleatorio"""
+    if is_admin(header_value):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def payload_shape(data: Any, body_bytes: int) -> Dict[str, Any]:
+    """Resumen sin datos del cliente: tipo, cantidad de filas, marcas y opciones"""
+    shape: Dict[str, Any] = {"bytes": body_bytes}
+    if not isinstance(data, dict):
+        return shape
+    form = data.get("form") if isinstance(data.get("form"), dict) else {}
+    items = data.get("list") if isinstance(data.get("list"), list) else []
+    shape["tipo"] = data.get("tipo")
+    shape["filas"] = len(items)
+    marcas = form.get("marcas")
+    if isinstance(marcas, list):
+        shape["marcas"] = len(marcas)
+    else:
+        shape["marcas"] = sum(1 for key, value in form.items() if key.startswith("marca") and value)
+    opciones = data.get("opciones")
+    if isinstance(opciones, dict):
+        shape["opciones"] = sorted(key for key, value in opciones.items() if value)
+    return shape
+
+
+class RequestProfile:
+    """Perfilador de una petición; ``start`` puede fallar si ya hay otro activo"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        # Perfiles de los hilos del threadpool que trabajaron para esta petición
+        self.thread_profilers: List[cProfile.Profile] = []
+        self.started_at = 0.0
+        self._running = False
+
+    def start(self) -> bool:
+        if not _active_lock.acquire(blocking=False):
+            return False
+        try:
+            self.profiler.enable()
+        except ValueError:
+            _active_lock.release()
+            return False
+        self.started_at = time.perf_counter()
+        self._running = True
+        return True
+
+    def stop(self) -> float:
+        if not self._running:
+            return 0.0
+        self.profiler.disable()
+        self._running = False
+        _active_lock.release()
+        return time.perf_counter() - self.started_at
+
+    def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Ejecuta ``fn`` en el hilo actual (otro que el de la petición) perfilándolo"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Otro perfilador ya activo en este hilo: se ejecuta sin medir
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self.thread_profilers.append(profiler)
+
+    def save(self, elapsed: float, metadata: Dict[str, Any], directory: str = PROFILE_DIR) -> str:
+        """Guarda ``<nombre>.prof`` y ``<nombre>.json`` y rota el directorio"""
+        os.makedirs(directory, exist_ok=True)
+        tipo = re.sub(r"[^a-z_]", "", str(metadata.get("payload", {}).get("tipo") or metadata.get("endpoint") or "").lower()) or "peticion"
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{tipo}-{uuid.uuid4().hex[:8]}"
+        stats = pstats.Stats(self.profiler)
+        for profiler in self.thread_profilers:
+            stats.add(profiler)
+        stats.dump_stats(os.path.join(directory, f"{name}.prof"))
+        with open(os.path.join(directory, f"{name}.json"), "w") as file:
+            json.dump({**metadata, "nombre": name, "duracion_s": round(elapsed, 4),
+                       "fecha": datetime.now().isoformat(timespec="seconds")}, file)
+        rotate(directory)
+        return name
+
+
+def rotate(directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_FILES):
+    """Elimina los perfiles más antiguos dejando los ``keep`` más recientes"""
+    names = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".prof"))
+    for name in names[:-keep] if keep > 0 else names:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(directory, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> List[Dict[str, Any]]:
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as file:
+                profiles.append(json.load(file))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Perfil ilegible {name}: {e}")
+    return profiles
+
+
+def profile_path(name: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """Ruta del ``.prof`` de ``name`` o None si el nombre no es válido o no existe"""
+    if not _NAME_RE.match(name):
+        return None
+    path = os.path.join(directory, f"{name}.prof")
+    return path if os.path.isfile(path) else None
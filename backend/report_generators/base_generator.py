@@ -1,7 +1,9 @@
+from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
 from typing import Any, Dict, List, Optional
 from datetime import datetime
+from ..metrics import timed
 
 STYLE_CONFIG = {
     "devoluciones": {"bg_color": "FFC7CE"},  # Rojo claro
@@ -25,13 +27,15 @@ DEFAULT_STYLES = {
 }
 
 class BaseReportGenerator:
-    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None):
+    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None):
         self.writer = writer
         self.form_data = form_data
         self.list_data = list_data
         self.data = data
         self.usuario_data = usuario_data if usuario_data else {}
-        self.workbook = writer.book
+        self.options = options if options else {}
+        # Sin writer (exportación en streaming) el generador solo aporta encabezados y columnas
+        self.workbook = writer.book if writer is not None else None
         self.report_type = "default"
         self.report_key = "default"
         self.cliente = self.form_data.get('cliente', 'N/A')
@@ -104,6 +108,16 @@ class BaseReportGenerator:
         else:
             return self._normalize_text(value)
 
+    def _write_rows(self, worksheet: Worksheet, rows: List[tuple], start_row: int) -> int:
+        """Escribe filas ya calculadas a partir de start_row y devuelve la siguiente fila libre"""
+        current_row = start_row
+        for row_data in rows:
+            for col_num, value in enumerate(row_data, 1):
+                worksheet.cell(row=current_row, column=col_num, value=value)
+            current_row += 1
+        return current_row
+
+    @timed('styling')
     def _apply_table_styles(self, worksheet: Worksheet, start_row: int, end_row: int, end_col: int):
         """Aplica estilos normalizados a toda la tabla"""
         # Estilo de encabezados
@@ -133,10 +147,21 @@ class BaseReportGenerator:
             cell.border = DEFAULT_STYLES['thin_border']
             cell.alignment = DEFAULT_STYLES['center_alignment']
 
+    def _sum_formula(self, col: int, start_row: int, end_row: int, subtotal: bool = False) -> str:
+        """Fórmula de suma de una columna; SUBTOTAL ignora los subtotales intermedios"""
+        letter = get_column_letter(col)
+        if subtotal:
+            return f"=SUBTOTAL(9,{letter}{start_row}:{letter}{end_row})"
+        return f"=SUM({letter}{start_row}:{letter}{end_row})"
+
     def _get_normalized_headers(self) -> List[str]:
         """Método para ser sobrescrito por cada generador específico"""
         return []
 
+    def _general_data(self, total_productos: int, total_lineas: int) -> Dict[str, Any]:
+        """Bloque de datos generales; los totales solo los muestran algunos reportes"""
+        return {}
+
     def validate_and_process(self, item: Dict[str, Any]) -> List[str]:
         errors = []
         if item.get('cantidad', 0) <= 0:
@@ -148,6 +173,7 @@ class BaseReportGenerator:
     def generate(self):
         raise NotImplementedError("Cada generador debe implementar su propio método 'generate'.")
 
+@timed('autosize')
 def autosize_columns(worksheet: Worksheet):
     """Ajusta el ancho de las columnas de forma mejorada, ignorando celdas fusionadas."""
     from openpyxl.cell import MergedCell
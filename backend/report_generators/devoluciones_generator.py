@@ -1,12 +1,23 @@
 from .base_generator import BaseReportGenerator, autosize_columns
+from .line_items import LineItemTable, CAJAS, PESO_TOTAL
+from ..constants import ProductKeys
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from collections import defaultdict
 import logging
 
 class DevolucionesReportGenerator(BaseReportGenerator):
-    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None):
-        super().__init__(writer, form_data, list_data, data, usuario_data)
+    SHEET_NAME = "DEVOLUCIONES"
+    DETAIL_COLUMNS = (
+        ProductKeys.CODIGO, ProductKeys.COD_EAN, ProductKeys.EAN_14, ProductKeys.NOMBRE,
+        ProductKeys.CANTIDAD, CAJAS, PESO_TOTAL, ProductKeys.LINEA,
+        ProductKeys.PRECIO_REFERENCIA, ProductKeys.OBSERVACIONES,
+    )
+    # Unidades (E), cajas (F) y peso (G)
+    TOTAL_COLUMNS = (5, 6, 7)
+
+    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None):
+        super().__init__(writer, form_data, list_data, data, usuario_data, options)
         self.report_type = "REPORTE DE DEVOLUCIONES"
         self.report_key = "devoluciones"
 
@@ -17,18 +28,13 @@ class DevolucionesReportGenerator(BaseReportGenerator):
             "Total de cajas devueltas", "Peso total de la devolución", "Línea de producto", "Precio referencial", "Observaciones"
         ]
 
-    def generate(self):
-        sheet_name = "DEVOLUCIONES"
-        worksheet = self.workbook.create_sheet(title=sheet_name, index=0)
-        if len(self.workbook.sheetnames) > 1 and "Sheet" in self.workbook.sheetnames:
-            self.workbook.remove(self.workbook["Sheet"])
-
-        # Datos Generales normalizados
+    def _general_data(self, total_productos: int, total_lineas: int) -> Dict[str, Any]:
+        """Datos Generales normalizados"""
         doc_type = self.form_data.get('documentType', '').upper()
         doc_num = self.form_data.get('documento_cliente', '')
         doc_display = f"{doc_type}: {doc_num}" if doc_type and doc_num else doc_num
 
-        general_data = {
+        return {
             "Cliente": self.cliente,
             "Documento": doc_display,
             "Código de Cliente": self.form_data.get('codigo_cliente', ''),
@@ -37,6 +43,16 @@ class DevolucionesReportGenerator(BaseReportGenerator):
             "Responsable": self.usuario,
             "Motivo": self.form_data.get('motivo', '')
         }
+
+    def generate(self):
+        worksheet = self.workbook.create_sheet(title=self.SHEET_NAME, index=0)
+        if len(self.workbook.sheetnames) > 1 and "Sheet" in self.workbook.sheetnames:
+            self.workbook.remove(self.workbook["Sheet"])
+
+        # Cálculo columnar de todas las líneas
+        table = LineItemTable(self.list_data, self._normalize_value)
+
+        general_data = self._general_data(len(table), 0)
         table_start_row = self._create_general_data_block(worksheet, general_data, start_row=1)
 
         # Encabezados de la tabla normalizados
@@ -44,47 +60,8 @@ class DevolucionesReportGenerator(BaseReportGenerator):
         for col_num, header in enumerate(headers, 1):
             worksheet.cell(row=table_start_row, column=col_num, value=header)
 
-        # Cuerpo de la tabla con datos normalizados
-        current_row = table_start_row + 1
-        
-        all_data_rows = [] # To store data rows for styling
-
-        total_unidades_devueltas_sum = 0
-        total_cajas_devueltas_sum = 0
-        peso_total_devolucion_sum = 0
-
-        for item in self.list_data: # Iterate directly over list_data, no grouping needed for subtotals
-            qty = float(item.get("cantidad", 0))
-            u_por_caja = float(item.get("cantidad_por_caja", 0))
-            peso_unidad = float(item.get("peso", 0))
-            precio_referencial = float(item.get("precio_referencial", 0))
-
-            total_cajas_devueltas_item = round(qty / u_por_caja if u_por_caja > 0 else 0, 2)
-            peso_total_devolucion_item = round(qty * peso_unidad, 2)
-
-            row_values = [
-                self._normalize_value(item.get("codigo")),
-                self._normalize_value(item.get("cod_ean")),
-                self._normalize_value(item.get("ean_14")),
-                self._normalize_value(item.get("nombre")),
-                qty,
-                total_cajas_devueltas_item,
-                peso_total_devolucion_item,
-                self._normalize_value(item.get("linea")),
-                precio_referencial,
-                self._normalize_value(item.get("observaciones"))
-            ]
-            all_data_rows.append(row_values)
-            
-            total_unidades_devueltas_sum += qty
-            total_cajas_devueltas_sum += total_cajas_devueltas_item
-            peso_total_devolucion_sum += peso_total_devolucion_item
-        
-        # Write all data rows to worksheet
-        for row_data in all_data_rows:
-            for col_num, value in enumerate(row_data, 1):
-                worksheet.cell(row=current_row, column=col_num, value=value)
-            current_row += 1
+        # Cuerpo de la tabla: filas ya calculadas, escritura directa
+        current_row = self._write_rows(worksheet, table.rows(self.DETAIL_COLUMNS), table_start_row + 1)
         
         data_rows_end = current_row - 1 # End of actual data rows
 
@@ -99,14 +76,9 @@ class DevolucionesReportGenerator(BaseReportGenerator):
         data_start_row = table_start_row + 1
         data_end_row = data_rows_end
 
-        # Total unidades devueltas (columna E)
-        worksheet.cell(row=totals_row, column=5, value=f"=SUM(E{data_start_row}:E{data_end_row})")
-
-        # Total cajas devueltas (columna F)
-        worksheet.cell(row=totals_row, column=6, value=f"=SUM(F{data_start_row}:F{data_end_row})")
-
-        # Peso total devolución (columna G)
-        worksheet.cell(row=totals_row, column=7, value=f"=SUM(G{data_start_row}:G{data_end_row})")
+        # Unidades, cajas y peso devueltos (TOTAL_COLUMNS)
+        for col in self.TOTAL_COLUMNS:
+            worksheet.cell(row=totals_row, column=col, value=self._sum_formula(col, data_start_row, data_end_row))
 
         # Aplicar estilo a la fila de totales
         self._apply_totals_style(totals_row, 1, 10, worksheet)
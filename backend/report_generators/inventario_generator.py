@@ -1,12 +1,31 @@
-from .base_generator import BaseReportGenerator, autosize_columns
+from .base_generator import BaseReportGenerator, autosize_columns, DEFAULT_STYLES, STYLE_CONFIG
+from .line_items import LineItemTable, LineGroups, CAJAS, PESO_TOTAL, VALOR_TOTAL
+from .reconciliation import StockReconciliation
+from openpyxl.styles import PatternFill
+from openpyxl.worksheet.worksheet import Worksheet
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from collections import defaultdict
 from ..constants import FormKeys, ProductKeys
 
 class InventarioReportGenerator(BaseReportGenerator):
-    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None):
-        super().__init__(writer, form_data, list_data, data, usuario_data)
+    SHEET_NAME = "INVENTARIO"
+    DETAIL_COLUMNS = (
+        ProductKeys.CODIGO, ProductKeys.COD_EAN, ProductKeys.EAN_14, ProductKeys.NOMBRE,
+        ProductKeys.CANTIDAD, CAJAS, ProductKeys.LINEA, PESO_TOTAL,
+        ProductKeys.PRECIO_REFERENCIA, VALOR_TOTAL, ProductKeys.OBSERVACIONES,
+    )
+    # Columnas totalizables del detalle: existencia (E), cajas (F), peso (H) y valor (J)
+    TOTAL_COLUMNS = (5, 6, 8, 10)
+    SUMMARY_SHEET_NAME = "RESUMEN POR LINEA"
+    SUMMARY_HEADERS = [
+        "Línea de producto", "Productos", "Existencia en almacén",
+        "Total de cajas en stock", "Peso total en stock", "Valor total del inventario",
+    ]
+    SUMMARY_COLUMNS = (ProductKeys.CANTIDAD, CAJAS, PESO_TOTAL, VALOR_TOTAL)
+
+    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None):
+        super().__init__(writer, form_data, list_data, data, usuario_data, options)
         self.report_type = "REPORTE DE INVENTARIO FÍSICO"
         self.report_key = "inventario"
 
@@ -25,27 +44,34 @@ class InventarioReportGenerator(BaseReportGenerator):
             "Precio referencial", "Valor total del inventario", "Observaciones"
         ]
 
-    def generate(self):
-        sheet_name = "INVENTARIO"
-        worksheet = self.workbook.create_sheet(title=sheet_name, index=0)
-        if len(self.workbook.sheetnames) > 1 and "Sheet" in self.workbook.sheetnames:
-            self.workbook.remove(self.workbook["Sheet"])
-
-        # Datos Generales normalizados
+    def _general_data(self, total_productos: int, total_lineas: int) -> Dict[str, Any]:
+        """Datos Generales normalizados"""
         doc_type = self.form_data.get(FormKeys.DOCUMENT_TYPE, '').upper()
         doc_num = self.form_data.get(FormKeys.DOCUMENTO_CLIENTE, '')
         doc_display = f"{doc_type}: {doc_num}" if doc_type and doc_num else doc_num
 
-        general_data = {
+        return {
             "Cliente": self.cliente,
             "Documento": doc_display,
             "Código de Cliente": self.form_data.get(FormKeys.CODIGO_CLIENTE, ''),
             "Sucursal": self.form_data.get(FormKeys.SUCURSAL) or 'principal',
             "Responsable": self.usuario,
             "Fecha": datetime.now(),
-            "Total Productos": len(self.list_data),
-            "Total Líneas Únicas": self.data.get('totalLineas', 0)
+            "Total Productos": total_productos,
+            "Total Líneas Únicas": total_lineas
         }
+
+    def generate(self):
+        worksheet = self.workbook.create_sheet(title=self.SHEET_NAME, index=0)
+        if len(self.workbook.sheetnames) > 1 and "Sheet" in self.workbook.sheetnames:
+            self.workbook.remove(self.workbook["Sheet"])
+
+        # Cálculo columnar de todos los productos y agregación por línea en una sola pasada
+        table = LineItemTable(self.list_data, self._normalize_value)
+        groups = table.group_by(ProductKeys.LINEA)
+        subtotales = bool(self.options.get('subtotalesPorLinea'))
+
+        general_data = self._general_data(len(self.list_data), len(groups))
         table_start_row = self._create_general_data_block(worksheet, general_data, start_row=1)
 
         # Encabezados de la tabla normalizados
@@ -53,81 +79,106 @@ class InventarioReportGenerator(BaseReportGenerator):
         for col_num, header in enumerate(headers, 1):
             worksheet.cell(row=table_start_row, column=col_num, value=header)
 
-        all_data_rows = []
-        
-        total_existencia_sum = 0
-        total_cajas_stock_sum = 0
-        total_peso_stock_sum = 0
-        total_valor_inventario_sum = 0
-
-        # Procesar cada producto individualmente
-        for item in self.list_data:
-            cantidad_ingresada = float(item.get(ProductKeys.CANTIDAD, 0))
-            u_por_caja = float(item.get(ProductKeys.CANTIDAD_POR_CAJA, 0))
-            peso_unidad = float(item.get(ProductKeys.PESO, 0))
-            precio_referencial = float(item.get(ProductKeys.PRECIO_REFERENCIA, 0))
-
-            total_cajas_en_stock_item = round(cantidad_ingresada / u_por_caja if u_por_caja > 0 else 0, 2)
-            peso_total_en_stock_item = round(cantidad_ingresada * peso_unidad, 2)
-            valor_total_inventario_item = round(cantidad_ingresada * precio_referencial, 2)
-
-            row_values = [
-                self._normalize_value(item.get(ProductKeys.CODIGO)),
-                self._normalize_value(item.get(ProductKeys.COD_EAN)),
-                self._normalize_value(item.get(ProductKeys.EAN_14)),
-                self._normalize_value(item.get(ProductKeys.NOMBRE)),
-                cantidad_ingresada,
-                total_cajas_en_stock_item,
-                self._normalize_value(item.get(ProductKeys.LINEA)),
-                peso_total_en_stock_item,
-                precio_referencial,
-                valor_total_inventario_item,
-                self._normalize_value(item.get(ProductKeys.OBSERVACIONES))
-            ]
-            all_data_rows.append(row_values)
-            
-            # Acumular totales directamente
-            total_existencia_sum += cantidad_ingresada
-            total_cajas_stock_sum += total_cajas_en_stock_item
-            total_peso_stock_sum += peso_total_en_stock_item
-            total_valor_inventario_sum += valor_total_inventario_item
-        
-        # Initialize current_row after headers
-        current_row = table_start_row + 1
-        
-        # Write all data rows to worksheet
-        for row_data in all_data_rows:
-            for col_num, value in enumerate(row_data, 1):
-                worksheet.cell(row=current_row, column=col_num, value=value)
-            current_row += 1
+        # Cuerpo de la tabla: filas ya calculadas, agrupadas por línea si se piden subtotales
+        data_start_row = table_start_row + 1
+        subtotal_rows = []
+        if subtotales:
+            rows = table.rows(self.DETAIL_COLUMNS, order=groups.order)
+            current_row = data_start_row
+            offset = 0
+            for label, count in zip(groups.labels, groups.counts):
+                group_start = current_row
+                current_row = self._write_rows(worksheet, rows[offset:offset + count], current_row)
+                offset += count
+                worksheet.cell(row=current_row, column=1, value=f"SUBTOTAL {label}")
+                for col in self.TOTAL_COLUMNS:
+                    worksheet.cell(row=current_row, column=col, value=self._sum_formula(col, group_start, current_row - 1, subtotal=True))
+                subtotal_rows.append(current_row)
+                current_row += 1
+        else:
+            current_row = self._write_rows(worksheet, table.rows(self.DETAIL_COLUMNS), data_start_row)
         
         data_rows_end = current_row - 1 # End of actual data rows
 
         # Aplicar estilos a las filas de datos
         self._apply_table_styles(worksheet, table_start_row, data_rows_end, len(headers))
+        for row in subtotal_rows:
+            self._apply_subtotal_style(row, 1, len(headers), worksheet)
 
         # Fila de Totales normalizada con fórmulas dinámicas
         totals_row = current_row
         worksheet.cell(row=totals_row, column=1, value="TOTALES GENERALES:")
 
-        # Usar fórmulas de Excel para totales dinámicos
-        data_start_row = table_start_row + 1
-        data_end_row = data_rows_end
-
-        # Total existencia (columna E)
-        worksheet.cell(row=totals_row, column=5, value=f"=SUM(E{data_start_row}:E{data_end_row})")
-
-        # Total cajas en stock (columna F)
-        worksheet.cell(row=totals_row, column=6, value=f"=SUM(F{data_start_row}:F{data_end_row})")
-
-        # Peso total en stock (columna H)
-        worksheet.cell(row=totals_row, column=8, value=f"=SUM(H{data_start_row}:H{data_end_row})")
-
-        # Valor total inventario (columna J)
-        worksheet.cell(row=totals_row, column=10, value=f"=SUM(J{data_start_row}:J{data_end_row})")
+        # Usar fórmulas de Excel para totales dinámicos.
+        # Con subtotales se usa SUBTOTAL(9, ...) para no sumar dos veces las filas de subtotal.
+        for col in self.TOTAL_COLUMNS:
+            worksheet.cell(row=totals_row, column=col, value=self._sum_formula(col, data_start_row, data_rows_end, subtotal=subtotales))
 
         # Aplicar estilo a la fila de totales
         self._apply_totals_style(totals_row, 1, 11, worksheet)
 
         # Ajustar columnas
-        autosize_columns(worksheet)
\ No newline at end of file
+        autosize_columns(worksheet)
+
+        self._create_line_summary_sheet(groups)
+
+        # Conciliación contra el catálogo (el índice codigo -> producto lo inyecta app.py)
+        if self.options.get('conciliarStock') and self.options.get('catalogo') is not None:
+            self._create_reconciliation_sheets(StockReconciliation(table, self.options['catalogo']))
+
+    def _apply_subtotal_style(self, row: int, start_col: int, end_col: int, worksheet: Worksheet):
+        """Resalta una fila de subtotal con el color del módulo"""
+        style_info = STYLE_CONFIG.get(self.report_key, STYLE_CONFIG["default"])
+        fill = PatternFill(start_color=style_info["bg_color"], end_color=style_info["bg_color"], fill_type="solid")
+        for col in range(start_col, end_col + 1):
+            cell = worksheet.cell(row=row, column=col)
+            cell.font = DEFAULT_STYLES['header_font']
+            cell.fill = fill
+
+    def _create_line_summary_sheet(self, groups: LineGroups):
+        """Hoja resumen por línea de producto (tabla dinámica precalculada)"""
+        self._write_table_sheet(
+            self.SUMMARY_SHEET_NAME, self.SUMMARY_HEADERS,
+            groups.rows(self.SUMMARY_COLUMNS), totals_cols=(2, 3, 4, 5, 6),
+        )
+
+    def _write_table_sheet(self, title: str, headers: List[str], rows: List[tuple], percent_cols=(), totals_cols=()) -> Worksheet:
+        """Crea una hoja con encabezado, filas, formato de porcentaje y fila de totales opcional"""
+        worksheet = self.workbook.create_sheet(title=title)
+        for col_num, header in enumerate(headers, 1):
+            worksheet.cell(row=1, column=col_num, value=header)
+
+        current_row = self._write_rows(worksheet, rows, 2)
+        self._apply_table_styles(worksheet, 1, current_row - 1, len(headers))
+        for col in percent_cols:
+            for (cell,) in worksheet.iter_rows(min_row=2, max_row=current_row - 1, min_col=col, max_col=col):
+                cell.number_format = '0.00%'
+
+        if totals_cols:
+            worksheet.cell(row=current_row, column=1, value="TOTALES GENERALES:")
+            for col in totals_cols:
+                worksheet.cell(row=current_row, column=col, value=self._sum_formula(col, 2, current_row - 1))
+            self._apply_totals_style(current_row, 1, len(headers), worksheet)
+
+        autosize_columns(worksheet)
+        return worksheet
+
+    def _create_reconciliation_sheets(self, reconciliation: StockReconciliation):
+        """Hojas de conciliación: por producto, por línea y productos del catálogo no contados"""
+        self._write_table_sheet(
+            "CONCILIACION",
+            ["Código", "Nombre", "Línea de producto", "Stock referencial", "Contado", "Diferencia",
+             "Precio referencial", "Valor de la diferencia", "% Merma", "Estado"],
+            reconciliation.product_rows(), percent_cols=(9,), totals_cols=(4, 5, 6, 8),
+        )
+        self._write_table_sheet(
+            "CONCILIACION POR LINEA",
+            ["Línea de producto", "Productos", "Stock referencial", "Contado", "Diferencia",
+             "Valor de la diferencia", "% Merma"],
+            reconciliation.line_rows(), percent_cols=(7,), totals_cols=(2, 3, 4, 5, 6),
+        )
+        self._write_table_sheet(
+            "NO CONTADOS",
+            ["Código", "Nombre", "Línea de producto", "Stock referencial", "Precio referencial"],
+            reconciliation.uncounted_rows(), totals_cols=(4,),
+        )
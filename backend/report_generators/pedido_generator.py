@@ -1,12 +1,23 @@
 from .base_generator import BaseReportGenerator, autosize_columns
+from .line_items import LineItemTable, CAJAS, PESO_TOTAL, VALOR_TOTAL
+from ..constants import ProductKeys
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from collections import defaultdict
 import logging
 
 class PedidoReportGenerator(BaseReportGenerator):
-    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None):
-        super().__init__(writer, form_data, list_data, data, usuario_data)
+    SHEET_NAME = "PEDIDO"
+    DETAIL_COLUMNS = (
+        ProductKeys.CODIGO, ProductKeys.COD_EAN, ProductKeys.EAN_14, ProductKeys.NOMBRE,
+        ProductKeys.CANTIDAD, CAJAS, ProductKeys.PRECIO_REFERENCIA, VALOR_TOTAL,
+        ProductKeys.LINEA, PESO_TOTAL, ProductKeys.OBSERVACIONES,
+    )
+    # Unidades (E), cajas (F), valor (H) y peso (J)
+    TOTAL_COLUMNS = (5, 6, 8, 10)
+
+    def __init__(self, writer: Any, form_data: Dict[str, Any], list_data: List[Dict[str, Any]], data: Optional[Dict[str, Any]] = None, usuario_data: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None):
+        super().__init__(writer, form_data, list_data, data, usuario_data, options)
         self.report_type = "HOJA DE PEDIDO"
         self.report_key = "pedido"
 
@@ -18,18 +29,13 @@ class PedidoReportGenerator(BaseReportGenerator):
             "Línea de producto", "Peso total del pedido", "Observaciones"
         ]
 
-    def generate(self):
-        sheet_name = "PEDIDO"
-        worksheet = self.workbook.create_sheet(title=sheet_name, index=0)
-        if len(self.workbook.sheetnames) > 1 and "Sheet" in self.workbook.sheetnames:
-            self.workbook.remove(self.workbook["Sheet"])
-
-        # Datos Generales normalizados
+    def _general_data(self, total_productos: int, total_lineas: int) -> Dict[str, Any]:
+        """Datos Generales normalizados"""
         doc_type = self.form_data.get('documentType', '').upper()
         doc_num = self.form_data.get('documento_cliente', '')
         doc_display = f"{doc_type}: {doc_num}" if doc_type and doc_num else doc_num
 
-        general_data = {
+        return {
             "Cliente": self.cliente,
             "Documento": doc_display,
             "Código de Cliente": self.form_data.get('codigo_cliente', ''),
@@ -37,6 +43,16 @@ class PedidoReportGenerator(BaseReportGenerator):
             "Fecha": datetime.now(),
             "Responsable": self.usuario,
         }
+
+    def generate(self):
+        worksheet = self.workbook.create_sheet(title=self.SHEET_NAME, index=0)
+        if len(self.workbook.sheetnames) > 1 and "Sheet" in self.workbook.sheetnames:
+            self.workbook.remove(self.workbook["Sheet"])
+
+        # Cálculo columnar de todas las líneas
+        table = LineItemTable(self.list_data, self._normalize_value)
+
+        general_data = self._general_data(len(table), 0)
         table_start_row = self._create_general_data_block(worksheet, general_data, start_row=1)
 
         # Encabezados de la tabla normalizados
@@ -44,51 +60,8 @@ class PedidoReportGenerator(BaseReportGenerator):
         for col_num, header in enumerate(headers, 1):
             worksheet.cell(row=table_start_row, column=col_num, value=header)
 
-        # Cuerpo de la tabla con datos normalizados
-        current_row = table_start_row + 1
-        
-        all_data_rows = [] # To store data rows for styling
-
-        total_unidades_a_pedir_sum = 0
-        total_cajas_a_pedir_sum = 0
-        valor_total_pedido_sum = 0
-        peso_total_pedido_sum = 0
-
-        for item in self.list_data:
-            cantidad = float(item.get("cantidad", 0))
-            u_por_caja = float(item.get("cantidad_por_caja", 0))
-            precio = float(item.get("precio_referencial", 0))
-            peso_unidad = float(item.get("peso", 0))
-
-            total_cajas_a_pedir_item = round(cantidad / u_por_caja if u_por_caja != 0 else 0, 2)
-            valor_total_pedido_item = round(cantidad * precio, 2)
-            peso_total_pedido_item = round(cantidad * peso_unidad, 2)
-
-            row_values = [
-                self._normalize_value(item.get("codigo")),
-                self._normalize_value(item.get("cod_ean")),
-                self._normalize_value(item.get("ean_14")),
-                self._normalize_value(item.get("nombre")),
-                cantidad,
-                total_cajas_a_pedir_item,
-                precio,
-                valor_total_pedido_item,
-                self._normalize_value(item.get("linea")),
-                peso_total_pedido_item,
-                self._normalize_value(item.get("observaciones"))
-            ]
-            all_data_rows.append(row_values)
-            
-            total_unidades_a_pedir_sum += cantidad
-            total_cajas_a_pedir_sum += total_cajas_a_pedir_item
-            valor_total_pedido_sum += valor_total_pedido_item
-            peso_total_pedido_sum += peso_total_pedido_item
-        
-        # Write all data rows to worksheet
-        for row_data in all_data_rows:
-            for col_num, value in enumerate(row_data, 1):
-                worksheet.cell(row=current_row, column=col_num, value=value)
-            current_row += 1
+        # Cuerpo de la tabla: filas ya calculadas, escritura directa
+        current_row = self._write_rows(worksheet, table.rows(self.DETAIL_COLUMNS), table_start_row + 1)
         
         data_rows_end = current_row - 1 # End of actual data rows
 
@@ -103,17 +76,9 @@ class PedidoReportGenerator(BaseReportGenerator):
         data_start_row = table_start_row + 1
         data_end_row = data_rows_end
 
-        # Total unidades (columna E)
-        worksheet.cell(row=totals_row, column=5, value=f"=SUM(E{data_start_row}:E{data_end_row})")
-
-        # Total cajas (columna F)
-        worksheet.cell(row=totals_row, column=6, value=f"=SUM(F{data_start_row}:F{data_end_row})")
-
-        # Valor total pedido (columna H)
-        worksheet.cell(row=totals_row, column=8, value=f"=SUM(H{data_start_row}:H{data_end_row})")
-
-        # Peso total pedido (columna J)
-        worksheet.cell(row=totals_row, column=10, value=f"=SUM(J{data_start_row}:J{data_end_row})")
+        # Unidades, cajas, valor y peso (TOTAL_COLUMNS)
+        for col in self.TOTAL_COLUMNS:
+            worksheet.cell(row=totals_row, column=col, value=self._sum_formula(col, data_start_row, data_end_row))
 
         # Aplicar estilo a la fila de totales
         self._apply_totals_style(totals_row, 1, 11, worksheet)
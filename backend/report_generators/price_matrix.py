@@ -0,0 +1,117 @@
+from typing import Any, List, Optional, Sequence
+import numpy as np
+from ..metrics import timed
+from ..models import MAX_MARCAS
+
+# Coeficiente de variación a partir del cual la dispersión es ALTA / MEDIA
+DISPERSION_ALTA = 0.3
+DISPERSION_MEDIA = 0.15
+
+
+def brand_names(form_data: Any) -> List[str]:
+    """
+    Marcas de la comparación; la primera es la base. ``form.marcas`` (lista)
+    admite cualquier cantidad; sin ella se usan ``marca1``..``marca5``.
+    """
+    marcas = form_data.get('marcas')
+    if isinstance(marcas, list) and marcas:
+        return [str(marca).strip() or f'Marca {i}' for i, marca in enumerate(marcas[:MAX_MARCAS], 1)]
+    return [form_data.get(f'marca{i}', f'Marca {i}') for i in range(1, 6)]
+
+
+def _number_or_nan(value: Any) -> float:
+    return float(value) if type(value) in (int, float) else np.nan
+
+
+def _relative(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerador / denominador - 1; 0 si el denominador es 0 y NaN si falta algún dato"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator - 1
+    return np.where(denominator == 0, 0.0, result)
+
+
+def to_cells(values: np.ndarray) -> List[Optional[float]]:
+    """Valores listos para escribir en celdas: NaN -> None (celda vacía)"""
+    return [None if v != v else v for v in values.tolist()]
+
+
+def to_count_cells(values: np.ndarray) -> List[Optional[int]]:
+    """Conteos (guardados como float por el NaN) como enteros; NaN -> None"""
+    return [None if v != v else int(v) for v in values.tolist()]
+
+
+class PriceMatrix:
+    """
+    Matriz productos × marcas de precios (NaN = sin precio) y KPIs del
+    comparativo calculados en bloque con NumPy.
+
+    La columna 0 es la marca base. Cada KPI es una operación sobre la matriz
+    completa, así que el costo crece con productos × marcas y no con la
+    cantidad de KPIs. Un KPI que depende de un dato ausente queda en NaN
+    (celda vacía); una división por cero da 0, como en las fórmulas previas.
+    """
+
+    @timed('row_computation')
+    def __init__(self, list_data: Sequence[Any], marcas: Sequence[str]):
+        n, k = len(list_data), len(marcas)
+        prices = np.full((n, k), np.nan)
+        suggested = np.full(n, np.nan)
+        for i, item in enumerate(list_data):
+            precios = item.get('precios') or {}
+            if precios:
+                prices[i] = [_number_or_nan(precios.get(marca)) for marca in marcas]
+            suggested[i] = _number_or_nan(item.get('precio_sugerido'))
+        self.prices = prices
+        self.size = n
+
+        base = prices[:, 0]
+        present = ~np.isnan(prices)
+        count = present.sum(axis=1)
+        self.count = count
+        self.base = base
+
+        # fmin/fmax ignoran NaN sin advertencias; NaN solo si la fila no tiene precios
+        self.minimum = np.fmin.reduce(prices, axis=1)
+        self.maximum = np.fmax.reduce(prices, axis=1)
+        total = np.where(present, prices, 0.0).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean = np.where(count > 0, total / count, np.nan)
+            squares = np.where(present, (prices - self.mean[:, None]) ** 2, 0.0).sum(axis=1)
+            # Desviación estándar muestral (STDEV de Excel): requiere al menos dos precios
+            self.stdev = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+            cv = np.where(self.mean != 0, self.stdev / self.mean, 0.0)
+        self.cv = np.where(np.isnan(self.stdev), np.nan, cv)
+
+        # Diferencia y % de la base frente a cada competidor (columnas 1..k-1)
+        competitors = prices[:, 1:]
+        self.differences = competitors - base[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.percentages = np.where(competitors == 0, 0.0, (base[:, None] - competitors) / competitors)
+
+        self.suggested = np.where(np.isnan(suggested), self.mean, suggested)
+        has_base = ~np.isnan(base)
+        # Las comparaciones con NaN son falsas: los precios ausentes no cuentan
+        self.cheaper = np.where(has_base, (prices < base[:, None]).sum(axis=1), np.nan)
+        self.more_expensive = np.where(has_base, (prices > base[:, None]).sum(axis=1), np.nan)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def relative_to_base(self, values: np.ndarray) -> np.ndarray:
+        """valores / base - 1 (p. ej. % MIN, % AJUSTE SUG.)"""
+        return _relative(values, self.base)
+
+    def base_relative_to(self, values: np.ndarray) -> np.ndarray:
+        """base / valores - 1 (p. ej. % VS PROM, % VS MÍN)"""
+        return _relative(self.base, values)
+
+    def dispersion(self) -> List[Optional[str]]:
+        """Texto de dispersión por fila: ALTA/MEDIA/BAJA con el coeficiente de variación"""
+        cv = self.cv
+        levels = np.select([cv >= DISPERSION_ALTA, cv >= DISPERSION_MEDIA], ['ALTA', 'MEDIA'], 'BAJA')
+        return [None if value != value else f"{level} ({value:.1%})" for level, value in zip(levels.tolist(), cv.tolist())]
+
+    def ranking(self) -> List[Optional[str]]:
+        """Posición de la base entre los precios de la fila (1 = más barata), como "posición/total" """
+        return [None if cheaper != cheaper else f"{int(cheaper) + 1}/{total}"
+                for cheaper, total in zip(self.cheaper.tolist(), self.count.tolist())]
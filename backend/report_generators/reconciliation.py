@@ -0,0 +1,145 @@
+from typing import Any, Dict, List
+import numpy as np
+from .line_items import LineItemTable
+from ..catalog_ingest import to_number
+from ..constants import CatalogKeys, ProductKeys
+from ..metrics import timed
+from ..money import to_cents_array, from_cents_array, round_half_up
+
+ESTADO_SIN_CATALOGO = "SIN CATÁLOGO"
+ESTADO_FALTANTE = "FALTANTE"
+ESTADO_SOBRANTE = "SOBRANTE"
+ESTADO_OK = "OK"
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Cociente elemento a elemento; 0 donde el denominador no es positivo"""
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator > 0)
+
+
+class StockReconciliation:
+    """
+    Conciliación del conteo físico contra ``stock_referencial`` del catálogo.
+
+    Hash join por ``codigo``: los conteos repetidos de un mismo código se suman
+    primero (diccionario + ``np.bincount``) y cada código se busca una vez en el
+    índice del catálogo, así que el costo es O(ítems + catálogo). Diferencias,
+    valor de la diferencia (céntimos exactos) y % de merma se calculan en bloque.
+    Los productos del catálogo que no se contaron entran en los agregados por
+    línea con contado 0 (merma total). Los valores numéricos del catálogo se
+    convierten con ``to_number``: uno inválido cuenta como 0.
+    """
+
+    @timed('reconciliation')
+    def __init__(self, table: LineItemTable, catalog_index: Dict[str, Dict[str, Any]]):
+        # 1. Agregar el conteo por código (primera aparición = fila representativa)
+        code_of: Dict[str, int] = {}
+        rep: List[int] = []
+        codes_list: List[int] = []
+        for i, codigo in enumerate(table.columns[ProductKeys.CODIGO]):
+            code = code_of.get(codigo)
+            if code is None:
+                code = code_of[codigo] = len(rep)
+                rep.append(i)
+            codes_list.append(code)
+        codes = np.asarray(codes_list, dtype=np.int64)
+        rep_rows = np.asarray(rep, dtype=np.int64)
+
+        self.codigos: List[str] = list(code_of)
+        contado = np.bincount(codes, weights=table.amounts[ProductKeys.CANTIDAD], minlength=len(rep))
+
+        # 2. Join con el catálogo (una búsqueda por código)
+        matches = [catalog_index.get(c) for c in self.codigos]
+        en_catalogo = np.fromiter((m is not None for m in matches), dtype=bool, count=len(matches))
+        stock = np.fromiter(
+            (to_number((m or {}).get(CatalogKeys.STOCK_REFERENCIAL), 0) for m in matches),
+            dtype=np.float64, count=len(matches),
+        )
+        precio_item = table.prices_cents[rep_rows]
+        precio_catalogo = to_cents_array([to_number((m or {}).get(CatalogKeys.PRECIO), 0.0) for m in matches])
+        precio_cents = np.where(precio_item > 0, precio_item, precio_catalogo)
+
+        nombres = table.columns[ProductKeys.NOMBRE]
+        lineas = table.columns[ProductKeys.LINEA]
+        self.nombres = [nombres[i] for i in rep]
+        self.lineas = [lineas[i] for i in rep]
+
+        # 3. Métricas por producto
+        diferencia = contado - stock
+        valor_diferencia = round_half_up(diferencia * precio_cents)
+        merma = np.maximum(stock - contado, 0)
+
+        self.stock = stock
+        self.contado = contado
+        self.diferencia = diferencia
+        self.precio_cents = precio_cents
+        self.valor_diferencia_cents = valor_diferencia
+        self.merma = merma
+        self.merma_pct = _ratio(merma, stock)
+        self.estado = np.where(
+            ~en_catalogo, ESTADO_SIN_CATALOGO,
+            np.where(diferencia < 0, ESTADO_FALTANTE, np.where(diferencia > 0, ESTADO_SOBRANTE, ESTADO_OK)),
+        ).tolist()
+
+        # 4. Productos del catálogo que no se contaron
+        contados = set(self.codigos)
+        self.no_contados = [p for codigo, p in catalog_index.items() if codigo not in contados]
+        self.no_contados_stock = np.fromiter(
+            (to_number(p.get(CatalogKeys.STOCK_REFERENCIAL), 0) for p in self.no_contados),
+            dtype=np.float64, count=len(self.no_contados),
+        )
+        self.no_contados_precio_cents = to_cents_array(
+            [to_number(p.get(CatalogKeys.PRECIO), 0.0) for p in self.no_contados]
+        )
+        self.no_contados_lineas = [str(p.get(CatalogKeys.LINEA) or "").strip() for p in self.no_contados]
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    def product_rows(self) -> List[tuple]:
+        """Código, nombre, línea, stock, contado, diferencia, precio, valor diferencia, % merma, estado"""
+        return list(zip(
+            self.codigos, self.nombres, self.lineas,
+            self.stock.tolist(), self.contado.tolist(), self.diferencia.tolist(),
+            from_cents_array(self.precio_cents).tolist(),
+            from_cents_array(self.valor_diferencia_cents).tolist(),
+            self.merma_pct.tolist(), self.estado,
+        ))
+
+    def line_rows(self) -> List[tuple]:
+        """
+        Línea, productos, stock, contado, diferencia, valor diferencia, % merma
+        (agregados por línea, incluidos los productos no contados)
+        """
+        lineas = self.lineas + self.no_contados_lineas
+        first_seen: Dict[Any, int] = {}
+        codes = np.fromiter((first_seen.setdefault(l, len(first_seen)) for l in lineas), dtype=np.int64, count=len(lineas))
+        size = len(first_seen)
+        # Un no contado: contado 0, diferencia -stock, merma = stock
+        no_contado_valor = round_half_up(-self.no_contados_stock * self.no_contados_precio_cents)
+        productos = np.bincount(codes, minlength=size)
+        stock = np.bincount(codes, weights=np.concatenate([self.stock, self.no_contados_stock]), minlength=size)
+        contado = np.bincount(codes, weights=np.concatenate([self.contado, np.zeros(len(self.no_contados))]), minlength=size)
+        valor = np.rint(np.bincount(
+            codes, weights=np.concatenate([self.valor_diferencia_cents, no_contado_valor]), minlength=size,
+        )).astype(np.int64)
+        merma = np.bincount(codes, weights=np.concatenate([self.merma, np.maximum(self.no_contados_stock, 0)]), minlength=size)
+
+        rows = list(zip(
+            first_seen, productos.tolist(), stock.tolist(), contado.tolist(),
+            (contado - stock).tolist(), from_cents_array(valor).tolist(), _ratio(merma, stock).tolist(),
+        ))
+        return sorted(rows, key=lambda row: str(row[0]))
+
+    def uncounted_rows(self) -> List[tuple]:
+        """Código, nombre, línea, stock referencial y precio de los productos no contados"""
+        return [
+            (
+                str(p.get(CatalogKeys.CODIGO, "")), str(p.get(CatalogKeys.NOMBRE) or "").strip(),
+                linea, stock, precio,
+            )
+            for p, linea, stock, precio in zip(
+                self.no_contados, self.no_contados_lineas, self.no_contados_stock.tolist(),
+                from_cents_array(self.no_contados_precio_cents).tolist(),
+            )
+        ]
@@ -0,0 +1,357 @@
+"""
+Exportación XLSX en streaming para cuerpos NDJSON.
+
+La primera línea del cuerpo es el encabezado (``tipo``, ``form``, ``usuario``,
+``totales``, ``opciones``) y cada línea siguiente es un producto. Se hacen dos
+pasadas con memoria acotada:
+
+1. ``ingest``: valida cada fila al leerla, la copia a un archivo temporal y,
+   por bloques de ``CHUNK_ROWS`` filas, acumula lo que el libro necesita antes
+   de escribir la primera celda (conteo, totales por línea, anchos de columna).
+2. ``write``: relee el archivo temporal por bloques y agrega las filas a un
+   libro ``write_only`` de openpyxl, que las serializa sin retenerlas.
+
+Solo se admiten los reportes de líneas de producto (inventario, pedido y
+devoluciones) sin subtotales ni conciliación, que requieren todo el detalle.
+Con ``XLSX_WRITER=direct`` (por defecto) el libro se escribe con el escritor
+SpreadsheetML de ``xlsx_writer``; ``XLSX_WRITER=openpyxl`` usa openpyxl
+``write_only``. Las exportaciones JSON de estos reportes usan el mismo camino
+(``ingest_rows``) cuando sus opciones lo permiten.
+"""
+import io
+import os
+import tempfile
+from copy import copy
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from ..constants import ProductKeys
+from ..serialization import dumps_bytes
+from .base_generator import BaseReportGenerator, DEFAULT_STYLES, STYLE_CONFIG
+from .line_items import LineItemTable
+from .xlsx_writer import Formula, XlsxWorkbookWriter
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depende del entorno
+    import json
+    _loads = json.loads
+
+CHUNK_ROWS = 2000
+MAX_LINE_BYTES = 1024 * 1024
+READ_BUFFER_BYTES = 64 * 1024
+# El archivo temporal pasa de memoria a disco a partir de este tamaño
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+STREAMING_OPTIONS_UNSUPPORTED = ('subtotalesPorLinea', 'conciliarStock')
+XLSX_WRITER = os.environ.get("XLSX_WRITER", "direct")
+
+# Mismos límites que autosize_columns
+MIN_WIDTH = 12
+MAX_WIDTH = 30
+
+
+class StreamingExportError(ValueError):
+    """Cuerpo NDJSON inválido; ``line`` es el número de línea (1 = encabezado)"""
+
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+
+def iter_lines(stream: BinaryIO, max_line_bytes: int = MAX_LINE_BYTES) -> Iterator[bytes]:
+    """Líneas no vacías del cuerpo; una línea más larga que el límite es un error"""
+    if isinstance(stream, io.RawIOBase):
+        # readline sobre un stream sin buffer (p. ej. el de werkzeug) lee byte a byte
+        stream = io.BufferedReader(stream, buffer_size=READ_BUFFER_BYTES)
+    number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            raise StreamingExportError(f"La línea supera {max_line_bytes} bytes.", number)
+        line = line.strip()
+        if line:
+            yield line
+
+
+def parse_line(line: bytes, number: int) -> Any:
+    try:
+        return _loads(line)
+    except ValueError as e:
+        raise StreamingExportError(f"JSON inválido: {e}", number)
+
+
+def _text_width(value: Any, bold: bool, numeric: bool) -> float:
+    """Ancho estimado de una celda con el mismo criterio que autosize_columns"""
+    if not value:
+        return 0
+    multiplier = 1.3 if bold else 1.1 if numeric else 1.0
+    return len(str(value)) * multiplier
+
+
+class StreamingLineItemExport:
+    """Exporta un reporte de líneas de producto desde filas NDJSON con memoria acotada"""
+
+    def __init__(self, generator: BaseReportGenerator, chunk_rows: int = CHUNK_ROWS):
+        self.generator = generator
+        self.chunk_rows = chunk_rows
+        self.headers = generator._get_normalized_headers()
+        self.columns: Sequence[str] = generator.DETAIL_COLUMNS
+        self.size = 0
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        # Sumas por línea de producto: [productos, *SUMMARY_COLUMNS]
+        self.line_sums: Dict[Any, List[float]] = {}
+        self.widths = [_text_width(header, True, False) for header in self.headers]
+        self._rows: Optional[List[Dict[str, Any]]] = None
+
+    def close(self):
+        """Libera el archivo temporal de la primera pasada (se puede llamar más de una vez)"""
+        self.spool.close()
+
+    def __enter__(self) -> "StreamingLineItemExport":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def ingest(self, lines: Iterable[bytes], row_validator: Any, first_line: int = 2):
+        """Primera pasada: valida, guarda en el archivo temporal y acumula totales y anchos"""
+        chunk: List[Dict[str, Any]] = []
+        for number, line in enumerate(lines, first_line):
+            row = parse_line(line, number)
+            error = next(row_validator.iter_errors(row), None)
+            if error is not None:
+                raise StreamingExportError(error.message, number)
+            # Se guarda la fila re-serializada en una sola línea (sin espacios)
+            self.spool.write(dumps_bytes(row) + b"\n")
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                self._accumulate(chunk)
+                chunk = []
+        if chunk:
+            self._accumulate(chunk)
+
+    def ingest_rows(self, rows: List[Dict[str, Any]]):
+        """Primera pasada para filas ya validadas y en memoria (cuerpo JSON): sin archivo temporal"""
+        self._rows = rows
+        for start in range(0, len(rows), self.chunk_rows):
+            self._accumulate(rows[start:start + self.chunk_rows])
+
+    def _accumulate(self, chunk: List[Dict[str, Any]]):
+        table = LineItemTable(chunk, self.generator._normalize_value)
+        self.size += len(table)
+        for index, key in enumerate(self.columns):
+            values = table.columns[key]
+            numeric = key in table.amounts or key == ProductKeys.PRECIO_REFERENCIA
+            widest = max((_text_width(v, False, numeric) for v in values), default=0)
+            self.widths[index] = max(self.widths[index], widest)
+
+        summary_columns = getattr(self.generator, 'SUMMARY_COLUMNS', ())
+        groups = table.group_by(ProductKeys.LINEA)
+        sums = [groups.counts] + [groups.sums[key] for key in summary_columns]
+        for position, label in enumerate(groups.labels):
+            acc = self.line_sums.setdefault(label, [0] * len(sums))
+            for i, values in enumerate(sums):
+                acc[i] += values[position]
+
+    def _chunks(self) -> Iterator[List[Dict[str, Any]]]:
+        if self._rows is not None:
+            for start in range(0, len(self._rows), self.chunk_rows):
+                yield self._rows[start:start + self.chunk_rows]
+            return
+        self.spool.seek(0)
+        chunk = []
+        for line in self.spool:
+            chunk.append(_loads(line))
+            if len(chunk) >= self.chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def write(self, output: BinaryIO, writer: Optional[str] = None, compresslevel: Optional[int] = None):
+        """Segunda pasada: escribe el libro en ``output`` (``writer``: direct u openpyxl; ``compresslevel`` del ZIP directo)"""
+        try:
+            self._write_book(output, writer, compresslevel)
+        finally:
+            # El archivo temporal se libera también si la escritura falla
+            self.close()
+
+    def _write_book(self, output: BinaryIO, writer: Optional[str], compresslevel: Optional[int]):
+        generator = self.generator
+        book = _new_book(output, generator.report_key, writer or XLSX_WRITER, compresslevel)
+
+        general_data = generator._general_data(self.size, len(self.line_sums))
+        data_start_row = len(general_data) + 4
+        data_end_row = data_start_row + self.size - 1
+        total_formulas = {
+            col: Formula(f"=SUM({get_column_letter(col)}{data_start_row}:{get_column_letter(col)}{data_end_row})")
+            for col in generator.TOTAL_COLUMNS
+        }
+
+        widths = list(self.widths)
+        for key, value in general_data.items():
+            widths[0] = max(widths[0], _text_width(key, True, False))
+            widths[1] = max(widths[1], _text_width(generator._normalize_value(value), False, False))
+        widths[0] = max(widths[0], _text_width("TOTALES GENERALES:", True, False))
+        for col, formula in total_formulas.items():
+            widths[col - 1] = max(widths[col - 1], _text_width(formula, True, False))
+        # Los anchos se fijan antes de escribir la primera fila
+        sheet = book.add_sheet(generator.SHEET_NAME, _column_widths(widths), merged=("A1:B1",))
+
+        # Bloque de datos generales (mismo formato que _create_general_data_block)
+        sheet.append([("DATOS GENERALES", "title"), (None, "title_right")])
+        for key, value in general_data.items():
+            sheet.append([
+                (generator._normalize_text(key), "general_key"),
+                (generator._normalize_value(value), "general_value"),
+            ])
+        sheet.append([])
+
+        sheet.append([(header, "header") for header in self.headers])
+        for chunk in self._chunks():
+            table = LineItemTable(chunk, generator._normalize_value)
+            for row in table.rows(self.columns):
+                sheet.append([(value, "body_number" if isinstance(value, (int, float)) else "body_text") for value in row])
+
+        totals: List[tuple] = [(None, "totals") for _ in self.headers]
+        totals[0] = ("TOTALES GENERALES:", "totals")
+        for col, formula in total_formulas.items():
+            totals[col - 1] = (formula, "totals")
+        sheet.append(totals)
+
+        if hasattr(generator, 'SUMMARY_SHEET_NAME'):
+            self._write_summary_sheet(book)
+
+        book.close()
+
+    def _write_summary_sheet(self, book: Any):
+        """Hoja resumen por línea a partir de las sumas acumuladas en la primera pasada"""
+        generator = self.generator
+        headers = generator.SUMMARY_HEADERS
+        rows = [
+            (generator._normalize_value(label), *[round(v, 2) for v in sums])
+            for label, sums in sorted(self.line_sums.items(), key=lambda item: str(item[0]))
+        ]
+        total_formulas = {
+            col: Formula(f"=SUM({get_column_letter(col)}2:{get_column_letter(col)}{len(rows) + 1})")
+            for col in range(2, len(headers) + 1)
+        }
+        widths = [_text_width(header, True, False) for header in headers]
+        for row in rows:
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], _text_width(value, False, i > 0))
+        widths[0] = max(widths[0], _text_width("TOTALES GENERALES:", True, False))
+        for col, formula in total_formulas.items():
+            widths[col - 1] = max(widths[col - 1], _text_width(formula, True, False))
+        sheet = book.add_sheet(generator.SUMMARY_SHEET_NAME, _column_widths(widths))
+
+        sheet.append([(header, "header") for header in headers])
+        for row in rows:
+            sheet.append([(value, "body_number" if isinstance(value, (int, float)) else "body_text") for value in row])
+        totals: List[tuple] = [(None, "totals") for _ in headers]
+        totals[0] = ("TOTALES GENERALES:", "totals")
+        for col, formula in total_formulas.items():
+            totals[col - 1] = (formula, "totals")
+        sheet.append(totals)
+
+
+def _column_widths(widths: Sequence[float]) -> List[float]:
+    """Anchos estimados acotados igual que autosize_columns"""
+    return [min(max(MIN_WIDTH, width + 2), MAX_WIDTH) for width in widths]
+
+
+def _new_book(output: BinaryIO, report_key: str, writer: str, compresslevel: Optional[int] = None) -> Any:
+    if writer == "openpyxl":
+        return _OpenpyxlBook(output, report_key)
+    return XlsxWorkbookWriter(output, report_key, compresslevel)
+
+
+class _OpenpyxlBook:
+    """Misma interfaz que XlsxWorkbookWriter sobre un libro ``write_only`` de openpyxl"""
+
+    def __init__(self, output: BinaryIO, report_key: str):
+        self.output = output
+        self.report_key = report_key
+        self.workbook = Workbook(write_only=True)
+        self.styles: Optional[_CellStyles] = None
+
+    def add_sheet(self, name: str, widths: Sequence[float], merged: Sequence[str] = ()) -> "_OpenpyxlSheet":
+        worksheet = self.workbook.create_sheet(name)
+        if self.styles is None:
+            self.styles = _CellStyles(worksheet, self.report_key)
+        for index, width in enumerate(widths, 1):
+            worksheet.column_dimensions[get_column_letter(index)].width = width
+        for ref in merged:
+            worksheet.merged_cells.add(ref)
+        return _OpenpyxlSheet(worksheet, self.styles)
+
+    def close(self):
+        self.workbook.save(self.output)
+
+
+class _OpenpyxlSheet:
+    def __init__(self, worksheet: Any, styles: "_CellStyles"):
+        self.worksheet = worksheet
+        self.styles = styles
+
+    def append(self, cells: Sequence[tuple]):
+        worksheet, styles = self.worksheet, self.styles
+        worksheet.append([styles.cell(worksheet, value, getattr(styles, style)) for value, style in cells])
+
+
+class _CellStyles:
+    """
+    Combinaciones de estilo de DEFAULT_STYLES usadas por las celdas write_only.
+
+    Cada combinación se registra una sola vez en el libro; las celdas copian el
+    arreglo de índices de estilo ya resuelto en lugar de volver a asignar (y
+    buscar por hash) fuente, relleno, borde y alineación en cada celda.
+    """
+
+    def __init__(self, worksheet: Any, report_key: str):
+        style_info = STYLE_CONFIG.get(report_key, STYLE_CONFIG["default"])
+        module_fill = PatternFill(start_color=style_info["bg_color"], end_color=style_info["bg_color"], fill_type="solid")
+        border = DEFAULT_STYLES['thin_border']
+        self.title = (Font(name='Arial', size=12, bold=True), DEFAULT_STYLES['header_fill'],
+                      Border(top=Side(style='thin'), left=Side(style='thin'), bottom=Side(style='thin')),
+                      Alignment(horizontal="center", vertical="center"))
+        self.title_right = (None, None, Border(top=Side(style='thin'), right=Side(style='thin'), bottom=Side(style='thin')), None)
+        self.general_key = (DEFAULT_STYLES['header_font'], module_fill, border, DEFAULT_STYLES['left_alignment'])
+        self.general_value = (DEFAULT_STYLES['body_font'], None, border, DEFAULT_STYLES['left_alignment'])
+        self.header = (DEFAULT_STYLES['header_font'], DEFAULT_STYLES['header_fill'], border, DEFAULT_STYLES['center_alignment'])
+        self.body_text = (DEFAULT_STYLES['body_font'], None, border, DEFAULT_STYLES['left_alignment'])
+        self.body_number = (DEFAULT_STYLES['body_font'], None, border, DEFAULT_STYLES['right_alignment'])
+        self.totals = (DEFAULT_STYLES['totals_font'], DEFAULT_STYLES['totals_fill'], border, DEFAULT_STYLES['center_alignment'])
+        # Clave por identidad: el hash de los objetos de estilo de openpyxl es costoso
+        self._resolved: Dict[int, Any] = {}
+        self._worksheet = worksheet
+
+    def _style_array(self, style: tuple) -> Any:
+        resolved = self._resolved.get(id(style))
+        if resolved is None:
+            template = WriteOnlyCell(self._worksheet)
+            font, fill, border, alignment = style
+            if font is not None:
+                template.font = font
+            if fill is not None:
+                template.fill = fill
+            if border is not None:
+                template.border = border
+            if alignment is not None:
+                template.alignment = alignment
+            resolved = self._resolved[id(style)] = template._style
+        return resolved
+
+    def cell(self, worksheet: Any, value: Any, style: tuple) -> WriteOnlyCell:
+        cell = WriteOnlyCell(worksheet, value)
+        cell._style = copy(self._style_array(style))
+        return cell
@@ -0,0 +1,228 @@
+"""
+Modo compacto de los libros XLSX: reescribe el paquete ya generado (por el
+escritor directo o por openpyxl) para que pese menos al descargarlo.
+
+* Los textos en línea (``inlineStr``, lo que escriben ambos escritores) pasan
+  a la tabla de cadenas compartidas ``xl/sharedStrings.xml``: cada texto
+  repetido (líneas, marcas, unidades, dispersión) se guarda una sola vez y
+  la celda solo lleva su índice.
+* Se quitan los registros redundantes de cada celda y fila: la referencia
+  ``r`` cuando es la siguiente columna o fila, ``s="0"`` (estilo por
+  defecto), ``t="n"`` (tipo por defecto), los ``<v>`` vacíos de las fórmulas
+  y las celdas vacías sin estilo.
+* Los números se escriben con 15 dígitos significativos, la precisión con la
+  que Excel los guarda (``-48.75999999999999`` pasa a ``-48.76`` y ``103.0``
+  a ``103``).
+* El ZIP se vuelve a comprimir con ``XLSX_COMPRESSLEVEL`` (0-9).
+
+Los estilos se mantienen por celda: un estilo de fila o de columna también
+se aplica a las celdas fuera de la tabla y llevaría bordes y rellenos a todo
+el ancho de la hoja. Las hojas se procesan por bloques de filas, así que la
+memoria crece con los textos distintos y no con el tamaño de la hoja.
+"""
+import math
+import os
+import re
+import zipfile
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional
+
+from openpyxl.utils import column_index_from_string
+
+XLSX_COMPACT = os.environ.get("XLSX_COMPACT", "").strip().lower() in ("1", "true", "yes")
+XLSX_COMPRESSLEVEL = int(os.environ.get("XLSX_COMPRESSLEVEL", "9"))
+CHUNK_BYTES = 1024 * 1024
+
+SHEET_RE = re.compile(r"xl/worksheets/[^/]+\.xml")
+SHARED_STRINGS = "xl/sharedStrings.xml"
+CONTENT_TYPES = "[Content_Types].xml"
+WORKBOOK_RELS = "xl/_rels/workbook.xml.rels"
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+SHARED_STRINGS_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+SHARED_STRINGS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+ROW_RE = re.compile(r"<row\b([^>]*?)\s*(?:/>|>(.*?)</row>)", re.S)
+# Forma que escriben ambos escritores (r, s y t en ese orden) y, como alternativa, cualquier otra
+CELL_RE = re.compile(
+    r'<c(?: r="([A-Z]+)\d+")?(?: s="(\d+)")?(?: t="(\w+)")?\s*(?:/>|>(.*?)</c>)'
+    r"|<c\b([^>]*?)\s*(?:/>|>(.*?)</c>)",
+    re.S,
+)
+ATTRIBUTE_RE = re.compile(r'([\w:]+)="([^"]*)"')
+INLINE_TEXT_RE = re.compile(r"<is>\s*(?:<t(?:\s[^>]*)?>(.*?)</t>|<t\s*/>)?\s*</is>", re.S)
+NUMBER_RE = re.compile(r"<v>([^<]+)</v>")
+EMPTY_VALUE_RE = re.compile(r"<v>\s*</v>|<v\s*/>")
+SHARED_ITEM_RE = re.compile(r"<si>.*?</si>|<si\s*/>", re.S)
+SIMPLE_ITEM_RE = re.compile(r"<si><t(?:\s[^>]*)?>(.*?)</t></si>", re.S)
+
+
+@lru_cache(maxsize=4096)
+def _column(reference: str) -> int:
+    return column_index_from_string(reference.rstrip("0123456789"))
+
+
+def _short_number(text: str) -> str:
+    """El número con 15 dígitos significativos; igual si no es un número finito"""
+    if len(text) <= 15:
+        return text[:-2] if text.endswith(".0") else text
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    if not math.isfinite(number):
+        return text
+    short = "%.15g" % number
+    return short if len(short) < len(text) else text
+
+
+class SharedStrings:
+    """Tabla de cadenas compartidas; los textos se guardan ya escapados para XML"""
+
+    def __init__(self, existing: Optional[bytes] = None):
+        self.items: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.references = 0
+        if existing:
+            # Los índices ya usados por las celdas ``t="s"`` se conservan
+            for item in SHARED_ITEM_RE.findall(existing.decode("utf-8")):
+                simple = SIMPLE_ITEM_RE.fullmatch(item)
+                if simple is not None:
+                    self.index.setdefault(simple.group(1), len(self.items))
+                self.items.append(item)
+
+    def add(self, text: str) -> int:
+        self.references += 1
+        position = self.index.get(text)
+        if position is None:
+            position = self.index[text] = len(self.items)
+            space = ' xml:space="preserve"' if text != text.strip() else ""
+            self.items.append(f"<si><t{space}>{text}</t></si>")
+        return position
+
+    def xml(self) -> bytes:
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="{MAIN_NS}" count="{self.references}" uniqueCount="{len(self.items)}">'
+            + "".join(self.items)
+            + "</sst>"
+        ).encode("utf-8")
+
+
+class _SheetCompactor:
+    """Reescribe las filas de una hoja; lleva la última fila y columna escritas entre bloques"""
+
+    def __init__(self, strings: SharedStrings):
+        self.strings = strings
+        self.last_row = 0
+        self.row_number = 0
+        self.last_column = 0
+
+    def row(self, match: "re.Match[str]") -> str:
+        attributes = dict(ATTRIBUTE_RE.findall(match.group(1)))
+        number = int(attributes.pop("r")) if "r" in attributes else self.last_row + 1
+        attributes.pop("spans", None)
+        self.row_number = number
+        self.last_column = 0
+        cells = CELL_RE.sub(self.cell, match.group(2) or "")
+        if not cells and not attributes:
+            return ""
+        if number != self.last_row + 1:
+            attributes = {"r": str(number), **attributes}
+        self.last_row = number
+        head = "".join(f' {key}="{value}"' for key, value in attributes.items())
+        return f"<row{head}>{cells}</row>" if cells else f"<row{head}/>"
+
+    def cell(self, match: "re.Match[str]") -> str:
+        letters, style, kind, content = match.group(1, 2, 3, 4)
+        extra = ""
+        if match.group(5) is not None:
+            # Atributos en otro orden o adicionales: se separan r, s y t del resto
+            attributes = dict(ATTRIBUTE_RE.findall(match.group(5)))
+            reference = attributes.pop("r", None)
+            letters = reference.rstrip("0123456789") if reference else None
+            style, kind = attributes.pop("s", None), attributes.pop("t", None)
+            extra = "".join(f' {key}="{value}"' for key, value in attributes.items())
+            content = match.group(6)
+        content = content or ""
+        column = _column(letters) if letters else self.last_column + 1
+        if style == "0":
+            style = None
+
+        if kind == "inlineStr":
+            inline = INLINE_TEXT_RE.fullmatch(content) if content else None
+            if inline is not None or not content:
+                text = inline.group(1) if inline is not None else None
+                if text:
+                    kind, content = "s", f"<v>{self.strings.add(text)}</v>"
+                else:
+                    kind, content = None, ""
+            # Si no, texto enriquecido u otra forma: el contenido queda igual
+        elif kind is None or kind == "n":
+            kind = None
+            number = NUMBER_RE.fullmatch(content)
+            if number is not None:
+                content = f"<v>{_short_number(number.group(1))}</v>"
+            elif content:
+                content = EMPTY_VALUE_RE.sub("", content)
+
+        if style is None and kind is None and not extra and not content:
+            return ""
+        head = f' r="{letters}{self.row_number}"' if column != self.last_column + 1 else ""
+        self.last_column = column
+        if style is not None:
+            head += f' s="{style}"'
+        if kind is not None:
+            head += f' t="{kind}"'
+        head += extra
+        return f"<c{head}>{content}</c>" if content else f"<c{head}/>"
+
+    def rewrite(self, source: BinaryIO, target: BinaryIO):
+        """Copia la hoja procesando bloques que terminan en una fila completa"""
+        pending = b""
+        while True:
+            chunk = source.read(CHUNK_BYTES)
+            data = pending + chunk
+            if chunk:
+                cut = data.rfind(b"</row>")
+                if cut < 0:
+                    pending = data
+                    continue
+                cut += len(b"</row>")
+            else:
+                cut = len(data)
+            pending = data[cut:]
+            target.write(ROW_RE.sub(self.row, data[:cut].decode("utf-8")).encode("utf-8"))
+            if not chunk:
+                return
+
+
+def _with_shared_strings(content_types: bytes, rels: bytes):
+    """[Content_Types].xml y las relaciones del libro con la parte sharedStrings.xml"""
+    if b"/xl/sharedStrings.xml" not in content_types:
+        override = f'<Override PartName="/xl/sharedStrings.xml" ContentType="{SHARED_STRINGS_TYPE}"/>'
+        content_types = content_types.replace(b"</Types>", override.encode() + b"</Types>")
+    if SHARED_STRINGS_REL.encode() not in rels:
+        relationship = f'<Relationship Id="rIdSharedStrings" Type="{SHARED_STRINGS_REL}" Target="sharedStrings.xml"/>'
+        rels = rels.replace(b"</Relationships>", relationship.encode() + b"</Relationships>")
+    return content_types, rels
+
+
+def compact_xlsx(source: BinaryIO, output: BinaryIO, compresslevel: int = XLSX_COMPRESSLEVEL):
+    """Escribe en ``output`` la versión compacta del libro ``source``"""
+    with zipfile.ZipFile(source) as package, \
+            zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as result:
+        names = package.namelist()
+        strings = SharedStrings(package.read(SHARED_STRINGS) if SHARED_STRINGS in names else None)
+        content_types, rels = _with_shared_strings(package.read(CONTENT_TYPES), package.read(WORKBOOK_RELS))
+        result.writestr(CONTENT_TYPES, content_types)
+        for name in names:
+            if name in (CONTENT_TYPES, SHARED_STRINGS):
+                continue
+            if name == WORKBOOK_RELS:
+                result.writestr(name, rels)
+            elif SHEET_RE.fullmatch(name):
+                with package.open(name) as sheet, result.open(name, "w") as target:
+                    _SheetCompactor(strings).rewrite(sheet, target)
+            else:
+                result.writestr(name, package.read(name))
+        result.writestr(SHARED_STRINGS, strings.xml())
@@ -0,0 +1,296 @@
+"""
+Escritor XLSX directo (SpreadsheetML) para los reportes de líneas de producto.
+
+Los reportes de inventario, pedido y devoluciones tienen siempre la misma
+forma: bloque "DATOS GENERALES", una fila de encabezados, filas de datos y
+una fila de totales con fórmulas ``SUM``. En lugar de construir el modelo de
+objetos de openpyxl celda por celda, este módulo escribe el paquete a mano:
+
+* ``styles.xml`` precalculado por tipo de reporte (solo cambia el color del
+  módulo); cada celda referencia su estilo con un índice entero (``STYLE_INDEX``).
+* El tema, ``workbook.xml``, relaciones y tipos de contenido son fijos.
+* Cada hoja se escribe fila por fila directamente en el ``zipfile`` de salida,
+  con texto en línea (``inlineStr``) para no retener una tabla de cadenas
+  compartidas: la memoria no crece con la cantidad de filas.
+
+El resultado es equivalente al de openpyxl (mismos valores, estilos, anchos,
+celdas combinadas y fórmulas). Una diferencia deliberada: un texto de los
+datos que empieza con ``=`` se escribe como texto, no como fórmula; solo los
+valores ``Formula`` son fórmulas.
+"""
+import math
+import numbers
+import re
+import zipfile
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from openpyxl.utils import get_column_letter
+from openpyxl.writer.theme import theme_xml
+
+from .base_generator import STYLE_CONFIG
+
+# Índices de cellXfs en styles.xml
+STYLE_INDEX: Dict[str, int] = {
+    "default": 0,
+    "title": 1,
+    "title_right": 2,
+    "general_key": 3,
+    "general_value": 4,
+    "header": 5,
+    "body_text": 6,
+    "body_number": 7,
+    "totals": 8,
+}
+
+# Caracteres de control que XML no admite (mismo criterio que openpyxl)
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+FLUSH_ROWS = 500
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+class Formula(str):
+    """Fórmula de celda (``=SUM(...)``); openpyxl también la reconoce por el ``=``"""
+
+
+@lru_cache(maxsize=None)
+def styles_xml(report_key: str) -> bytes:
+    """styles.xml con los estilos de DEFAULT_STYLES y el color del módulo"""
+    bg_color = STYLE_CONFIG.get(report_key, STYLE_CONFIG["default"])["bg_color"]
+
+    def solid(color: str) -> str:
+        return f'<fill><patternFill patternType="solid"><fgColor rgb="00{color}"/><bgColor rgb="00{color}"/></patternFill></fill>'
+
+    def xf(font: int, fill: int, border: int, horizontal: Optional[str] = None) -> str:
+        if horizontal is None:
+            return f'<xf numFmtId="0" fontId="{font}" fillId="{fill}" borderId="{border}" xfId="0"/>'
+        return (f'<xf numFmtId="0" fontId="{font}" fillId="{fill}" borderId="{border}" xfId="0" applyAlignment="1">'
+                f'<alignment horizontal="{horizontal}" vertical="center"/></xf>')
+
+    fonts = [
+        '<font><sz val="11"/><color theme="1"/><name val="Calibri"/><family val="2"/><scheme val="minor"/></font>',
+        '<font><b val="1"/><sz val="12"/><name val="Arial"/></font>',                      # título
+        '<font><b val="1"/><sz val="11"/><name val="Arial"/></font>',                      # header_font
+        '<font><sz val="10"/><name val="Arial"/></font>',                                  # body_font
+        '<font><b val="1"/><sz val="11"/><color rgb="00FFFFFF"/><name val="Arial"/></font>',  # totals_font
+    ]
+    fills = [
+        '<fill><patternFill/></fill>',
+        '<fill><patternFill patternType="gray125"/></fill>',
+        solid("D9D9D9"),   # header_fill
+        solid(bg_color),   # color del módulo
+        solid("404040"),   # totals_fill
+    ]
+    borders = [
+        '<border><left/><right/><top/><bottom/><diagonal/></border>',
+        '<border><left style="thin"/><top style="thin"/><bottom style="thin"/></border>',
+        '<border><right style="thin"/><top style="thin"/><bottom style="thin"/></border>',
+        '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/></border>',
+    ]
+    xfs = [
+        xf(0, 0, 0),
+        xf(1, 2, 1, "center"),  # title
+        xf(0, 0, 2),            # title_right
+        xf(2, 3, 3, "left"),    # general_key
+        xf(3, 0, 3, "left"),    # general_value
+        xf(2, 2, 3, "center"),  # header
+        xf(3, 0, 3, "left"),    # body_text
+        xf(3, 0, 3, "right"),   # body_number
+        xf(4, 4, 3, "center"),  # totals
+    ]
+    return (
+        XML_HEADER
+        + f'<styleSheet xmlns="{MAIN_NS}">'
+        + f'<fonts count="{len(fonts)}">{"".join(fonts)}</fonts>'
+        + f'<fills count="{len(fills)}">{"".join(fills)}</fills>'
+        + f'<borders count="{len(borders)}">{"".join(borders)}</borders>'
+        + '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        + f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+        + '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        + '<dxfs count="0"/><tableStyles count="0" defaultTableStyle="TableStyleMedium9" defaultPivotStyle="PivotStyleLight16"/>'
+        + '</styleSheet>'
+    ).encode("utf-8")
+
+
+THEME_XML = theme_xml.encode("utf-8") if isinstance(theme_xml, str) else theme_xml
+
+ROOT_RELS = (
+    XML_HEADER
+    + f'<Relationships xmlns="{PKG_REL_NS}">'
+    + f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    + '</Relationships>'
+).encode("utf-8")
+
+
+def _content_types(sheet_count: int) -> bytes:
+    sheets = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheet_count + 1)
+    )
+    return (
+        XML_HEADER
+        + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        + '<Default Extension="xml" ContentType="application/xml"/>'
+        + '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        + '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + '<Override PartName="/xl/theme/theme1.xml" ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+        + sheets
+        + '</Types>'
+    ).encode("utf-8")
+
+
+def _workbook_xml(sheet_names: Sequence[str]) -> bytes:
+    sheets = "".join(
+        f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+        for i, name in enumerate(sheet_names, 1)
+    )
+    return (
+        XML_HEADER
+        + f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        + '<workbookPr/><bookViews><workbookView activeTab="0"/></bookViews>'
+        + f'<sheets>{sheets}</sheets>'
+        # Sin valores en caché: Excel/LibreOffice recalculan las fórmulas al abrir
+        + '<calcPr calcId="124519" fullCalcOnLoad="1"/>'
+        + '</workbook>'
+    ).encode("utf-8")
+
+
+def _workbook_rels(sheet_count: int) -> bytes:
+    rels = [
+        f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, sheet_count + 1)
+    ]
+    rels.append(f'<Relationship Id="rId{sheet_count + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>')
+    rels.append(f'<Relationship Id="rId{sheet_count + 2}" Type="{REL_NS}/theme" Target="theme/theme1.xml"/>')
+    return (XML_HEADER + f'<Relationships xmlns="{PKG_REL_NS}">' + "".join(rels) + '</Relationships>').encode("utf-8")
+
+
+def _format_width(width: float) -> str:
+    return "%.10g" % width
+
+
+def _cell_xml(ref: str, value: Any, style: int) -> str:
+    """XML de una celda; None o "" solo conservan el estilo"""
+    if value is None or value == "":
+        return f'<c r="{ref}" s="{style}"/>' if style else ""
+    if isinstance(value, Formula):
+        return f'<c r="{ref}" s="{style}"><f>{escape(value[1:])}</f><v></v></c>'
+    if isinstance(value, str):
+        text = ILLEGAL_CHARACTERS_RE.sub("", value)
+        space = ' xml:space="preserve"' if text != text.strip() else ""
+        return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}" s="{style}"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        number = float(value)
+        if not math.isfinite(number):
+            return f'<c r="{ref}" s="{style}"/>'
+        return f'<c r="{ref}" s="{style}"><v>{number!r}</v></c>'
+    return _cell_xml(ref, str(value), style)
+
+
+class XlsxSheetWriter:
+    """Escribe ``sheetN.xml`` fila por fila en el zip"""
+
+    def __init__(self, stream: Any, widths: Sequence[float], merged: Sequence[str] = ()):
+        self._stream = stream
+        self._merged = list(merged)
+        self._row = 0
+        self._letters: List[str] = []
+        self._pending: List[str] = []
+        cols = "".join(
+            f'<col min="{i}" max="{i}" width="{_format_width(width)}" customWidth="1"/>'
+            for i, width in enumerate(widths, 1)
+        )
+        self._write(
+            XML_HEADER
+            + f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+            + '<sheetViews><sheetView workbookViewId="0"><selection activeCell="A1" sqref="A1"/></sheetView></sheetViews>'
+            + '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+            + (f'<cols>{cols}</cols>' if cols else '')
+            + '<sheetData>'
+        )
+
+    def _write(self, text: str):
+        self._stream.write(text.encode("utf-8"))
+
+    def _letter(self, column: int) -> str:
+        letters = self._letters
+        while len(letters) < column:
+            letters.append(get_column_letter(len(letters) + 1))
+        return letters[column - 1]
+
+    def append(self, cells: Sequence[Tuple[Any, str]]):
+        """Agrega una fila de celdas ``(valor, nombre de estilo)``"""
+        self._row += 1
+        if not cells:
+            return
+        row = str(self._row)
+        if len(self._letters) < len(cells):
+            self._letter(len(cells))
+        letters = self._letters
+        parts = [f'<row r="{row}">']
+        for index, (value, style) in enumerate(cells):
+            parts.append(_cell_xml(letters[index] + row, value, STYLE_INDEX[style]))
+        parts.append('</row>')
+        self._pending.append("".join(parts))
+        if len(self._pending) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._write("".join(self._pending))
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        tail = '</sheetData>'
+        if self._merged:
+            refs = "".join(f'<mergeCell ref="{ref}"/>' for ref in self._merged)
+            tail += f'<mergeCells count="{len(self._merged)}">{refs}</mergeCells>'
+        tail += '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/></worksheet>'
+        self._write(tail)
+        self._stream.close()
+
+
+class XlsxWorkbookWriter:
+    """
+    Paquete XLSX escrito directamente en ``output``. Las hojas se escriben una
+    a la vez (``add_sheet`` cierra la anterior); ``close`` agrega las partes fijas.
+    """
+
+    def __init__(self, output: BinaryIO, report_key: str, compresslevel: Optional[int] = None):
+        self.report_key = report_key
+        self._zip = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._sheet_names: List[str] = []
+        self._current: Optional[XlsxSheetWriter] = None
+
+    def add_sheet(self, name: str, widths: Sequence[float], merged: Sequence[str] = ()) -> XlsxSheetWriter:
+        if self._current is not None:
+            self._current.close()
+        self._sheet_names.append(name)
+        stream = self._zip.open(f"xl/worksheets/sheet{len(self._sheet_names)}.xml", "w")
+        self._current = XlsxSheetWriter(stream, widths, merged)
+        return self._current
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        count = len(self._sheet_names)
+        self._zip.writestr("[Content_Types].xml", _content_types(count))
+        self._zip.writestr("_rels/.rels", ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", _workbook_xml(self._sheet_names))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", _workbook_rels(count))
+        self._zip.writestr("xl/styles.xml", styles_xml(self.report_key))
+        self._zip.writestr("xl/theme/theme1.xml", THEME_XML)
+        self._zip.close()
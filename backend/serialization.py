@@ -0,0 +1,126 @@
+"""
+Serialización JSON/MessagePack del backend.
+
+* ``FastJSONProvider``: proveedor JSON de Flask respaldado por orjson; si orjson
+  no está instalado (o no puede serializar un valor) se usa el de la librería
+  estándar con el mismo resultado.
+* ``request_payload``: decodifica el cuerpo de la petición una sola vez y lo
+  guarda en ``g`` para el resto de la petición (validación, handler, perfilado).
+* MessagePack es opcional: si ``msgpack`` está instalado se aceptan cuerpos
+  ``application/msgpack`` y ``api_response`` responde en ese formato cuando el
+  cliente lo pide en ``Accept``.
+"""
+import json
+from typing import Any, Optional
+
+from flask import Response, g, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende del entorno
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Fechas como en el proveedor estándar de Flask (default), no en ISO 8601 como orjson
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def _default(value: Any) -> Any:
+    return DefaultJSONProvider.default(value)
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """JSON compacto en bytes (orjson si está disponible)"""
+    if orjson is not None:
+        options = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, default=_default, option=options)
+        except TypeError:
+            # Enteros de más de 64 bits u otros casos no soportados por orjson
+            pass
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """``jsonify`` y ``request.get_json`` con orjson; mismo formato de salida que Flask"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, sort_keys=self.sort_keys).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs or orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # En modo debug se conserva la salida indentada del proveedor estándar
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, sort_keys=self.sort_keys), mimetype=self.mimetype)
+
+
+def _is_msgpack(mimetype: Optional[str]) -> bool:
+    return mimetype in MSGPACK_MIMETYPES
+
+
+def encode(obj: Any, mimetype: str = JSON_MIMETYPE) -> bytes:
+    """Serializa ``obj`` en JSON o MessagePack según ``mimetype``"""
+    if _is_msgpack(mimetype):
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack no está disponible en este servidor.")
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+    return dumps_bytes(obj)
+
+
+def wants_msgpack() -> bool:
+    """El cliente prefiere MessagePack (solo si el servidor lo soporta)"""
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match([JSON_MIMETYPE, *MSGPACK_MIMETYPES], default=JSON_MIMETYPE)
+    return _is_msgpack(best)
+
+
+def response_mimetype() -> str:
+    return MSGPACK_MIMETYPES[0] if wants_msgpack() else JSON_MIMETYPE
+
+
+def api_response(obj: Any, status: int = 200) -> Response:
+    """Respuesta JSON o MessagePack negociada con ``Accept``"""
+    mimetype = response_mimetype()
+    response = Response(encode(obj, mimetype), status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+
+def request_payload() -> Any:
+    """Cuerpo decodificado de la petición; se decodifica una sola vez por petición"""
+    if 'payload' in g:
+        return g.payload
+    if _is_msgpack(request.mimetype):
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack no está disponible en este servidor.")
+        try:
+            payload = msgpack.unpackb(request.get_data(cache=False), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as e:
+            raise BadRequest(f"Cuerpo MessagePack inválido: {e}")
+    else:
+        payload = request.get_json()
+    g.payload = payload
+    return payload
+
+
+def cached_payload() -> Any:
+    """Cuerpo ya decodificado o None, sin decodificar (para hooks posteriores)"""
+    return g.get('payload')
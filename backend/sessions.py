@@ -0,0 +1,93 @@
+"""
+Almacén en memoria de las sesiones del frontend (``POST /api/session/sync``).
+
+Cada sincronización renueva el TTL de la sesión; los ids los genera el
+backend y el cliente los reenvía (``X-Session-Id``). Las entradas se guardan en
+un ``OrderedDict`` en orden de última actividad: como el TTL es el mismo para
+todas, las vencidas están siempre al principio y se expulsan en O(1)
+amortizado en cada escritura, sin hilos de limpieza. ``SESSION_MAX_ENTRIES``
+acota la memoria expulsando las menos recientes.
+"""
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", str(30 * 60)))
+SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", "50000"))
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+MAX_FIELD_LENGTH = 64
+
+
+class SessionEntry:
+    __slots__ = ("created_at", "last_seen", "expires_at", "session_time", "source", "syncs")
+
+    def __init__(self, now: float, wall: float):
+        self.created_at = wall
+        self.last_seen = wall
+        self.expires_at = now
+        self.session_time: Optional[str] = None
+        self.source: Optional[str] = None
+        self.syncs = 0
+
+    def to_dict(self, session_id: str, now: float) -> Dict[str, Any]:
+        return {
+            "sessionId": session_id,
+            "expiresIn": max(0, round(self.expires_at - now)),
+            "syncs": self.syncs,
+            "serverTime": int(self.last_seen * 1000),
+        }
+
+
+class SessionStore:
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, SessionEntry]" = OrderedDict()
+
+    @staticmethod
+    def valid_id(session_id: Any) -> bool:
+        return isinstance(session_id, str) and SESSION_ID_PATTERN.match(session_id) is not None
+
+    def _evict(self, now: float):
+        entries = self._entries
+        while entries:
+            oldest = next(iter(entries.values()))
+            if oldest.expires_at > now and len(entries) <= self.max_entries:
+                break
+            entries.popitem(last=False)
+
+    def sync(self, session_id: Optional[str], session_time: Any = None, source: Any = None) -> Dict[str, Any]:
+        """
+        Renueva la sesión; un id ausente, inválido, desconocido o vencido inicia
+        una nueva con un id generado aquí (el cliente no elige ids)
+        """
+        now = time.monotonic()
+        wall = time.time()
+        with self._lock:
+            entry = self._entries.pop(session_id, None) if self.valid_id(session_id) else None
+            if entry is None or entry.expires_at <= now:
+                session_id = secrets.token_urlsafe(18)
+                entry = SessionEntry(now, wall)
+            entry.last_seen = wall
+            entry.expires_at = now + self.ttl_seconds
+            entry.syncs += 1
+            if session_time is not None:
+                entry.session_time = str(session_time)[:MAX_FIELD_LENGTH]
+            if source is not None:
+                entry.source = str(source)[:MAX_FIELD_LENGTH]
+            self._entries[session_id] = entry
+            self._evict(now)
+            return entry.to_dict(session_id, now)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict(time.monotonic())
+            return len(self._entries)
+
+
+session_store = SessionStore()
@@ -1,34 +1,184 @@
-from functools import wraps
-from flask import request, jsonify
+from functools import lru_cache, wraps
+from flask import g, request, jsonify
 import json
 import os
-from jsonschema import validate, ValidationError
+import pydantic
+from jsonschema import ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
 import logging
+import time
+from typing import Any, List, Optional, Tuple
+from .concurrency import run_cpu_bound
+from .metrics import stage_timer
+from .models import EXPORT_MODELS, PayloadModel, export_adapter
+from .serialization import request_payload
 
 SCHEMAS_DIR = os.path.join(os.path.dirname(__file__), '..', 'schemas')
+# Esquema consolidado para generar los tipos del frontend; no es un tipo de exportación
+CONSOLIDATED_SCHEMA = 'all_schemas'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# "jsonschema" (esquemas de schemas/) o "pydantic" (modelos de models.py, núcleo Rust)
+VALIDATION_BACKEND = os.environ.get('VALIDATION_BACKEND', 'jsonschema').strip().lower()
+
+logger = logging.getLogger(__name__)
 
 def validate_with_schema():
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            data = request.get_json()
-            logging.info(f"Received data for validation: {data}")
+            if request.mimetype == NDJSON_MIMETYPE:
+                # En streaming el encabezado y cada fila se validan al leerlos (ndjson_validators)
+                return f(*args, **kwargs)
+            with stage_timer('parse_json'):
+                data = request_payload()
+            if isinstance(data, dict) and 'draftId' in data:
+                # Exportación de un borrador: su contenido se validó al guardarlo (ver drafts.py)
+                return f(*args, **kwargs)
             if not data or 'tipo' not in data:
                 return jsonify({"error": "Missing 'tipo' in request body"}), 400
 
             schema_name = data.get('tipo')
+            started_at = time.perf_counter()
             try:
-                schema_path = os.path.join(SCHEMAS_DIR, f"{schema_name}.schema.json")
-                with open(schema_path) as file:
-                    schema = json.load(file)
-                
-                validate(instance=data, schema=schema)
+                with stage_timer('schema_validation', tipo=metric_tipo(schema_name)):
+                    # El cuerpo ya se leyó en el hub; solo la validación (CPU) sale al threadpool
+                    model = run_cpu_bound(validate_payload, str(schema_name), data)
+                    if model is not None:
+                        g.export_model = model
             except FileNotFoundError:
-                logging.error(f"Schema '{schema_name}.schema.json' not found.")
+                logger.error("Schema '%s.schema.json' not found.", schema_name)
                 return jsonify({"error": f"Schema '{schema_name}.schema.json' not found."}), 500
-            except ValidationError as e:
-                logging.error(f"Validation Error: {e.message}")
-                return jsonify({"error": "Invalid JSON", "message": e.message}), 400
+            except PAYLOAD_ERRORS as e:
+                message = validation_error_message(e)
+                logger.warning("Validation Error: %s", message, extra=payload_summary(data, started_at))
+                return jsonify({"error": "Invalid JSON", "message": message}), 400
+            # Solo se registra el resumen del payload, nunca su contenido
+            logger.info("Payload validated", extra=payload_summary(data, started_at))
             return f(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+# Errores de un payload inválido según el backend de validación
+PAYLOAD_ERRORS = (ValidationError, pydantic.ValidationError)
+
+
+def validate_payload(schema_name: str, data: Any) -> Optional[PayloadModel]:
+    """
+    Valida un payload de exportación con el backend configurado (también fuera
+    de Flask, p. ej. ``backend.batch``). Devuelve el modelo tipado con
+    ``pydantic`` y None con ``jsonschema``; lanza FileNotFoundError si el tipo
+    no existe o uno de PAYLOAD_ERRORS si el payload no es válido.
+    """
+    if VALIDATION_BACKEND == 'pydantic':
+        return validate_model(schema_name, data)
+    validate_instance(schema_validator(schema_name), data)
+    return None
+
+
+def validation_error_message(error: Exception) -> str:
+    if isinstance(error, pydantic.ValidationError):
+        return pydantic_error_message(error)
+    return getattr(error, 'message', str(error))
+
+
+def validate_model(tipo: str, data: Any) -> PayloadModel:
+    """Valida el payload con el modelo del tipo; FileNotFoundError si el tipo no tiene modelo"""
+    if tipo not in EXPORT_MODELS:
+        raise FileNotFoundError(tipo)
+    return export_adapter(tipo).validate_python(data)
+
+
+def pydantic_error_message(error: pydantic.ValidationError) -> str:
+    """Primer error en una línea, con la ruta del campo (p. ej. ``list.3.cantidad``)"""
+    first = error.errors(include_url=False)[0]
+    location = '.'.join(str(part) for part in first['loc'])
+    return f"{location}: {first['msg']}" if location else first['msg']
+
+
+def validated_model() -> Optional[PayloadModel]:
+    """Modelo tipado del payload de la petición actual (solo con VALIDATION_BACKEND=pydantic)"""
+    return g.get('export_model')
+
+
+def payload_summary(data: dict, started_at: float) -> dict:
+    """Campos estructurados del log de validación: tipo, filas, tamaño y duración"""
+    items = data.get('list')
+    return {
+        'tipo': data.get('tipo'),
+        'rows': len(items) if isinstance(items, list) else 0,
+        'bytes': request.content_length or 0,
+        'validation_ms': round((time.perf_counter() - started_at) * 1000, 2),
+    }
+
+
+def load_schema(schema_name: str) -> dict:
+    """Esquema ``schemas/<nombre>.schema.json``; FileNotFoundError si no existe"""
+    if not schema_name.isidentifier() or schema_name == CONSOLIDATED_SCHEMA:
+        raise FileNotFoundError(schema_name)
+    with open(os.path.join(SCHEMAS_DIR, f"{schema_name}.schema.json")) as file:
+        return json.load(file)
+
+
+@lru_cache(maxsize=None)
+def schema_validator(schema_name: str) -> Any:
+    """Validador compilado del esquema, construido una sola vez por proceso"""
+    schema = load_schema(schema_name)
+    cls = validator_for(schema)
+    return cls(schema)
+
+
+def validate_instance(validator: Any, instance: Any) -> None:
+    """Como ``jsonschema.validate``: lanza el error más relevante, si hay alguno"""
+    error = best_match(validator.iter_errors(instance))
+    if error is not None:
+        raise error
+
+
+@lru_cache(maxsize=1)
+def schema_names() -> Tuple[str, ...]:
+    suffix = '.schema.json'
+    names = (name[:-len(suffix)] for name in os.listdir(SCHEMAS_DIR) if name.endswith(suffix))
+    return tuple(sorted(name for name in names if name != CONSOLIDATED_SCHEMA))
+
+
+def metric_tipo(tipo: Any) -> str:
+    """Etiqueta de métricas para el ``tipo`` del cliente; los desconocidos se agrupan en 'unknown'"""
+    return tipo if isinstance(tipo, str) and tipo in schema_names() else 'unknown'
+
+
+def compile_schemas() -> List[str]:
+    """Compila de antemano todos los esquemas (calentamiento al arrancar)"""
+    if VALIDATION_BACKEND == 'pydantic':
+        for tipo in EXPORT_MODELS:
+            export_adapter(tipo)
+    # Los esquemas JSON se compilan siempre: las exportaciones NDJSON los usan por fila
+    return [name for name in schema_names() if schema_validator(name) is not None]
+
+
+def schemas_compiled() -> int:
+    """Esquemas con los validadores del backend activo ya construidos (no compila nada)"""
+    compiled = schema_validator.cache_info().currsize
+    if VALIDATION_BACKEND == 'pydantic':
+        return min(compiled, export_adapter.cache_info().currsize)
+    return compiled
+
+
+@lru_cache(maxsize=None)
+def ndjson_validators(schema_name: str) -> Tuple[Any, Any]:
+    """
+    Validadores para exportaciones NDJSON: uno para el encabezado (el esquema
+    sin ``list``) y otro para cada fila (el esquema de los ítems de ``list``).
+    Lanza FileNotFoundError si el esquema no existe.
+    """
+    schema = load_schema(schema_name)
+
+    header_schema = dict(schema)
+    header_schema['properties'] = {k: v for k, v in schema['properties'].items() if k != 'list'}
+    header_schema['required'] = [k for k in schema.get('required', []) if k != 'list']
+    row_schema = {**schema['properties']['list']['items'], '$defs': schema.get('$defs', {})}
+
+    cls = validator_for(schema)
+    return cls(header_schema), cls(row_schema)
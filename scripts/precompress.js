@@ -0,0 +1,44 @@
+// Genera copias precomprimidas (.gz y .br) de los archivos estáticos del build,
+// para que el servidor (nginx gzip_static/brotli_static, Firebase Hosting, etc.)
+// las sirva sin comprimir en cada petición. Se ejecuta como "postbuild".
+//
+// Uso: node scripts/precompress.js [directorio] (por defecto dist)
+import { readdir, readFile, stat, writeFile } from 'node:fs/promises';
+import { join } from 'node:path';
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib';
+
+const ROOT = process.argv[2] ?? 'dist';
+const EXTENSIONS = /\.(json|js|mjs|css|html|svg|txt)$/;
+const MIN_BYTES = 1024;
+
+async function* walk(dir) {
+  for (const entry of await readdir(dir, { withFileTypes: true })) {
+    const path = join(dir, entry.name);
+    if (entry.isDirectory()) {
+      yield* walk(path);
+    } else if (EXTENSIONS.test(entry.name)) {
+      yield path;
+    }
+  }
+}
+
+let total = 0;
+for await (const path of walk(ROOT)) {
+  const { size } = await stat(path);
+  if (size < MIN_BYTES) continue;
+
+  const data = await readFile(path);
+  const gz = gzipSync(data, { level: 9 });
+  const br = brotliCompressSync(data, {
+    params: {
+      [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+      [constants.BROTLI_PARAM_SIZE_HINT]: size,
+    },
+  });
+  // Solo se guardan las variantes que realmente reducen el tamaño
+  if (gz.length < size) await writeFile(`${path}.gz`, gz);
+  if (br.length < size) await writeFile(`${path}.br`, br);
+  total += 1;
+  console.log(`${path}: ${size} B -> gzip ${gz.length} B, br ${br.length} B`);
+}
+console.log(`Precomprimidos ${total} archivos en ${ROOT}`);
@@ -178,11 +178,17 @@ const SessionTimer: React.FC<SessionTimerProps> = ({
     try {
       console.log('🔄 SessionTimer: Sincronizando sesión con backend...');
 
+      // El id devuelto por el backend se reutiliza en cada sync (si no, cada sync crea una sesión nueva)
+      const sessionId = sessionCache.get<string>('backend_session_id');
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+      if (sessionId) headers['X-Session-Id'] = sessionId;
+
       // Only send essential session data, not every minute
       const response = await fetch('/api/session/sync', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers,
         body: JSON.stringify({
+          ...(sessionId ? { sessionId } : {}),
           sessionTime: timeConnected,
           lastActivity: new Date(),
           timestamp: Date.now(),
@@ -192,6 +198,11 @@ const SessionTimer: React.FC<SessionTimerProps> = ({
       });
 
       if (response.ok) {
+        const session: { sessionId?: string; expiresIn?: number } = await response.json();
+        if (session.sessionId) {
+          // Se guarda hasta que vence en el backend (expiresIn en segundos)
+          sessionCache.set('backend_session_id', session.sessionId, (session.expiresIn ?? 30 * 60) * 1000);
+        }
         console.log('✅ SessionTimer: Sincronización exitosa');
         sessionCache.set('last_session_sync', now, 10 * 60 * 1000); // Cache for 10 minutes
       } else {
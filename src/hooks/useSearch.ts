@@ -31,6 +31,8 @@ export const useSearch = (items: IProducto[] = [], searchTerm: string): IProduct
 
     // Se convierte el término de búsqueda a minúsculas para una comparación insensible a mayúsculas.
     const lowercasedSearchTerm = searchTerm.toLowerCase();
+    // Los tokens del backend vienen sin tildes: el término se compara igual ("cámara" -> "camara")
+    const foldedSearchTerm = lowercasedSearchTerm.trim().normalize('NFKD').replace(/[\u0300-\u036f]/g, '');
 
     // Se filtra la lista de productos.
     return items.filter(item => {
@@ -45,9 +47,9 @@ export const useSearch = (items: IProducto[] = [], searchTerm: string): IProduct
         return true;
       }
 
-      // Prioridad 3: El `keywords` del producto incluye el término de búsqueda.
-      // Esto permite búsquedas más flexibles y parciales.
-      if (item.keywords && item.keywords.some(keyword => keyword.toLowerCase().startsWith(lowercasedSearchTerm))) {
+      // Prioridad 3: Algún token de búsqueda del producto (nombre, keywords y código,
+      // ya normalizados por el backend) empieza con el término de búsqueda.
+      if (item.keywords && item.keywords.some(keyword => keyword.startsWith(foldedSearchTerm) || keyword.startsWith(lowercasedSearchTerm))) {
         return true;
       }
 
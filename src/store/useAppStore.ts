@@ -32,6 +32,7 @@ interface RawProduct {
   precio?: number;
   u_por_caja?: number;
   keywords?: string;
+  tokens?: string[]; // Tokens de búsqueda ya normalizados por el backend (?normalizado=1)
 }
 
 
@@ -124,7 +125,8 @@ const mapRawProductToIProducto = (rawProduct: RawProduct): IProducto => {
     stock_referencial: rawProduct.stock_referencial || 0,
     precio_referencial: rawProduct.precio || 0,
     cantidad_por_caja: rawProduct.u_por_caja || 0,
-    keywords: (rawProduct.keywords || '').trim().split(/\s+/).filter(Boolean),
+    // El backend ya genera los tokens (minúsculas, sin tildes); el split queda para respuestas sin ellos
+    keywords: rawProduct.tokens ?? (rawProduct.keywords || '').trim().split(/\s+/).filter(Boolean),
   };
 };
 
@@ -145,7 +147,8 @@ export const useAppStore = create<State & Actions>()(
           
 
           const backendUrl = import.meta.env.VITE_BACKEND_URL || 'http://localhost:5001';
-          const url = `${backendUrl}/api/catalog`;
+          // Productos ya normalizados y con tokens de búsqueda (una vez por versión en el backend)
+          const url = `${backendUrl}/api/catalog?normalizado=1`;
           // console.log(`Intentando cargar catálogo desde el backend: ${url}`);
           const response = await fetch(url);
           if (!response.ok) {
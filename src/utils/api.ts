@@ -33,6 +33,16 @@ export const calcularApi = async (params: ICalcularApiParams): Promise<ICalcular
   }
 };
 
+export const fetchHolidaysApi = async (year: number): Promise<Array<{date: string, name: string}>> => {
+  const response = await fetch(`${API_BASE_URL}/api/calendario/feriados?anio=${year}`);
+  if (!response.ok) {
+    throw new Error(`Error al obtener los feriados de ${year}`);
+  }
+  const data: { feriados: Array<{ fecha: string; nombre: string }> } = await response.json();
+  // Fechas en "DD/MM/YYYY", el formato de esFeriado
+  return data.feriados.map(({ fecha, nombre }) => ({ date: fecha, name: nombre }));
+};
+
 export const exportXlsxApi = async (payload: PedidoExport | InventarioExport | DevolucionesExport | PreciosExport): Promise<Blob> => {
   try {
     const response = await fetch(`${API_BASE_URL}/export-xlsx`, {
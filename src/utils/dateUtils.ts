@@ -1,4 +1,4 @@
-// import { fetchHolidaysApi } from './api'; // Commented out - not needed for current functionality
+import { fetchHolidaysApi } from './api';
 
 export const MONTH_NAMES_ES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
     "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
@@ -27,17 +27,11 @@ export async function obtenerFeriados(year: number): Promise<Array<{date: string
     }
 
     try {
-        // Commented out - fetchHolidaysApi not available in current implementation
-        // const feriadosArray = await fetchHolidaysApi(year);
-        // feriadosCache.set(year, feriadosArray);
-        // sessionStorage.setItem(cacheKey, JSON.stringify(feriadosArray));
-        // return feriadosArray;
-
-        // Return empty array for now - holidays functionality not needed
-        const emptyHolidays: Array<{date: string, name: string}> = [];
-        feriadosCache.set(year, emptyHolidays);
-        sessionStorage.setItem(cacheKey, JSON.stringify(emptyHolidays));
-        return emptyHolidays;
+        // Feriados nacionales del calendario del backend (GET /api/calendario/feriados)
+        const feriadosArray = await fetchHolidaysApi(year);
+        feriadosCache.set(year, feriadosArray);
+        sessionStorage.setItem(cacheKey, JSON.stringify(feriadosArray));
+        return feriadosArray;
     } catch (error) {
         console.error(`Error al obtener los feriados para el año ${year}:`, error);
         throw error;